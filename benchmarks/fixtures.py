@@ -0,0 +1,60 @@
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+from utils.data_loader_dwd import LOCATION_MAP, archives_for_range
+
+#Synthetische DWD-Archive im Originalformat (produkt_zehn_min_*.txt in einer .zip) für Benchmarks ohne Netzwerk
+#Die Dateien werden unter denselben lokalen Pfaden abgelegt, die archives_for_range erwartet (cache/dwd/<typ>/<name>)
+PRODUCT_FILES = {
+    "solar": ("sd", "STATIONS_ID;MESS_DATUM;  QN;DS_10;GS_10;SD_10;LS_10;eor"),
+    "wind": ("ff", "STATIONS_ID;MESS_DATUM;  QN;FF_10;DD_10;eor"),
+}
+
+
+#Reproduzierbare Messwerte: Globalstrahlung (J/cm² je 10 min) mit Tagesgang und Wolken, Wind (m/s) mit Wetterlagen und Böen
+def synthetic_values(data_type, timestamps, seed):
+    rng = np.random.default_rng(seed)
+    n = len(timestamps)
+    if data_type == "solar":
+        hour = timestamps.hour.to_numpy() + timestamps.minute.to_numpy() / 60
+        season = 0.55 + 0.45 * np.sin((timestamps.dayofyear.to_numpy() - 80) / 365 * 2 * np.pi)
+        clear_sky = np.clip(np.sin((hour - 4) / 16 * np.pi), 0, None) * 80 * season
+        return {"GS_10": np.round(clear_sky * (0.3 + 0.7 * rng.random(n)), 1)}
+    weather = 6 + 3 * np.sin(np.arange(n) / 400) + 2 * np.sin(np.arange(n) / 37)
+    return {"FF_10": np.round(np.clip(weather + rng.normal(0, 1.5, n), 0.2, None), 1), "DD_10": rng.integers(0, 360, n)}
+
+
+#Schreibt eine Produktdatei im DWD-Format (Semikolon, feste Spaltenbreiten, -999 als Fehlkennung) in eine .zip
+def write_dwd_zip(path, station_id, data_type, start, end, seed=None):
+    timestamps = pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq="10min", inclusive="left")
+    values = synthetic_values(data_type, timestamps, int(station_id) if seed is None else seed)
+    code, header = PRODUCT_FILES[data_type]
+
+    station = f"{int(station_id):11d}"
+    stamps = timestamps.strftime("%Y%m%d%H%M")
+    if data_type == "solar":
+        lines = [f"{station};{t};    3;   0.0;{g:7.1f};   0.1;-999;eor" for t, g in zip(stamps, values["GS_10"])]
+    else:
+        lines = [f"{station};{t};    3;{f:6.1f};{d:5d};eor" for t, f, d in zip(stamps, values["FF_10"], values["DD_10"])]
+
+    name = f"produkt_zehn_min_{code}_{pd.Timestamp(start):%Y%m%d}_{pd.Timestamp(end):%Y%m%d}_{station_id}.txt"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr(name, ("\n".join([header] + lines) + "\n").encode("latin1"))
+    os.replace(tmp_path, path)
+    return path
+
+
+#Legt für alle Stationen die Archive an, die für den Zeitraum [start, end) gelesen werden (relativ zum Arbeitsverzeichnis)
+#Rückgabe: Liste der geschriebenen Pfade
+def build_fixture_tree(stations, start, end, data_types=("solar", "wind")):
+    written = []
+    for station in stations:
+        station_id = LOCATION_MAP.get(station, station)
+        for data_type in data_types:
+            for _, _, _, local_path in archives_for_range(station_id, data_type, start, end):
+                if not os.path.exists(local_path):
+                    written.append(write_dwd_zip(local_path, station_id, data_type, start, end))
+    return written
@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import subprocess
+import tempfile
+import io
+from contextlib import redirect_stdout
+
+#Benchmarks der zeitkritischen Pfade mit synthetischen DWD-Archiven, ohne Download und ohne Geocoder
+#Aufruf aus dem Projektordner: python benchmarks/run_benchmarks.py [--quick] [--compare alt.json neu.json]
+#Ergebnisse werden als JSON (je Lauf eine Datei mit Git-Revision) unter benchmarks/results/ gespeichert
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+BENCH_YEAR = 2024
+STATIONS = ["Potsdam", "Nuernberg", "Bremen", "Augsburg", "Hannover"]
+CASES = ["best", "worst", "normal"]
+HORIZONS = {
+    "1d": (datetime.date(BENCH_YEAR, 6, 1), datetime.date(BENCH_YEAR, 6, 1)),
+    "1m": (datetime.date(BENCH_YEAR, 6, 1), datetime.date(BENCH_YEAR, 6, 30)),
+    "1y": (datetime.date(BENCH_YEAR, 1, 1), datetime.date(BENCH_YEAR, 12, 31)),
+}
+PORTFOLIO_SIZES = [1, 10, 1000]
+
+
+#Misst eine Funktion repeat-mal (nach einem Aufwärmdurchlauf, falls warmup=True), Ausgaben der Funktion werden unterdrückt
+def measure(func, repeat=3, warmup=True):
+    with redirect_stdout(io.StringIO()):
+        if warmup:
+            func()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return {"times_s": times, "min_s": min(times), "median_s": sorted(times)[len(times) // 2]}
+
+
+#Portfolio mit n Anlagen, abwechselnd PV und Wind, verteilt auf die Fixture-Stationen, unterschiedliche Leistungen
+def make_portfolio(n):
+    anlagen = []
+    for i in range(n):
+        typ = "pv" if i % 2 == 0 else "wind"
+        anlagen.append({
+            "name": f"{typ.upper()}_{i:04d}",
+            "typ": typ,
+            "leistung_mw": [1.0, 2.5, 5.0, 12.0][i % 4] if typ == "pv" else [3.2, 6.4, 16.0, 30.0][i % 4],
+            "standort": STATIONS[i % len(STATIONS)],
+        })
+    return {"anlagen": anlagen}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _metadata():
+    import numpy as np
+    import pandas as pd
+
+    return {
+        "revision": _git_revision(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+#Einzelaufrufe der Modelle und der Kennlinie (zeilenweise Schnittstellen)
+def bench_models(repeat):
+    from models.pv_model import PVModel
+    from models.wind_model import WindModel
+    from models.turbine_power_interpolation import get_turbine_power_value
+    from utils.data_loader_dwd import load_weather_data
+
+    day = datetime.date(BENCH_YEAR, 6, 1)
+    pv_rows = load_weather_data("Potsdam", day, "pv")
+    wind_rows = load_weather_data("Nuernberg", day, "wind")
+    pv = PVModel(name="PV", rated_power=10, location=(52.38, 13.06), case="normal")
+    wind = WindModel(name="Wind", rated_power=20, location=(49.45, 11.08), case="normal")
+    speeds = [i * 0.025 for i in range(1000)]
+
+    results = [
+        {"name": "PVModel.simulate_power", "calls": len(pv_rows),
+         **measure(lambda: [pv.simulate_power(row) for row in pv_rows], repeat)},
+        {"name": "WindModel.simulate_power", "calls": len(wind_rows),
+         **measure(lambda: [wind.simulate_power(row) for row in wind_rows], repeat)},
+        {"name": "get_turbine_power_value", "calls": len(speeds),
+         **measure(lambda: [get_turbine_power_value(3.2, v, "normal") for v in speeds], repeat)},
+        {"name": "PVModel.simulate_series", "calls": 1, "rows": len(pv_rows),
+         **measure(lambda: pv.simulate_series(pv_rows), repeat)},
+    ]
+    for result in results:
+        result["per_call_s"] = result["median_s"] / result["calls"]
+    return results
+
+
+#Parsen eines Jahresarchivs und Laden eines Tages (kalt: ohne Speicher, warm: aus Prozess- bzw. Dateicache)
+def bench_weather(repeat):
+    import shutil
+    from utils.data_loader_dwd import (_parse_zip_content, archives_for_range, load_weather_data, clear_parse_cache,
+                                       LOCATION_MAP)
+    from utils.weather_store import STORE_DIR
+
+    station_id = LOCATION_MAP["Potsdam"]
+    start, end = datetime.date(BENCH_YEAR, 1, 1), datetime.date(BENCH_YEAR + 1, 1, 1)
+    _, _, _, zip_path = archives_for_range(station_id, "solar", start, end)[0]
+    day = datetime.date(BENCH_YEAR, 6, 1)
+
+    def cold_load():
+        clear_parse_cache()
+        shutil.rmtree(STORE_DIR, ignore_errors=True)
+        load_weather_data("Potsdam", day, "pv")
+
+    return [
+        {"name": "_parse_zip_content", "archive": os.path.basename(zip_path),
+         **measure(lambda: _parse_zip_content(zip_path, station_id), repeat)},
+        {"name": "load_weather_data", "variant": "cold", **measure(cold_load, repeat, warmup=False)},
+        {"name": "load_weather_data", "variant": "warm", **measure(lambda: load_weather_data("Potsdam", day, "pv"), repeat)},
+    ]
+
+
+#Ende-zu-Ende-Simulation (alle drei Szenarien) je Zeitraum und Portfoliogröße, ohne Ergebnis-Cache
+def bench_end_to_end(horizons, sizes, repeat, processes=None):
+    from multiprocessing import Pool, cpu_count
+    from simulation.simulator import simulate_period
+
+    processes = processes or cpu_count()
+    results = []
+    with Pool(processes) as pool:
+        for horizon in horizons:
+            start, end = HORIZONS[horizon]
+            dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+            for size in sizes:
+                config = make_portfolio(size)
+                run = lambda: simulate_period(config, dates, CASES, pool=pool, processes=processes, show_progress=False,
+                                              result_cache=None)
+                timing = measure(run, repeat)
+                results.append({"name": "create_generators", "horizon": horizon, "plants": size, "days": len(dates),
+                                "processes": processes, **timing})
+                print(f"  create_generators {horizon:>3} {size:>5} Anlagen: {timing['median_s']:.3f} s")
+    return results
+
+
+def run(quick=False, repeat=3, output=None, processes=None):
+    from benchmarks.fixtures import build_fixture_tree
+
+    horizons = ["1d", "1m"] if quick else list(HORIZONS)
+    sizes = [1, 10] if quick else PORTFOLIO_SIZES
+
+    #Eigenes Arbeitsverzeichnis, damit Fixtures und Caches den Projektordner nicht berühren
+    workdir = tempfile.mkdtemp(prefix="volture_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        print(f"Erzeuge synthetische DWD-Archive in {workdir} ...")
+        build_fixture_tree(STATIONS, datetime.date(BENCH_YEAR, 1, 1), datetime.date(BENCH_YEAR + 1, 1, 1))
+
+        results = []
+        print("Modelle ...")
+        results += bench_models(repeat)
+        print("Wetterdaten ...")
+        results += bench_weather(repeat)
+        print("Ende-zu-Ende ...")
+        results += bench_end_to_end(horizons, sizes, repeat, processes)
+    finally:
+        os.chdir(cwd)
+
+    report = {"meta": {**_metadata(), "quick": quick, "repeat": repeat}, "results": results}
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"bench_{stamp}_{report['meta']['revision']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Ergebnisse gespeichert: {output}")
+    return report
+
+
+#Eindeutige Kennung eines Benchmarks aus Name und Parametern (ohne Messwerte)
+def _result_key(result):
+    return tuple(sorted((k, str(v)) for k, v in result.items() if not k.endswith("_s") and k != "times_s"))
+
+
+#Vergleicht zwei Ergebnisdateien (Median), Faktor > 1 bedeutet langsamer als die Referenz
+def compare(reference_path, candidate_path):
+    with open(reference_path) as f:
+        reference = {_result_key(r): r for r in json.load(f)["results"]}
+    with open(candidate_path) as f:
+        candidate = json.load(f)["results"]
+
+    lines = []
+    for result in candidate:
+        ref = reference.get(_result_key(result))
+        label = " ".join(str(v) for k, v in result.items() if not k.endswith("_s") and k != "times_s")
+        if ref is None:
+            lines.append(f"{label:<60} {result['median_s']:10.4f} s   (neu)")
+        else:
+            factor = result["median_s"] / ref["median_s"] if ref["median_s"] else float("inf")
+            lines.append(f"{label:<60} {ref['median_s']:10.4f} s -> {result['median_s']:10.4f} s  x{factor:.2f}")
+    report = "\n".join(lines)
+    print(report)
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks mit synthetischen DWD-Daten")
+    parser.add_argument("--quick", action="store_true", help="Nur 1 Tag / 1 Monat mit 1 und 10 Anlagen")
+    parser.add_argument("--repeat", type=int, default=3, help="Wiederholungen je Messung")
+    parser.add_argument("--processes", type=int, default=None, help="Worker-Prozesse für die Ende-zu-Ende-Läufe")
+    parser.add_argument("--output", default=None, help="Ergebnisdatei (JSON)")
+    parser.add_argument("--compare", nargs=2, metavar=("REFERENZ", "KANDIDAT"), help="Zwei Ergebnisdateien vergleichen")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(quick=args.quick, repeat=args.repeat, output=args.output, processes=args.processes)
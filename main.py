@@ -1,94 +1,137 @@
-def main():
+import argparse
+import datetime
+
+
+def _parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ungültiges Datum '{value}', erwartet JJJJ-MM-TT")
+
+
+#Kommandozeilenargumente
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Volture-EE-Tool: Simulation von PV- und Windanlagen mit DWD-Wetterdaten")
+    parser.add_argument("--start", type=_parse_date, default=datetime.date(2025, 5, 1),
+                        help="Erster simulierter Tag (JJJJ-MM-TT), Standard: 2025-05-01")
+    parser.add_argument("--end", type=_parse_date, default=None,
+                        help="Letzter simulierter Tag (JJJJ-MM-TT, inklusive), Standard: Monatsende des Starttags")
+    parser.add_argument("--cases", nargs="+", default=["best", "worst", "normal"], choices=["best", "worst", "normal"],
+                        help="Zu simulierende Szenarien")
+    parser.add_argument("--config", default="config/anlagen.yaml", help="Anlagenkonfiguration")
+    parser.add_argument("--output", default="output/", help="Ausgabeordner")
+    resume = parser.add_mutually_exclusive_group()
+    resume.add_argument("--resume", action="store_true",
+                        help="Lauf im Ausgabeordner fortsetzen, Abbruch falls Anlagen oder Optionen nicht dazu passen")
+    resume.add_argument("--no-resume", action="store_true",
+                        help="Vorhandenen Laufstatus im Ausgabeordner ignorieren und alle Monate neu rechnen")
+    parser.add_argument("--format", default="parquet", choices=["parquet", "csv"],
+                        help="Ausgabeformat: Parquet je Szenario und Monat (float32) oder bisherige CSV-Dateien")
+    parser.add_argument("--resolution", type=int, default=5, choices=[1, 5, 10, 15, 60],
+                        help="Zeitliche Auflösung der Ergebnisse in Minuten, Standard: 5")
+    parser.add_argument("--resample-method", default="linear", choices=["linear", "step", "mean"],
+                        help="Umrechnung der 10-Minuten-Werte: linear interpolieren, Wert halten oder Mittelwert je Intervall")
+    parser.add_argument("--reference-top-n", type=int, default=1,
+                        help="Anzahl Referenztage je Kriterium (max, min, volatil, Sprung, min. Energie, Schwachlast)")
+    parser.add_argument("--low-output-fraction", type=float, default=None,
+                        help="Schwelle für Schwachlast-Phasen als Anteil der installierten Leistung, Standard: 0.05")
+    parser.add_argument("--no-plots", action="store_true", help="Keine Plots der Referenztage erzeugen")
+    parser.add_argument("--no-result-cache", action="store_true",
+                        help="Ergebnis-Cache (cache/results.sqlite) nicht verwenden und alle Anlagen und Tage neu rechnen")
+    parser.add_argument("--processes", type=int, default=None, help="Anzahl Worker-Prozesse, Standard: alle Kerne")
+    parser.add_argument("--ensemble", type=int, default=None, metavar="N",
+                        help="Monte-Carlo-Ensemble mit N Mitgliedern statt der festen Szenarien, Ausgabe P10/P50/P90 von power_sum")
+    parser.add_argument("--seed", type=int, default=None, help="Startwert des Zufallsgenerators im Ensemble-Modus")
+    parser.add_argument("--report", default=None,
+                        help="Laufbericht (JSON) mit Zeiten je Schritt, Cache-Treffern und Worker-Auslastung, Standard: <output>/run_report.json")
+    parser.add_argument("--profile-task", nargs="?", const="", default=None, metavar="STANDORT",
+                        help="Nur eine Worker-Aufgabe (optional des Standorts) im Hauptprozess profilieren und beenden")
+    parser.add_argument("--profile-engine", default="cprofile", choices=["cprofile", "pyinstrument"],
+                        help="Profiler für --profile-task, Standard: cprofile")
+    parser.add_argument("--validate", nargs="?", const="validation data pv", default=None, metavar="ORDNER",
+                        help="Messreihen eines Ordners (Standard: 'validation data pv') mit der Simulation vergleichen und beenden")
+    parser.add_argument("--calibrate", nargs="?", const="validation data pv", default=None, metavar="ORDNER",
+                        help="k_g je Messanlage und Monat an die Messreihen eines Ordners anpassen, nach --calibration-file schreiben und beenden")
+    parser.add_argument("--calibration-file", default="config/pv_calibration.yaml",
+                        help="Ausgabedatei von --calibrate, Standard: config/pv_calibration.yaml")
+    parser.add_argument("--max-lag", type=int, default=60,
+                        help="Größte gesuchte Zeitverschiebung in Minuten bei --validate/--calibrate (0: keine Suche), Standard: 60")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Importzeiten (python -X importtime) von Hauptprozess und Workern messen und beenden")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.startup_profile:
+        import os
+        from utils.startup_profile import profile_startup
+        profile_startup(output=os.path.join(args.output, "startup_profile.txt"))
+        return
+
     import os
+    import calendar
+    from utils import instrumentation
     from utils.data_loader_dwd import load_yaml_config
-    from simulation.simulator import create_generators
-    from tqdm import tqdm
-    import pandas as pd
-    import matplotlib
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
- 
-    #Konfiguraions Pfade
-    config_path = 'config/anlagen.yaml'
-    output_base_path = "output/"
-    
+    from simulation.runner import run_range
+    from simulation.result_cache import RESULT_CACHE_PATH
+
     #Lädt Konfiguration mithilfe der in data_loader definierten Methode load_yaml_config
-    config = load_yaml_config(config_path)
-
-    #Definiert zu Siumlierenden Monat
-    season = 5
-    year = 2025
-
-    #Liste der im Zeitraum zu simulierenden Szenarieren --> Einfluss in PV und Wind Modell gewählten Parameter
-    cases = ['best','worst','normal']
-
-    #Schleife läuft Szenarien durch
-    for case in tqdm(cases, desc="Verarbeite Szenarien"):
-        #Ruft Simulationsprogramm create_generators auf
-        df = create_generators(config, season, case, year)  # DataFrame mit allen Anlagen + power_sum
-
-        # Sicherstellen, dass timestamp als datetime vorliegt
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df['date'] = df['timestamp'].dt.date
-
-        # Aggregationen pro Tag
-        daily_max = df.groupby('date')['power_sum'].max()
-        daily_min = df.groupby('date')['power_sum'].min()
-        daily_ptp = daily_max - daily_min  # Peak-to-Peak Leistung
-
-        # max 5 min Sprungänderung berechnen (per Tag)
-        daily_diff = df.groupby('date')['power_sum'].apply(lambda x: x.diff().abs().max())
-
-        # Tage mit den gewünschten Eigenschaften
-        max_day = daily_max.idxmax()
-        min_day = daily_min.idxmin()
-        volatile_day = daily_ptp.idxmax()
-        sharp_change_day = daily_diff.idxmax()
-
-        # Tagesprofile extrahieren
-        max_day_df = df[df['date'] == max_day]
-        min_day_df = df[df['date'] == min_day]
-        volatile_day_df = df[df['date'] == volatile_day]
-        sharp_change_day_df = df[df['date'] == sharp_change_day]
-
-        # Ordner mit season (zweistellig) und year als Name anlegen
-        folder_name = f"{season:02d}_{year}"
-        output_path = os.path.join(output_base_path, folder_name)
-        os.makedirs(output_path, exist_ok=True)
-
-        # Basis-Dateiname
-        base_filename = f"time_series_{case}_{season:02d}_{year}"
-
-        # Gesamte Zeitreihe speichern
-        df.to_csv(os.path.join(output_path, base_filename + ".csv"), index=False)
-
-        # Typische Tage speichern
-        max_day_df.to_csv(os.path.join(output_path, f"{base_filename}_max_day.csv"), index=False)
-        min_day_df.to_csv(os.path.join(output_path, f"{base_filename}_min_day.csv"), index=False)
-        volatile_day_df.to_csv(os.path.join(output_path, f"{base_filename}_volatile_day.csv"), index=False)
-        sharp_change_day_df.to_csv(os.path.join(output_path, f"{base_filename}_sharp_change_day.csv"), index=False)
-
-        # --- Plots der Referenztage ---
-        plt.figure(figsize=(12, 8))
-        plt.plot(max_day_df['timestamp'], max_day_df['power_sum'], label=f"Max Leistung Tag: {max_day}")
-        plt.plot(min_day_df['timestamp'], min_day_df['power_sum'], label=f"Min Leistung Tag: {min_day}")
-        plt.plot(volatile_day_df['timestamp'], volatile_day_df['power_sum'], label=f"Volatile Tag: {volatile_day}")
-        plt.plot(sharp_change_day_df['timestamp'], sharp_change_day_df['power_sum'], label=f"Sharp Change Tag: {sharp_change_day}")
-
-        # --- Einstellungen des Plots ---  
-        plt.xlabel("Timestamp")
-        plt.ylabel("Leistung (MW)")
-        plt.title(f"Referenz-Tagesprofile für Szenario '{case}' - {season:02d}/{year}")
-        plt.legend()
-        plt.grid(True)
-        plt.tight_layout()
-
-        # Wasserzeichen hinzufügen (halbtransparent, diagonal)
-        plt.figtext(0.5, 0.5, "MH_EE", fontsize=40, color='gray', alpha=0.2, ha='center', va='center', rotation=30)
-
-        # Plot speichern
-        plt.savefig(os.path.join(output_path, f"{base_filename}_referenz_tage_plot.png"))
-        plt.close()
+    config = load_yaml_config(args.config)
+
+    #Ohne Enddatum wird der Monat des Starttags simuliert
+    end_date = args.end or datetime.date(args.start.year, args.start.month,
+                                         calendar.monthrange(args.start.year, args.start.month)[1])
+
+    #Validierung gegen Messreihen (Zeitraum ergibt sich aus den Messdaten)
+    if args.validate is not None:
+        from simulation.validation import validate_folder
+        validate_folder(args.validate, cases=args.cases, max_lag=args.max_lag, processes=args.processes,
+                        result_cache=None if args.no_result_cache else RESULT_CACHE_PATH,
+                        output_base_path=args.output, plots=not args.no_plots)
+        return
+
+    #Kalibrierung der PV-Faktoren gegen Messreihen (Verwendung über pv_calibration in der Konfiguration)
+    if args.calibrate is not None:
+        from simulation.calibration import calibrate_folder
+        calibrate_folder(args.calibrate, max_lag=args.max_lag, processes=args.processes,
+                         result_cache=None if args.no_result_cache else RESULT_CACHE_PATH, output=args.calibration_file)
+        return
+
+    #Profil einer einzelnen Aufgabe (erster Monat des Zeitraums) statt eines vollständigen Laufs
+    if args.profile_task is not None:
+        from simulation.runner import month_chunks
+        from simulation.simulator import profile_task
+        extension = "prof" if args.profile_engine == "cprofile" else "html"
+        profile_task(config, month_chunks(args.start, end_date)[0], args.cases, location=args.profile_task or None,
+                     engine=args.profile_engine, output=os.path.join(args.output, f"profile_task.{extension}"))
+        return
+
+    with instrumentation.stage("run"):
+        #Ensemble-Modus: Quantilbänder über gezogene Modellparameter statt fester Szenarien
+        if args.ensemble:
+            from simulation.ensemble import run_ensemble
+            run_ensemble(config, args.start, end_date, members=args.ensemble, seed=args.seed, output_base_path=args.output,
+                         fmt=args.format, resolution=args.resolution, resample_method=args.resample_method)
+        else:
+            #Liste der im Zeitraum zu simulierenden Szenarieren --> Einfluss in PV und Wind Modell gewählten Parameter
+            #Der Zeitraum wird monatsweise simuliert und jeder Monat direkt gespeichert
+            run_range(config, args.start, end_date, args.cases, output_base_path=args.output,
+                      resume=True if args.resume else (False if args.no_resume else None), plots=not args.no_plots, processes=args.processes, fmt=args.format,
+                      top_n=args.reference_top_n, low_output_fraction=args.low_output_fraction,
+                      resolution=args.resolution, resample_method=args.resample_method,
+                      result_cache=None if args.no_result_cache else RESULT_CACHE_PATH)
+
+    #Laufbericht: Zeiten je Schritt (Hauptprozess und Worker zusammengeführt), Zeilen je Sekunde, Cache-Treffer, Auslastung
+    instrumentation.write_report(args.report or os.path.join(args.output, "run_report.json"), meta={
+        "start": args.start.isoformat(),
+        "end": end_date.isoformat(),
+        "cases": args.cases,
+        "plants": len(config.get("anlagen", [])),
+        "ensemble": args.ensemble,
+        "processes": args.processes,
+    })
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
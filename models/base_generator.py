@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
 
 class BaseGenerator:
     def __init__(self, name, location, rated_power, case):
@@ -9,4 +11,22 @@ class BaseGenerator:
 
     @abstractmethod
     def simulate_power(self, weather_row):
-        pass
\ No newline at end of file
+        pass
+
+    #Wandelt Wetterdaten (DataFrame, Liste von Dicts wie aus load_weather_data oder Zeitstempel + Werte) in Arrays um
+    @staticmethod
+    def _series_arrays(weather, key, values=None):
+        if values is None:
+            if isinstance(weather, list):
+                weather = pd.DataFrame(weather)
+            if key not in weather:
+                return pd.DatetimeIndex(pd.to_datetime(weather["datetime"])), None
+            timestamps = weather["datetime"]
+            values = weather[key]
+        else:
+            timestamps = weather
+        timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps))
+        values = np.asarray(values, dtype=float)
+        if len(values) != len(timestamps):
+            raise ValueError("Zeitstempel und Wetterwerte haben unterschiedliche Längen")
+        return timestamps, values
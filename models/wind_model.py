@@ -1,6 +1,8 @@
 from .base_generator import BaseGenerator
+import numpy as np
 import pandas as pd
-from .turbine_power_interpolation import get_turbine_power_value #Methode zum Abruf von cp basierend auf Klasse + Windgeschwindigkeit
+from utils import instrumentation
+from .turbine_power_interpolation import get_turbine_power_value, get_turbine_power_values #Methoden zum Abruf der Leistung basierend auf Klasse + Windgeschwindigkeit
 
 
 #Wind Modell Klasse definieren mit Eigenschaften aus Base Generator und Zusätzlichen wie z.B. cut_in, WindModel erbt alle Methoden und Eigenschaften von BaseGenerator
@@ -20,6 +22,23 @@ class WindModel(BaseGenerator):
         #Definiert Standardwerte falls nicht vorhanden 
         self.hub_height = hub_height if hub_height is not None else 100
         self.turbine_rated_power = turbine_rated_power if turbine_rated_power is not None else 3.2
+
+    # Turbinenanzahl bestimmen
+    @property
+    def turbine_count(self):
+        return max(1, round(self.rated_power / self.turbine_rated_power))
+
+    #Parameter, von denen das Leistungsprofil einer einzelnen Turbine abhängt
+    def profile_signature(self):
+        return ("wind", tuple(self.location), self.hub_height, self.turbine_rated_power)
+
+    #Die Parkleistung ist linear in der Turbinenanzahl: Anlagenprofil = Profil einer Turbine * turbine_count
+    def profile_scale(self):
+        return self.turbine_count
+
+    def unit_model(self):
+        return WindModel(name=self.name, case=self.case, rated_power=self.turbine_rated_power, location=self.location,
+                         hub_height=self.hub_height, turbine_rated_power=self.turbine_rated_power)
  
     #Ermittelt Hellmann-Konstante anhand des Szenaros Refernez: Volker Quaschning - Regenerative Energiesysteme
     @staticmethod
@@ -78,11 +97,45 @@ class WindModel(BaseGenerator):
 
 
         # Turbinenanzahl bestimmen
-        turbine_count = max(1, round(self.rated_power / self.turbine_rated_power)) 
+        turbine_count = self.turbine_count
         # Turbinenleistung bestimmen 
         turbine_power_cal = get_turbine_power_value(self.turbine_rated_power, wind_speed_hub, self.case)
         # Parkleistung mit Parkverlusten und Systemverlusten berechnen
         park_power_cal = turbine_power_cal * turbine_count * (1 - self.get_wake_loss(self.case)) * self.get_eta_sys(self.case) / 1e6
 
 
-        return park_power_cal
\ No newline at end of file
+        return park_power_cal
+
+
+    #Vektorisierte Leistungssimulation über eine ganze Wetterzeitreihe mit der vorberechneten Kennlinientabelle
+    #weather: DataFrame/Liste mit 'datetime' und 'wind' (FF_10 in m/s) oder Zeitstempel-Array zusammen mit ff_10
+    def simulate_series(self, weather, ff_10=None):
+        return self.simulate_series_cases(weather, [self.case], ff_10)[self.case]
+
+    #Berechnet mehrere Szenarien in einem Durchlauf auf denselben Wetterdaten
+    def simulate_series_cases(self, weather, cases, ff_10=None):
+        with instrumentation.stage("model.wind") as measured:
+            timestamps, wind_speed_10 = self._series_arrays(weather, "wind", ff_10)
+            if wind_speed_10 is None:
+                raise ValueError("Windgeschwindigkeit nicht im Wetterdatensatz gefunden")
+            if len(timestamps) == 0:
+                return {case: np.zeros(0) for case in cases}
+
+            missing = np.isnan(wind_speed_10)
+            if missing.any():
+                print(f"Warnung: {missing.sum()} fehlende Windgeschwindigkeiten ({self.name}) werden als 0 behandelt")
+                wind_speed_10 = np.where(missing, 0.0, wind_speed_10)
+
+            # Warnung bei Windgeschwindigkeit = 0 zwischen 10–15 Uhr
+            for ts in timestamps[(timestamps.hour >= 10) & (timestamps.hour <= 15) & (wind_speed_10 == 0)]:
+                print(f"Warnung: Windgeschwindigkeit ist 0 bei {ts} – mögliche fehlende oder fehlerhafte Wetterdaten.")
+
+            turbine_count = self.turbine_count
+            results = {}
+            for case in cases:
+                # Windgeschwindikeit auf Nabenhöhe interpolieren (Hellmann-Exponent hängt vom Szenario ab)
+                wind_speed_hub = wind_speed_10 * (self.hub_height / 10) ** self.get_alpha(case)
+                turbine_power_cal = get_turbine_power_values(self.turbine_rated_power, wind_speed_hub, case)
+                results[case] = turbine_power_cal * turbine_count * (1 - self.get_wake_loss(case)) * self.get_eta_sys(case) / 1e6
+            measured["rows"] = len(timestamps) * len(cases)
+        return results
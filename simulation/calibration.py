@@ -0,0 +1,124 @@
+import os
+import numpy as np
+import pandas as pd
+import yaml
+from models.pv_model import K_G_TABLE
+from utils import instrumentation
+
+#Kalibrierung der PV-Performance-Faktoren gegen Messreihen (z.B. validation data pv/)
+#Geometrie und Einstrahlung werden je Anlage einmal simuliert (Szenario normal, 1-Minuten-Raster, beste Zeitverschiebung
+#wie in der Validierung), danach ist die Leistung je Monat linear im Generatorkorrekturfaktor: P_mess ≈ k_g[Monat] * x
+#mit x = P_sim / k_g_Tabelle[Monat]. Der Faktor wird daher je Anlage und Monat in geschlossener Form (kleinste Quadrate)
+#für alle Anlagen und Monate gleichzeitig bestimmt (np.bincount), ohne erneute Modellauswertung
+#k_t und eta_sys sind je Monat nicht von k_g unterscheidbar (gleiches Produkt) und bleiben auf den Tabellenwerten
+CALIBRATION_FILE = os.path.join("config", "pv_calibration.yaml")
+#Mindestanzahl Messpaare (mit Einstrahlung) je Anlage und Monat und zulässiger Bereich des angepassten Faktors
+MIN_PAIRS = 10
+K_G_BOUNDS = (0.2, 1.2)
+
+
+#Angepasster k_g je Anlage und Monat aus den zugeordneten Paaren (site, timestamp, value, sim) des Szenarios normal
+#Rückgabe: DataFrame je Anlage und Monat mit Paaren, Tabellenwert, angepasstem Wert und RMSE vor/nach der Anpassung
+def fit_monthly_k_g(pairs, min_pairs=MIN_PAIRS, bounds=K_G_BOUNDS):
+    month = pairs["timestamp"].dt.month.to_numpy() - 1
+    k_g_table = np.asarray(K_G_TABLE["normal"])
+    x = pairs["sim"].to_numpy(dtype=float) / k_g_table[month]
+    y = pairs["value"].to_numpy(dtype=float)
+    sites, site_codes = np.unique(pairs["site"].to_numpy(), return_inverse=True)
+    group = site_codes * 12 + month
+    size = len(sites) * 12
+
+    daylight = x > 0
+    count = np.bincount(group[daylight], minlength=size)
+    sxx = np.bincount(group, x * x, minlength=size)
+    sxy = np.bincount(group, x * y, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fitted = np.clip(sxy / sxx, *bounds)
+    fitted = np.where((count >= min_pairs) & (sxx > 0), fitted, np.nan)
+
+    #Fehler vor (Tabellenwert) und nach der Anpassung über alle Paare der Gruppe
+    n = np.bincount(group, minlength=size)
+    table = np.tile(k_g_table, len(sites))
+    before = np.bincount(group, (table[group] * x - y) ** 2, minlength=size)
+    after = np.bincount(group, (np.where(np.isnan(fitted), table, fitted)[group] * x - y) ** 2, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = pd.DataFrame({
+            "site": np.repeat(sites, 12),
+            "month": np.tile(np.arange(1, 13), len(sites)),
+            "pairs": n,
+            "daylight_pairs": count,
+            "k_g_table": table,
+            "k_g_fit": fitted,
+            "rmse_before_mw": np.sqrt(before / n),
+            "rmse_after_mw": np.sqrt(after / n),
+        })
+    return result[result["pairs"] > 0].reset_index(drop=True)
+
+
+#Kalibriert alle Messreihen eines Ordners und schreibt die Faktoren je Anlage (Monate ohne ausreichende Daten: null)
+def calibrate_folder(folder=None, max_lag=None, processes=None, result_cache=None, output=CALIBRATION_FILE,
+                     min_pairs=MIN_PAIRS):
+    from simulation.validation import VALIDATION_DIR, MAX_LAG_MIN, load_and_simulate, align
+
+    folder = folder or VALIDATION_DIR
+    max_lag = MAX_LAG_MIN if max_lag is None else max_lag
+    #Vorhandene Faktoren der Messanlagen nicht verwenden, angepasst wird immer gegenüber den Tabellenwerten
+    _, measurements, simulated = load_and_simulate(folder, ["normal"], processes, result_cache, overrides=False)
+    pairs, _, lags = align(measurements, simulated, max_lag)
+
+    with instrumentation.stage("calibration.fit", rows=len(pairs)):
+        fits = fit_monthly_k_g(pairs, min_pairs=min_pairs)
+    print(fits.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    if output:
+        write_calibration(fits, lags, output)
+    return fits
+
+
+#Schreibt die Kalibrierung als yaml: je Anlage k_g mit 12 Monatswerten (null = Tabellenwert) und Angaben zur Anpassung
+def write_calibration(fits, lags, path=CALIBRATION_FILE):
+    calibration = {}
+    for site, site_fits in fits.groupby("site", sort=True):
+        k_g = [None] * 12
+        details = {}
+        for row in site_fits.itertuples(index=False):
+            if not np.isnan(row.k_g_fit):
+                k_g[row.month - 1] = round(float(row.k_g_fit), 4)
+            details[int(row.month)] = {
+                "pairs": int(row.pairs),
+                "k_g_table": float(row.k_g_table),
+                "rmse_before_mw": round(float(row.rmse_before_mw), 6),
+                "rmse_after_mw": round(float(row.rmse_after_mw), 6),
+            }
+        lag = lags.loc[lags["site"] == site, "lag_min"]
+        calibration[str(site)] = {"k_g": k_g, "lag_min": int(lag.iloc[0]) if len(lag) else 0, "fit": details}
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("#Kalibrierte Generatorkorrekturfaktoren k_g (Szenario normal) je Messanlage, null = Tabellenwert\n")
+        f.write("#Erzeugt mit: python main.py --calibrate, Verwendung über pv_calibration in anlagen.yaml\n")
+        yaml.safe_dump(calibration, f, sort_keys=False, allow_unicode=True, default_flow_style=None)
+    os.replace(tmp_path, path)
+    print(f" Kalibrierung gespeichert: {path}")
+    return calibration
+
+
+def load_calibration(path=CALIBRATION_FILE):
+    if not os.path.exists(path):
+        raise ValueError(f"Kalibrierungsdatei '{path}' nicht gefunden (Erzeugen mit python main.py --calibrate)")
+    with open(path, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+#Überträgt kalibrierte Faktoren auf PV-Anlagen: Eintrag 'kalibrierung' der Anlage oder gleichnamige Messanlage
+#Explizit in anlagen.yaml gesetzte k_g haben Vorrang
+def apply_calibration(anlagen, calibration):
+    calibrated = []
+    for anlage in anlagen:
+        key = anlage.get("kalibrierung", anlage.get("name"))
+        if anlage.get("typ") == "pv" and anlage.get("k_g") is None and key in calibration:
+            anlage = {**anlage, "k_g": calibration[key]["k_g"]}
+        elif anlage.get("kalibrierung") is not None and key not in calibration:
+            raise ValueError(f"Kalibrierung '{key}' für Anlage '{anlage['name']}' nicht gefunden")
+        calibrated.append(anlage)
+    return calibrated
@@ -0,0 +1,224 @@
+import os
+import numpy as np
+import pandas as pd
+from models.pv_model import K_G_TABLE, ETA_SYS
+from models.wind_model import WindModel
+from models.turbine_power_interpolation import get_turbine_curve, get_wind_speed_grid
+from simulation.resampling import resample_ns
+
+#Monte-Carlo-Ensemble über die unsicheren Modellparameter statt der drei festen Szenarien
+#Je Mitglied wird ein Parametersatz gezogen, Wetterdaten und Sonnengeometrie werden für alle Mitglieder geteilt
+#Berechnet wird je Monatsblock eine Matrix Mitglied x Zeit der Gesamtleistung, gespeichert werden nur die Quantile
+#Alle Anlagen eines Mitglieds verwenden denselben Parametersatz (vollständig korrelierte Unsicherheit im Portfolio)
+DEFAULT_MEMBERS = 1000
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+ENSEMBLE_DIR = "ensemble"
+DISTRIBUTIONS = ("fixed", "uniform", "triangular", "normal")
+
+
+def _triangular(worst, normal, best):
+    low, high = np.minimum(worst, best), np.maximum(worst, best)
+    return {"dist": "triangular", "low": low, "mode": normal, "high": high}
+
+
+#Standardverteilungen: Dreiecksverteilung mit den Szenariowerten (worst/normal/best) als Grenzen und Modalwert
+#pv_k_g ist je Monat definiert (12 Werte), alle Monate eines Mitglieds liegen auf demselben Quantil
+#wind_curve wählt die Kennlinie: 0 = worst, 0.5 = normal (Mittelwert der Klasse), 1 = best, Zwischenwerte linear gemischt
+DEFAULT_PARAMETERS = {
+    "pv_k_g": _triangular(np.array(K_G_TABLE['worst']), np.array(K_G_TABLE['normal']), np.array(K_G_TABLE['best'])),
+    "pv_eta_sys": _triangular(ETA_SYS['worst'], ETA_SYS['normal'], ETA_SYS['best']),
+    "wind_alpha": _triangular(WindModel.get_alpha('worst'), WindModel.get_alpha('normal'), WindModel.get_alpha('best')),
+    "wind_wake_loss": _triangular(WindModel.get_wake_loss('worst'), WindModel.get_wake_loss('normal'), WindModel.get_wake_loss('best')),
+    "wind_eta_sys": _triangular(WindModel.get_eta_sys('worst'), WindModel.get_eta_sys('normal'), WindModel.get_eta_sys('best')),
+    "wind_curve": {"dist": "triangular", "low": 0.0, "mode": 0.5, "high": 1.0},
+}
+
+
+#Inverse Verteilungsfunktion für gleichverteilte Zufallszahlen u (Spaltenvektor), Parameter dürfen Arrays sein (z.B. je Monat)
+def _inverse_cdf(spec, u):
+    dist = spec.get("dist")
+    if dist == "fixed":
+        return np.zeros_like(u) + np.asarray(spec["value"], dtype=float)
+    if dist == "uniform":
+        low, high = np.asarray(spec["low"], dtype=float), np.asarray(spec["high"], dtype=float)
+        return low + u * (high - low)
+    if dist == "triangular":
+        low, mode, high = (np.asarray(spec[key], dtype=float) for key in ("low", "mode", "high"))
+        if np.any(low > mode) or np.any(mode > high):
+            raise ValueError("Dreiecksverteilung erfordert low <= mode <= high")
+        span = np.where(high > low, high - low, 1.0)
+        split = (mode - low) / span
+        rising = low + np.sqrt(u * span * (mode - low))
+        falling = high - np.sqrt((1 - u) * span * (high - mode))
+        return np.where(high > low, np.where(u < split, rising, falling), low)
+    if dist == "normal":
+        from scipy.special import ndtri
+
+        values = np.asarray(spec["mean"], dtype=float) + np.asarray(spec["std"], dtype=float) * ndtri(u)
+        return np.clip(values, spec.get("low", -np.inf), spec.get("high", np.inf))
+    raise ValueError(f"Unbekannte Verteilung '{dist}', erlaubt: {', '.join(DISTRIBUTIONS)}")
+
+
+#Zieht members Parametersätze, overrides ersetzen einzelne Standardverteilungen (aus anlagen.yaml, Abschnitt ensemble.parameters)
+#Rückgabe: Dictionary Parameter -> Array (members,) bzw. (members, 12) für pv_k_g
+def sample_parameters(members, seed=None, overrides=None):
+    overrides = overrides or {}
+    unknown = set(overrides) - set(DEFAULT_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unbekannte Ensemble-Parameter: {', '.join(sorted(unknown))}")
+
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, default in DEFAULT_PARAMETERS.items():
+        spec = overrides.get(name, default)
+        u = rng.random((members, 1))
+        values = _inverse_cdf(spec, u)
+        samples[name] = values if values.shape[1] > 1 else values[:, 0]
+    if samples["pv_k_g"].ndim == 1:
+        samples["pv_k_g"] = np.repeat(samples["pv_k_g"][:, None], 12, axis=1)
+    return samples
+
+
+#Bereitet die Anlagen eines Monatsblocks vor: je Standort und Typ Wetterdaten laden und Anlagen nach Profilsignatur bündeln
+#PV: Summe der Nennleistungen je Signatur * Einstrahlung auf Modulebene * anlagenspezifische Monatsfaktoren
+#(k_t und Verhältnis des kalibrierten bzw. gesetzten k_g zum Tabellenwert, ohne Überschreibung 1), Wind: Summe der Turbinen je Signatur
+def _block_inputs(groups, weather_refs, coords, dates):
+    from simulation.simulator import LOOKAHEAD, _build_model
+    from utils.data_loader_dwd import load_weather_prepared
+
+    pv_parts, wind_parts = [], []
+    for (location, typ), anlagen in groups.items():
+        latlon = coords[location]
+        weather = load_weather_prepared(weather_refs[(location, typ)], dates[0], dates[-1], lookahead=LOOKAHEAD)
+        timestamps_ns = np.asarray(pd.DatetimeIndex(weather["datetime"]).values.astype("datetime64[ns]").view(np.int64))
+
+        signatures = {}
+        for anlage in anlagen:
+            model = _build_model(anlage, "normal", (latlon["latitude"], latlon["longitude"]))
+            if model is None:
+                continue
+            entry = signatures.setdefault(model.profile_signature(), [model, 0.0])
+            entry[1] += model.profile_scale()
+
+        for model, scale in signatures.values():
+            if typ == 'pv':
+                unit = model.unit_model()
+                timestamps, poa = unit._poa_series(weather)
+                month_idx = timestamps.month.to_numpy() - 1
+                factor = unit.monthly_k_t() * unit.monthly_k_g("normal") / np.asarray(K_G_TABLE["normal"])
+                pv_parts.append((timestamps_ns, poa / 1000 * scale * factor[month_idx]))
+            else:
+                wind_speed = np.nan_to_num(weather["wind"].to_numpy(dtype=float), nan=0.0)
+                wind_parts.append((timestamps_ns, wind_speed, model, scale))
+    return pv_parts, wind_parts
+
+
+#Leistung aller Windsignaturen je Mitglied (Mitglied x Zeit) ohne Park- und Systemverluste in W
+def _wind_matrix(wind_parts, axis, samples):
+    alpha = samples["wind_alpha"][:, None]
+    position = np.clip(samples["wind_curve"], 0.0, 1.0)[:, None]
+    #Mischgewichte der Kennlinien worst/normal/best
+    weights = {
+        "worst": np.clip(1 - 2 * position, 0, 1),
+        "normal": 1 - np.abs(2 * position - 1),
+        "best": np.clip(2 * position - 1, 0, 1),
+    }
+    grid = get_wind_speed_grid()
+
+    total = np.zeros((len(alpha), len(axis)))
+    for timestamps_ns, wind_speed, model, turbines in wind_parts:
+        positions = np.searchsorted(axis, timestamps_ns)
+        wind_speed_hub = wind_speed[None, :] * (model.hub_height / 10) ** alpha
+        for case, weight in weights.items():
+            if not weight.any():
+                continue
+            curve = get_turbine_curve(model.turbine_rated_power, case)
+            power = np.interp(wind_speed_hub, grid, curve)
+            total[:, positions] += weight * power * turbines
+    return total
+
+
+#Simuliert einen Monatsblock für alle Mitglieder und liefert Zeitachse und Quantile der Gesamtleistung (MW)
+def simulate_block(groups, weather_refs, coords, dates, samples, quantiles=DEFAULT_QUANTILES,
+                   resolution=5, resample_method="linear"):
+    pv_parts, wind_parts = _block_inputs(groups, weather_refs, coords, dates)
+    parts = [p[0] for p in pv_parts] + [p[0] for p in wind_parts]
+    if not parts:
+        return pd.DataFrame()
+    axis = np.unique(np.concatenate(parts))
+
+    members = len(samples["pv_eta_sys"])
+    total = np.zeros((members, len(axis)))
+
+    if pv_parts:
+        #PV: Einstrahlungsanteil ist für alle Mitglieder gleich, je Mitglied skaliert nur die Performance Ratio
+        months = axis.view("datetime64[ns]").astype("datetime64[M]").astype(np.int64) % 12
+        pv_base = np.zeros(len(axis))
+        for timestamps_ns, power in pv_parts:
+            pv_base[np.searchsorted(axis, timestamps_ns)] += power
+        pr = samples["pv_k_g"][:, months] * samples["pv_eta_sys"][:, None]
+        total += np.maximum(pr * pv_base[None, :], 0)
+
+    if wind_parts:
+        losses = ((1 - samples["wind_wake_loss"]) * samples["wind_eta_sys"] / 1e6)[:, None]
+        total += _wind_matrix(wind_parts, axis, samples) * losses
+
+    #Umrechnung auf die Zielauflösung für alle Mitglieder gemeinsam (Zeit x Mitglied), danach Quantile je Zeitschritt
+    #Der zusätzliche Wert des Folgetags (LOOKAHEAD) wird nach der Umrechnung entfernt
+    target_ns, resampled = resample_ns(axis, total.T, resolution, resample_method)
+    keep = target_ns < (pd.Timestamp(dates[-1]) + pd.Timedelta(days=1)).value
+    target_ns, resampled = target_ns[keep], resampled[keep]
+    bands = np.quantile(resampled, quantiles, axis=1)
+
+    result = {"timestamp": pd.DatetimeIndex(target_ns.view("datetime64[ns]"))}
+    for q, band in zip(quantiles, bands):
+        result[f"p{round(q * 100):02d}"] = band
+    result["mean"] = resampled.mean(axis=1)
+    return pd.DataFrame(result)
+
+
+#Ensemble-Lauf über [start_date, end_date] (inklusive), monatsweise berechnet und direkt gespeichert
+#Einstellungen aus anlagen.yaml (Abschnitt ensemble: members, seed, quantiles, parameters), members überschreibt die Konfiguration
+def run_ensemble(config, start_date, end_date, members=None, seed=None, output_base_path="output/", fmt="parquet",
+                 resolution=5, resample_method="linear"):
+    from tqdm import tqdm
+    from simulation.simulator import PLANT_TYPES, assign_stations, resolve_locations
+    from simulation.calibration import load_calibration, apply_calibration
+    from simulation.runner import month_chunks
+    from simulation.result_writer import write_frame
+    from utils.data_loader_dwd import prepare_weather
+    from utils.dwd_download import prefetch_archives
+
+    settings = config.get("ensemble") or {}
+    members = members or settings.get("members", DEFAULT_MEMBERS)
+    seed = seed if seed is not None else settings.get("seed")
+    quantiles = tuple(settings.get("quantiles", DEFAULT_QUANTILES))
+    samples = sample_parameters(members, seed, settings.get("parameters"))
+
+    anlagen = assign_stations(config.get("anlagen", []), start_date, end_date)
+    if config.get("pv_calibration"):
+        anlagen = apply_calibration(anlagen, load_calibration(config["pv_calibration"]))
+    coords = resolve_locations(anlagen, geocode_fallback=config.get("geocoding_fallback", False))
+    groups = {}
+    for anlage in anlagen:
+        if not anlage.get("standort") or anlage["standort"] not in coords:
+            print(f"Anlage '{anlage['name']}' übersprungen (kein gültiger Standort).")
+            continue
+        if anlage.get("typ") not in PLANT_TYPES:
+            print(f"Anlage '{anlage['name']}' übersprungen (unbekannter Typ '{anlage.get('typ')}').")
+            continue
+        groups.setdefault((anlage["standort"], anlage["typ"]), []).append(anlage)
+
+    valid_anlagen = [anlage for group in groups.values() for anlage in group]
+    prefetch_archives(valid_anlagen, start_date, end_date, max_workers=config.get("download_workers", 8))
+    weather_refs = {key: prepare_weather(key[0], key[1], start_date, end_date) for key in groups}
+
+    print(f" Starte Ensemble mit {members} Mitgliedern")
+    written = []
+    for dates in tqdm(month_chunks(start_date, end_date), desc="Simuliere Ensemble"):
+        bands = simulate_block(groups, weather_refs, coords, dates, samples, quantiles, resolution, resample_method)
+        if bands.empty:
+            continue
+        path = os.path.join(output_base_path, ENSEMBLE_DIR, f"ensemble_{dates[0]:%Y-%m}_{dates[0].isoformat()}")
+        written.append(write_frame(bands, path, fmt))
+    return written
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+#Auswahl von Referenztagen aus einer Leistungszeitreihe
+#Alle Tageskennzahlen werden in einem Durchlauf über die nach Tagen segmentierte Zeitreihe berechnet (numpy reduceat),
+#Tagesprofile werden anschließend über Indexbereiche [lo, hi) statt über Vergleiche auf dem ganzen DataFrame geschnitten
+
+#Kriterium -> (Kennzahl, absteigend sortieren)
+CRITERIA = {
+    "max_day": ("max", True),
+    "min_day": ("min", False),
+    "volatile_day": ("ptp", True),
+    "sharp_change_day": ("max_step", True),
+    "min_energy_day": ("energy", False),
+    "low_output_streak_day": ("low_streak", True),
+}
+#Schwelle für "geringe Leistung" als Anteil der installierten Leistung
+DEFAULT_LOW_OUTPUT_FRACTION = 0.05
+
+
+#Tagesgrenzen einer sortierten Zeitachse, Rückgabe (Tage als datetime64[D], Startindizes, Endindizes)
+def day_segments(timestamps):
+    days = np.asarray(pd.DatetimeIndex(timestamps).values).astype("datetime64[D]")
+    if len(days) == 0:
+        return days, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    ends = np.r_[starts[1:], len(days)]
+    return days[starts], starts, ends
+
+
+#Berechnet je Tag Maximum, Minimum, Spannweite, größten Sprung, Energie (MWh) und längste Phase geringer Leistung (h)
+#low_threshold: Leistung (gleiche Einheit wie power), unter der ein Zeitschritt als "gering" gilt
+def daily_statistics(timestamps, power, low_threshold=0.0):
+    timestamps = pd.DatetimeIndex(timestamps)
+    if not timestamps.is_monotonic_increasing:
+        raise ValueError("Zeitachse für die Referenztag-Auswahl muss aufsteigend sortiert sein")
+    power = np.asarray(power, dtype=np.float64)
+    days, starts, ends = day_segments(timestamps)
+    if len(days) == 0:
+        return pd.DataFrame(columns=["max", "min", "ptp", "max_step", "energy", "low_streak", "lo", "hi"])
+
+    #Zeitschritt in Stunden aus dem häufigsten Abstand der Zeitachse
+    step_h = float(np.median(np.diff(timestamps.values)) / np.timedelta64(1, "h")) if len(timestamps) > 1 else 0.0
+
+    daily_max = np.maximum.reduceat(power, starts)
+    daily_min = np.minimum.reduceat(power, starts)
+    energy = np.add.reduceat(power, starts) * step_h
+
+    #Sprünge zwischen aufeinanderfolgenden Werten, der Übergang über eine Tagesgrenze zählt nicht
+    step = np.zeros(len(power))
+    step[1:] = np.abs(np.diff(power))
+    step[starts] = 0.0
+    max_step = np.maximum.reduceat(step, starts)
+
+    #Länge der laufenden Phase geringer Leistung je Zeitschritt, Neustart bei höherer Leistung und an Tagesgrenzen
+    low = power <= low_threshold
+    count = np.cumsum(low)
+    reset = ~low
+    reset[starts] = True
+    positions = np.arange(len(power))
+    last_reset = np.maximum.accumulate(np.where(reset, positions, 0))
+    run_length = count - count[last_reset] + low[last_reset]
+    low_streak = np.maximum.reduceat(run_length, starts) * step_h
+
+    return pd.DataFrame({
+        "max": daily_max,
+        "min": daily_min,
+        "ptp": daily_max - daily_min,
+        "max_step": max_step,
+        "energy": energy,
+        "low_streak": low_streak,
+        "lo": starts,
+        "hi": ends,
+    }, index=pd.Index(pd.to_datetime(days).date, name="date"))
+
+
+#Wählt je Kriterium die top_n Tage, Rückgabe Dictionary Kriterium -> Liste von (Datum, lo, hi, Kennzahl)
+#Bei Gleichstand gewinnt der frühere Tag
+def select_reference_days(stats, top_n=1, criteria=None):
+    criteria = criteria or list(CRITERIA)
+    selected = {}
+    for criterion in criteria:
+        metric, descending = CRITERIA[criterion]
+        values = stats[metric].to_numpy()
+        order = np.argsort(-values if descending else values, kind="stable")[:top_n]
+        selected[criterion] = [
+            (stats.index[i], int(stats["lo"].iloc[i]), int(stats["hi"].iloc[i]), float(values[i]))
+            for i in order
+        ]
+    return selected
+
+
+#Referenztage direkt aus einem Ergebnis-DataFrame (Spalten timestamp und power_sum)
+def reference_days(df, top_n=1, low_threshold=0.0, criteria=None):
+    stats = daily_statistics(df["timestamp"], df["power_sum"].to_numpy(), low_threshold=low_threshold)
+    return select_reference_days(stats, top_n=top_n, criteria=criteria)
+
+
+#Tagesprofil über den Indexbereich eines ausgewählten Tages
+def day_profile(df, lo, hi):
+    return df.iloc[lo:hi]
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+#Zeitliche Umrechnung von Leistungszeitreihen (10-Minuten-Werte des DWD) auf beliebige Zielauflösungen
+#Arbeitet auf Zeitstempel-/Wert-Arrays über die gesamte Zeitreihe, Tagesgrenzen werden daher wie jeder andere Zeitschritt überbrückt
+RESAMPLE_METHODS = ("linear", "step", "mean")
+#Lücken in den Quelldaten, die größer sind, werden nicht überbrückt (keine Zielwerte innerhalb der Lücke)
+DEFAULT_MAX_GAP = pd.Timedelta(hours=1)
+
+
+def _to_ns(timestamps):
+    return np.asarray(pd.DatetimeIndex(timestamps).values.astype("datetime64[ns]").view(np.int64))
+
+
+def _step_ns(step):
+    if isinstance(step, (int, float, np.integer, np.floating)):
+        step = pd.Timedelta(minutes=step)
+    step_ns = pd.Timedelta(step).value
+    if step_ns <= 0:
+        raise ValueError(f"Ungültige Zielauflösung '{step}'")
+    return step_ns
+
+
+#Zielraster von der ersten bis zur letzten Quellzeit, ausgerichtet auf Vielfache der Schrittweite (z.B. volle Viertelstunden)
+def _target_grid(source_ns, step_ns):
+    first = -(-source_ns[0] // step_ns) * step_ns
+    return np.arange(first, source_ns[-1] + 1, step_ns, dtype=np.int64)
+
+
+#Interpolation (linear) bzw. Halten des letzten Werts (step) auf dem Zielraster
+#Zielpunkte in Lücken größer max_gap_ns werden verworfen
+def _sample(source_ns, values, grid, method, max_gap_ns):
+    left = np.searchsorted(source_ns, grid, side="right") - 1
+    right = np.minimum(left + 1, len(source_ns) - 1)
+    exact = source_ns[left] == grid
+    bridged = (right > left) & (source_ns[right] - source_ns[left] <= max_gap_ns)
+    valid = exact | bridged
+    grid, left, right, exact = grid[valid], left[valid], right[valid], exact[valid]
+
+    if method == "step":
+        return grid, values[left]
+
+    span = (source_ns[right] - source_ns[left]).astype(np.float64)
+    weight = np.where(exact, 0.0, (grid - source_ns[left]) / np.where(span > 0, span, 1.0))
+    if values.ndim > 1:
+        weight = weight[:, None]
+    return grid, values[left] + weight * (values[right] - values[left])
+
+
+#Mittelwert aller Quellwerte je Zielintervall [t, t + step), Intervalle ohne Quellwerte entfallen
+def _aggregate_mean(source_ns, values, step_ns):
+    bins = source_ns // step_ns
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    counts = np.diff(np.r_[starts, len(bins)])
+    sums = np.add.reduceat(values, starts, axis=0)
+    if values.ndim > 1:
+        counts = counts[:, None]
+    return bins[starts] * step_ns, sums / counts
+
+
+#Rechnet eine Zeitreihe auf die Zielauflösung step (Minuten oder Timedelta) um
+#values: 1D-Array (ein Wert je Zeitstempel) oder 2D-Array (Zeitstempel x Anlagen), Zeitstempel aufsteigend sortiert
+#method: "linear" (Interpolation), "step" (letzten Wert halten) oder "mean" (Mittelwert je Zielintervall, zum Vergröbern)
+#Bei feinerer Zielauflösung entspricht "mean" dem Halten des Werts
+#Rückgabe: (DatetimeIndex, Werte als float64-Array)
+def resample(timestamps, values, step, method="linear", max_gap=DEFAULT_MAX_GAP):
+    target_ns, result = resample_ns(_to_ns(timestamps), values, step, method, max_gap)
+    return pd.DatetimeIndex(target_ns.view("datetime64[ns]")), result
+
+
+#Wie resample, aber mit Zeitstempeln als int64-Nanosekunden (Epoche) für Ein- und Ausgabe
+def resample_ns(source_ns, values, step, method="linear", max_gap=DEFAULT_MAX_GAP):
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"Unbekannte Resampling-Methode '{method}', erlaubt: {', '.join(RESAMPLE_METHODS)}")
+    source_ns = np.asarray(source_ns, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(source_ns) != len(values):
+        raise ValueError("Zeitstempel und Werte haben unterschiedliche Länge")
+    if len(source_ns) == 0:
+        return source_ns, values
+    if np.any(np.diff(source_ns) <= 0):
+        raise ValueError("Zeitstempel müssen streng aufsteigend sortiert sein")
+
+    step_ns = _step_ns(step)
+    source_step_ns = int(np.median(np.diff(source_ns))) if len(source_ns) > 1 else step_ns
+    if method == "mean" and step_ns > source_step_ns:
+        return _aggregate_mean(source_ns, values, step_ns)
+    grid = _target_grid(source_ns, step_ns)
+    return _sample(source_ns, values, grid, "step" if method == "mean" else method, pd.Timedelta(max_gap).value)
@@ -0,0 +1,128 @@
+import os
+import json
+import sqlite3
+import hashlib
+from functools import lru_cache
+import numpy as np
+from utils import instrumentation
+
+#Persistenter Ergebnis-Cache für normierte Tagesprofile (1 MW bzw. eine Turbine, siehe profile_signature der Modelle)
+#Schlüssel: Profilsignatur (alle Anlagenparameter außer Nennleistung/Turbinenanzahl), Szenario, Modellversion,
+#Prüfsumme der Wetterdaten des Tages und Tag. Eine geänderte Anlage oder ein neuer Tag wird daher nur einzeln nachgerechnet,
+#eine geänderte Nennleistung kostet keine Neuberechnung. Ändern sich Wetterdaten oder Modellcode, passen die Schlüssel nicht mehr
+#Zum Zurücksetzen kann die Datei gelöscht werden
+RESULT_CACHE_PATH = os.path.join("cache", "results.sqlite")
+#Manuell erhöhen, wenn sich Modellergebnisse ohne Änderung der Dateien in models/ bzw. der Kennlinien ändern
+MODEL_VERSION = 1
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+
+#Modellversion aus MODEL_VERSION und dem Inhalt der Modelldateien und Kennlinien (geänderter Code --> neue Schlüssel)
+@lru_cache(maxsize=1)
+def model_version():
+    from models.turbine_power_interpolation import CURVE_SOURCE
+
+    digest = hashlib.sha1(str(MODEL_VERSION).encode())
+    sources = sorted(os.path.join(MODEL_DIR, name) for name in os.listdir(MODEL_DIR) if name.endswith(".py"))
+    for path in sources + [CURVE_SOURCE]:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def profile_key(signature):
+    return hashlib.sha1(json.dumps(list(signature), default=str).encode()).hexdigest()
+
+
+#Prüfsumme der Wetterdaten eines Tages (Zeitstempel und Messwerte)
+def weather_key(timestamps_ns, values):
+    digest = hashlib.sha1(np.ascontiguousarray(timestamps_ns, dtype=np.int64).tobytes())
+    digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path=RESULT_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        #WAL erlaubt parallele Leser neben einem Schreiber (mehrere Worker-Prozesse)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            "profile TEXT, case_name TEXT, version TEXT, weather TEXT, day TEXT, data BLOB, "
+            "PRIMARY KEY (profile, case_name, version, weather, day))"
+        )
+        self.conn.commit()
+
+    #Liest die vorhandenen Tagesprofile, days: Liste von (Tag als ISO-String, Wetter-Prüfsumme)
+    #Rückgabe: Dictionary (case, Tag) -> float64-Array
+    def get_many(self, profile, cases, days):
+        version = model_version()
+        found = {}
+        for case in cases:
+            for day, weather in days:
+                row = self.conn.execute(
+                    "SELECT data FROM profiles WHERE profile=? AND case_name=? AND version=? AND weather=? AND day=?",
+                    (profile, case, version, weather, day),
+                ).fetchone()
+                if row is not None:
+                    found[(case, day)] = np.frombuffer(row[0], dtype=np.float64)
+        return found
+
+    #Schreibt Tagesprofile in einer Transaktion, entries: Liste von (case, Tag, Wetter-Prüfsumme, Array)
+    def put_many(self, profile, entries):
+        version = model_version()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO profiles VALUES (?, ?, ?, ?, ?, ?)",
+                [(profile, case, version, weather, day, np.ascontiguousarray(values, dtype=np.float64).tobytes())
+                 for case, day, weather, values in entries],
+            )
+
+    #Entfernt Einträge älterer Modellversionen, Rückgabe Anzahl gelöschter Einträge
+    def prune(self):
+        with self.conn:
+            return self.conn.execute("DELETE FROM profiles WHERE version != ?", (model_version(),)).rowcount
+
+
+#Eine Verbindung je Prozess und Datei (Verbindungen werden nicht an geforkte Worker vererbt)
+@lru_cache(maxsize=8)
+def _open_cache(path, pid):
+    return ResultCache(path)
+
+
+def open_result_cache(path=RESULT_CACHE_PATH):
+    return _open_cache(path, os.getpid())
+
+
+#Normiertes Profil einer Signatur für die angefragten Tage, nur fehlende Tage werden mit dem Modell berechnet
+#unit: normiertes Modell, days: Liste von (Tag als ISO-String, lo, hi) auf der Wetterzeitreihe
+#Rückgabe: Dictionary case -> float64-Array über alle Tage (in der Reihenfolge von days)
+def cached_profile(cache, unit, signature, weather, value_column, days, cases):
+    timestamps_ns = weather["datetime"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    values = weather[value_column].to_numpy(dtype=np.float64)
+    keyed = [(day, weather_key(timestamps_ns[lo:hi], values[lo:hi]), lo, hi) for day, lo, hi in days]
+
+    profile = profile_key(signature)
+    found = cache.get_many(profile, cases, [(day, weather) for day, weather, _, _ in keyed])
+    missing = [entry for entry in keyed if any((case, entry[0]) not in found for case in cases)]
+    instrumentation.count("result_cache.hits", len(keyed) - len(missing))
+    instrumentation.count("result_cache.misses", len(missing))
+
+    if missing:
+        #Nur die Zeitschritte der fehlenden Tage simulieren (die Modelle rechnen zeilenweise unabhängig)
+        rows = np.concatenate([np.arange(lo, hi) for _, _, lo, hi in missing])
+        powers = unit.simulate_series_cases(weather.iloc[rows].reset_index(drop=True), cases)
+        entries = []
+        offset = 0
+        for day, weather_hash, lo, hi in missing:
+            for case in cases:
+                day_values = np.asarray(powers[case], dtype=np.float64)[offset:offset + hi - lo]
+                found[(case, day)] = day_values
+                entries.append((case, day, weather_hash, day_values))
+            offset += hi - lo
+        cache.put_many(profile, entries)
+
+    return {case: np.concatenate([found[(case, day)] for day, _, _, _ in keyed]) if keyed else np.zeros(0)
+            for case in cases}
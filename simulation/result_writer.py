@@ -0,0 +1,173 @@
+import os
+import json
+import pandas as pd
+from simulation.reference_days import reference_days, day_profile
+from utils import instrumentation
+
+#Schreibt die Ergebnisse eines Monatsabschnitts je Szenario
+#Standard ist Parquet (spaltenorientiert, komprimiert, float32), partitioniert nach Szenario und Monat:
+#  <output>/results/case=<case>/month=<JJJJ-MM>/part-<erster Tag>.parquet
+#Referenztage werden nur als Index (Daten je Kriterium, nach Rang sortiert) gespeichert, nicht als kopierte Tagesprofile
+RESULT_FORMATS = ("parquet", "csv")
+RESULTS_DIR = "results"
+PLOTS_DIR = "plots"
+REFERENCE_INDEX_FILE = "reference_days.json"
+PARQUET_COMPRESSION = "zstd"
+
+
+def partition_path(output_base_path, case, dates):
+    return os.path.join(output_base_path, RESULTS_DIR, f"case={case}", f"month={dates[0]:%Y-%m}",
+                        f"part-{dates[0].isoformat()}.parquet")
+
+
+#Schreibt eine Partition als Parquet-Datei (Leistungen als float32), Referenztage stehen in den Dateimetadaten
+def write_parquet(df, path, ref_days=None):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Für die Parquet-Ausgabe wird pyarrow benötigt (pip install pyarrow) oder --format csv verwenden")
+
+    columns = {"timestamp": pa.array(pd.to_datetime(df['timestamp']).to_numpy(), type=pa.timestamp("ns"))}
+    for name in df.columns:
+        if name in ("timestamp", "date"):
+            continue
+        columns[name] = pa.array(df[name].to_numpy(dtype="float32"), type=pa.float32())
+    table = pa.table(columns)
+    if ref_days:
+        table = table.replace_schema_metadata({
+            "reference_days": json.dumps(_reference_dates(ref_days)),
+        })
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, tmp_path, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _write_csv_atomic(df, path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+#Schreibt eine Tabelle ohne Referenztage im gewählten Format (Dateiendung wird ergänzt), Rückgabe des Pfads
+def write_frame(df, path_without_ext, fmt="parquet"):
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"Unbekanntes Ausgabeformat '{fmt}', erlaubt: {', '.join(RESULT_FORMATS)}")
+    path = f"{path_without_ext}.{fmt}"
+    if fmt == "parquet":
+        return write_parquet(df, path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    _write_csv_atomic(df, path)
+    return path
+
+
+#Referenztage als JSON-taugliches Dictionary Kriterium -> Liste von ISO-Daten
+def _reference_dates(ref_days):
+    return {key: [day.isoformat() for day, _, _, _ in ranked] for key, ranked in ref_days.items()}
+
+
+#Bisherige CSV-Ausgabe: gesamte Zeitreihe und je Kriterium der beste Referenztag als eigene Datei im Ordner <MM>_<JJJJ>
+def write_csv(df, output_path, base_filename, ref_days):
+    df = df.assign(date=pd.to_datetime(df['timestamp']).dt.date)
+    files = {base_filename + ".csv": df}
+    for key, ranked in ref_days.items():
+        _, lo, hi, _ = ranked[0]
+        files[f"{base_filename}_{key}.csv"] = day_profile(df, lo, hi)
+
+    os.makedirs(output_path, exist_ok=True)
+    for filename, frame in files.items():
+        _write_csv_atomic(frame, os.path.join(output_path, filename))
+    return [os.path.join(output_path, filename) for filename in files]
+
+
+#Aktualisiert den Referenztag-Index des Ausgabeordners (Szenario -> Monat -> Kriterium -> Datum)
+def update_reference_index(output_base_path, case, dates, ref_days):
+    path = os.path.join(output_base_path, REFERENCE_INDEX_FILE)
+    index = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            index = json.load(f)
+    index.setdefault(case, {})[_chunk_label(dates)] = _reference_dates(ref_days)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _chunk_label(dates):
+    return f"{dates[0].isoformat()}_{dates[-1].isoformat()}"
+
+
+#Plot der Referenztage eines Szenarios
+def plot_reference_days(df, ref_days, case, season, year, path):
+    # --- Plots der Referenztage --- (matplotlib erst hier importieren)
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    labels = {
+        "max_day": "Max Leistung Tag",
+        "min_day": "Min Leistung Tag",
+        "volatile_day": "Volatile Tag",
+        "sharp_change_day": "Sharp Change Tag",
+        "min_energy_day": "Min Energie Tag",
+        "low_output_streak_day": "Längste Schwachlast Tag",
+    }
+
+    plt.figure(figsize=(12, 8))
+    for key, ranked in ref_days.items():
+        day, lo, hi, _ = ranked[0]
+        profile = day_profile(df, lo, hi)
+        plt.plot(pd.to_datetime(profile['timestamp']), profile['power_sum'], label=f"{labels.get(key, key)}: {day}")
+
+    # --- Einstellungen des Plots ---
+    plt.xlabel("Timestamp")
+    plt.ylabel("Leistung (MW)")
+    plt.title(f"Referenz-Tagesprofile für Szenario '{case}' - {season:02d}/{year}")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+
+    # Wasserzeichen hinzufügen (halbtransparent, diagonal)
+    plt.figtext(0.5, 0.5, "MH_EE", fontsize=40, color='gray', alpha=0.2, ha='center', va='center', rotation=30)
+
+    # Plot speichern
+    plt.savefig(path)
+    plt.close()
+    return path
+
+
+#Speichert die Zeitreihe eines Szenarios für einen Abschnitt samt Referenztagen (und optional Plot)
+#top_n: Anzahl Referenztage je Kriterium, low_threshold: Leistung in MW für die Schwachlast-Phasen
+#Rückgabe: Liste der geschriebenen Dateien
+def write_case_results(df, case, dates, output_base_path, fmt="parquet", plots=True, top_n=1, low_threshold=0.0):
+    if fmt not in RESULT_FORMATS:
+        raise ValueError(f"Unbekanntes Ausgabeformat '{fmt}', erlaubt: {', '.join(RESULT_FORMATS)}")
+    season, year = dates[0].month, dates[0].year
+    base_filename = f"time_series_{case}_{season:02d}_{year}"
+    with instrumentation.stage("reference_days", rows=len(df)):
+        ref_days = reference_days(df, top_n=top_n, low_threshold=low_threshold)
+
+    if fmt == "parquet":
+        with instrumentation.stage("write.parquet", rows=len(df)):
+            written = [write_parquet(df, partition_path(output_base_path, case, dates), ref_days)]
+        #Plots außerhalb der Partitionen, damit der Ordner results/ nur Parquet-Dateien enthält
+        output_path = os.path.join(output_base_path, PLOTS_DIR, f"{season:02d}_{year}")
+        os.makedirs(output_path, exist_ok=True)
+    else:
+        # Ordner mit season (zweistellig) und year als Name anlegen
+        output_path = os.path.join(output_base_path, f"{season:02d}_{year}")
+        with instrumentation.stage("write.csv", rows=len(df)):
+            written = write_csv(df, output_path, base_filename, ref_days)
+
+    update_reference_index(output_base_path, case, dates, ref_days)
+    if plots:
+        with instrumentation.stage("plots"):
+            written.append(plot_reference_days(df, ref_days, case, season, year,
+                                               os.path.join(output_path, f"{base_filename}_referenz_tage_plot.png")))
+    return written
@@ -0,0 +1,130 @@
+import os
+import json
+import hashlib
+import datetime
+import calendar
+from simulation.result_cache import RESULT_CACHE_PATH
+from simulation.calibration import load_calibration
+
+#Lange Simulationszeiträume werden in Monatsabschnitten gerechnet, jeder Abschnitt wird sofort auf die Platte geschrieben
+#Der Fortschritt steht in einer Statusdatei im Ausgabeordner, damit abgebrochene Läufe fortgesetzt werden können
+RUN_STATE_FILE = "run_state.json"
+
+
+#Zerlegt den Zeitraum [start_date, end_date] (inklusive) in Monatsabschnitte, Rückgabe Liste von Tageslisten
+def month_chunks(start_date, end_date):
+    if end_date < start_date:
+        raise ValueError(f"Enddatum {end_date} liegt vor dem Startdatum {start_date}")
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        month_end = datetime.date(chunk_start.year, chunk_start.month,
+                                  calendar.monthrange(chunk_start.year, chunk_start.month)[1])
+        chunk_end = min(month_end, end_date)
+        chunks.append([chunk_start + datetime.timedelta(days=i) for i in range((chunk_end - chunk_start).days + 1)])
+        chunk_start = chunk_end + datetime.timedelta(days=1)
+    return chunks
+
+
+def _chunk_key(dates):
+    return f"{dates[0].isoformat()}_{dates[-1].isoformat()}"
+
+
+#Kennung der Laufparameter: ein fortgesetzter Lauf muss dieselben Anlagen, Szenarien und Ausgabeoptionen verwenden
+def _run_signature(config, cases, options):
+    payload = json.dumps({"anlagen": config.get("anlagen", []), "cases": list(cases), **options},
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _state_path(output_base_path):
+    return os.path.join(output_base_path, RUN_STATE_FILE)
+
+
+#Liest den Laufstatus oder legt einen neuen an (resume=False verwirft einen vorhandenen Status)
+#resume=None: passender Status wird fortgesetzt, ein Status eines anderen Laufs mit Warnung verworfen (Ausgabe wird überschrieben)
+#resume=True: ausdrücklich fortsetzen, ein nicht passender Status ist ein Fehler
+#options: Ausgabeoptionen (Format, Auflösung, ...), die Teil der Kennung sind
+def load_run_state(output_base_path, config, cases, resume=None, options=None):
+    signature = _run_signature(config, cases, options or {})
+    path = _state_path(output_base_path)
+    if resume is not False and os.path.exists(path):
+        with open(path, "r") as f:
+            state = json.load(f)
+        if state.get("signature") == signature:
+            return state
+        if resume:
+            raise ValueError(f"Ausgabeordner '{output_base_path}' gehört zu einem Lauf mit anderen Anlagen, Szenarien oder Ausgabeoptionen. "
+                             f"Anderen Ordner wählen oder ohne Fortsetzen (--no-resume) starten.")
+        print(f"Warnung: Laufstatus in '{output_base_path}' gehört zu anderen Anlagen, Szenarien oder Ausgabeoptionen, "
+              f"alle Monate werden neu gerechnet und überschrieben")
+    return {"signature": signature, "cases": list(cases), "completed": {}}
+
+
+#Schreibt den Laufstatus atomar (temporäre Datei + Umbenennen)
+def save_run_state(output_base_path, state):
+    os.makedirs(output_base_path, exist_ok=True)
+    path = _state_path(output_base_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+#Simuliert den Zeitraum [start_date, end_date] Monat für Monat und schreibt jeden Abschnitt sofort in den Ausgabeordner
+#Bereits abgeschlossene Abschnitte (laut Statusdatei und vorhandenen Dateien) werden übersprungen (resume siehe load_run_state)
+#top_n Referenztage je Kriterium, Schwachlast-Schwelle als Anteil der installierten Leistung aller Anlagen
+#result_cache: Pfad des Ergebnis-Caches, unveränderte Anlagen und Tage werden daraus übernommen (None: alles neu rechnen)
+def run_range(config, start_date, end_date, cases, output_base_path="output/", resume=None, plots=True, processes=None,
+              fmt="parquet", top_n=1, low_output_fraction=None, resolution=None, resample_method="linear",
+              result_cache=RESULT_CACHE_PATH):
+    from multiprocessing import Pool, cpu_count
+    from tqdm import tqdm
+    from simulation.simulator import simulate_period, RESOLUTION_MIN
+    from simulation.result_writer import write_case_results
+    from simulation.reference_days import DEFAULT_LOW_OUTPUT_FRACTION
+
+    cases = list(cases)
+    resolution = resolution or RESOLUTION_MIN
+    if low_output_fraction is None:
+        low_output_fraction = DEFAULT_LOW_OUTPUT_FRACTION
+    capacity = sum(float(anlage.get("leistung_mw", 0)) for anlage in config.get("anlagen", []))
+    low_threshold = low_output_fraction * capacity
+    chunks = month_chunks(start_date, end_date)
+    options = {"format": fmt, "resolution": resolution, "resample_method": resample_method}
+    #Geänderte Kalibrierung ändert die Ergebnisse --> Teil der Kennung (nur wenn verwendet)
+    if config.get("pv_calibration"):
+        options["pv_calibration"] = {name: entry.get("k_g") for name, entry in load_calibration(config["pv_calibration"]).items()}
+    state = load_run_state(output_base_path, config, cases, resume=resume, options=options)
+    save_run_state(output_base_path, state)
+
+    pending = []
+    for dates in chunks:
+        done = state["completed"].get(_chunk_key(dates))
+        if done and all(os.path.exists(path) for path in done):
+            continue
+        pending.append(dates)
+
+    if len(pending) < len(chunks):
+        print(f" {len(chunks) - len(pending)} von {len(chunks)} Monatsabschnitten bereits vorhanden, setze Lauf fort")
+    if not pending:
+        return state
+
+    processes = processes or cpu_count()
+    print(f" Starte Multiprocessing mit {processes} Kernen für {len(pending)} Monatsabschnitte...")
+    #Ein Pool für den gesamten Lauf, die Ergebnisse eines Abschnitts werden nach dem Schreiben verworfen
+    with Pool(processes) as pool:
+        for dates in tqdm(pending, desc="Simuliere Monatsabschnitte"):
+            results = simulate_period(config, dates, cases, pool=pool, processes=processes, show_progress=False,
+                                      resolution=resolution, resample_method=resample_method, result_cache=result_cache)
+            written = []
+            for case in cases:
+                written.extend(write_case_results(results[case], case, dates, output_base_path, fmt=fmt, plots=plots,
+                                                  top_n=top_n, low_threshold=low_threshold))
+            del results
+
+            #Abschnitt erst nach dem vollständigen Schreiben als erledigt markieren
+            state["completed"][_chunk_key(dates)] = written
+            save_run_state(output_base_path, state)
+
+    return state
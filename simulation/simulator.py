@@ -1,94 +1,160 @@
-from geopy.geocoders import Nominatim
 from models.pv_model import PVModel
 from models.wind_model import WindModel
-from utils.data_loader_dwd import load_weather_data
+from utils.data_loader_dwd import prepare_weather, load_weather_prepared
+from utils.stations import get_station_coords, nearest_station, geocode
+from utils.dwd_download import prefetch_archives
+from simulation.resampling import resample_ns
+from simulation.result_cache import RESULT_CACHE_PATH, open_result_cache, cached_profile
+from simulation.calibration import load_calibration, apply_calibration
+from utils import instrumentation
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import datetime
 import calendar
 from multiprocessing import Pool, cpu_count
 from tqdm import tqdm
 
+#Standard-Zielauflösung der Ergebnisse in Minuten (DWD-Daten liegen in 10-Minuten-Werten vor)
+RESOLUTION_MIN = 5
+#Zusätzlicher Wetterwert nach dem letzten Tag eines Abschnitts, damit die Umrechnung auf feinere Auflösungen
+#bis zum Tagesende reicht (z.B. 23:55 bei 5 Minuten), der Wert wird nach der Umrechnung wieder entfernt
+LOOKAHEAD = pd.Timedelta(minutes=10)
+#Anlagentypen mit Modell und DWD-Produkt, andere Typen werden übersprungen
+PLANT_TYPES = ("pv", "wind")
 
 
-#Lädt die in Kordinaten der config.yaml enthaltenen Anlagen einmalig um API zu schonen
-def resolve_locations(anlagen):
-    geolocator = Nominatim(user_agent="volture", timeout=5)
+#Ordnet Anlagen, die nur mit Koordinaten (lat/lon) angegeben sind, der nächstgelegenen Station mit Daten zu
+#start_date/end_date: nur Stationen, deren Daten den Simulationszeitraum abdecken
+def assign_stations(anlagen, start_date=None, end_date=None):
+    assigned = []
+    for anlage in anlagen:
+        if not anlage.get("standort") and anlage.get("lat") is not None and anlage.get("lon") is not None:
+            name, distance_km = nearest_station(anlage["lat"], anlage["lon"], start_date, end_date)
+            print(f"Anlage '{anlage['name']}' → nächste Station '{name}' ({distance_km:.1f} km)")
+            anlage = {**anlage, "standort": name}
+        assigned.append(anlage)
+    return assigned
+
+
+#Löst die Standorte der config.yaml einmalig über die Offline-Stationstabelle auf
+#Der Nominatim-Geocoder wird nur bei geocode_fallback=True für unbekannte Orte verwendet
+def resolve_locations(anlagen, geocode_fallback=False):
     standort_coords = {}
     for anlage in anlagen:
         location = anlage.get("standort")
         if not location or location in standort_coords:
             continue
-        try:
-            loc = geolocator.geocode(location)
-            if loc:
-                standort_coords[location] = {
-                    "latitude": float(loc.latitude),
-                    "longitude": float(loc.longitude)
-                }
-            else:
-                print(f"⚠️ Standort '{location}' konnte nicht aufgelöst werden.")
-        except Exception as e:
-            print(f"❌ Fehler beim Auflösen von '{location}': {e}")
+        coords = get_station_coords(location)
+        instrumentation.count("station_table.hits" if coords is not None else "station_table.misses")
+        if coords is None and geocode_fallback:
+            try:
+                coords = geocode(location)
+            except Exception as e:
+                print(f"❌ Fehler beim Auflösen von '{location}': {e}")
+        if coords:
+            standort_coords[location] = {
+                "latitude": coords[0],
+                "longitude": coords[1]
+            }
+        else:
+            print(f"⚠️ Standort '{location}' konnte nicht aufgelöst werden.")
     return standort_coords
 
 
-#Simuliert einzelne Tage
-def simulate_day(args):
-    ref_date, anlage, case, coords = args
-    name = anlage["name"]
-    power = anlage["leistung_mw"]
-    typ = anlage["typ"]
-    location = anlage["standort"]
+#Erzeugt das passende Modell zu einer Anlage, der Case des Modells ist nur Standardwert
+#Optionale Anlagenparameter aus der anlagen.yaml (fehlende Werte --> Standardwerte der Modelle)
+def _build_model(anlage, case, coords_tuple):
+    if anlage["typ"] == 'pv':
+        return PVModel(name=anlage["name"], rated_power=anlage["leistung_mw"], location=coords_tuple, case=case,
+                       albedo=anlage.get("albedo"), azimuth=anlage.get("azimuth"), tilt=anlage.get("tilt"),
+                       k_g=anlage.get("k_g"), k_t=anlage.get("k_t"))
+    if anlage["typ"] == 'wind':
+        return WindModel(name=anlage["name"], rated_power=anlage["leistung_mw"], location=coords_tuple, case=case,
+                         hub_height=anlage.get("hub_height"), turbine_rated_power=anlage.get("turbine_rated_power"))
+    return None
+
+
+#Simuliert alle Anlagen eines Standorts und Typs über einen Zeitraum (z.B. einen Monat) in einer Aufgabe
+#Die Wetterdaten hat der Hauptprozess bereits geparst, der Worker öffnet sie über den Deskriptor als Memory-Map
+#Die Modelle laufen über den ganzen Zeitraum für alle Szenarien
+#Rückgabe: (Zeitachse, Anlagen, Messwerte der Aufgabe für den Laufbericht)
+def simulate_station(args):
+    with instrumentation.task_scope() as metrics:
+        period_ns, plants = _simulate_station(*args)
+    return period_ns, plants, metrics.snapshot()
+
+
+def _simulate_station(location, typ, dates, anlagen, cases, coords, weather_ref, result_cache=None):
     latlon = coords.get(location)
 
     if not latlon:
-     raise ValueError(f" Keine Koordinaten für Standort '{location}' (Anlage: {name}). Simulation abgebrochen.")
+     raise ValueError(f" Keine Koordinaten für Standort '{location}'. Simulation abgebrochen.")
 
     #Koordinaten-Tuple erzeugen
     coords_tuple = (latlon["latitude"], latlon["longitude"])
 
-    ref_date_str = ref_date.strftime('%Y-%m-%d')
-    weather = load_weather_data(location, ref_date_str, typ)
-    #Modell initialisieren mit (lat, lon)-Tuple
-    if typ == 'pv':
-        model = PVModel(name=name, rated_power=power, location=coords_tuple, case=case)
-    elif typ == 'wind':
-        model = WindModel(name=name, rated_power=power, location=coords_tuple, case=case)
-    else:
-        return name, []
-
-    time_series = []
+    weather = load_weather_prepared(weather_ref, dates[0], dates[-1], lookahead=LOOKAHEAD)
+    timestamps = pd.DatetimeIndex(weather["datetime"])
 
-    # Initiale Werte
-    t1 = pd.to_datetime(weather[0]["datetime"])
-    p1 = model.simulate_power(weather[0])
-
-    for i in range(1, len(weather)):
-        t2 = pd.to_datetime(weather[i]["datetime"])
-        p2 = model.simulate_power(weather[i])
+    #Tagesgrenzen einmal per Binärsuche auf der sortierten Zeitachse bestimmen
+    #Nach jedem Tag, dessen Folgetag nicht mitsimuliert wird, zusätzlich der erste Wert des Folgetags (LOOKAHEAD)
+    requested = set(dates)
+    day_bounds = []
+    for ref_date in dates:
+        day_start = pd.Timestamp(ref_date)
+        day_end = day_start + pd.Timedelta(days=1)
+        lo, hi = timestamps.searchsorted([day_start, day_end])
+        if lo == hi:
+            print(f"Warnung: Keine Daten fuer '{location}' am {ref_date} ({typ}).")
+            continue
+        day_bounds.append((ref_date.isoformat(), lo, hi))
+        if ref_date + datetime.timedelta(days=1) not in requested:
+            next_lo, next_hi = timestamps.searchsorted([day_end, day_end + LOOKAHEAD])
+            if next_lo < next_hi:
+                day_bounds.append((day_end.isoformat(), next_lo, next_hi))
 
-        # Ursprünglicher 10-min-Punkt
-        time_series.append({"timestamp": t1, "power_mw": p1})
+    #Nur Zeitschritte der angefragten Tage zurückgeben, die Umrechnung der Auflösung erfolgt im Hauptprozess
+    index = np.concatenate([np.arange(lo, hi) for _, lo, hi in day_bounds]) if day_bounds else np.empty(0, dtype=np.int64)
+    #Kompakte Rückgabe: eine gemeinsame Zeitachse (int64, ns seit Epoche) und je Anlage und Szenario ein float64-Array
+    period_ns = np.asarray(timestamps.values.astype("datetime64[ns]").view(np.int64)[index])
 
-        # Interpolierter 5-min-Punkt
-        t_mid = t1 + (t2 - t1) / 2
-        p_mid = (p1 + p2) / 2
-        time_series.append({"timestamp": t_mid, "power_mw": p_mid})
+    #Anlagen mit gleicher Signatur (Ausrichtung bzw. Nabenhöhe und Turbine) teilen sich ein normiertes Profil,
+    #das nur einmal simuliert und je Anlage mit Nennleistung bzw. Turbinenanzahl skaliert wird
+    #Mit Ergebnis-Cache werden nur Tage simuliert, für die noch kein Profil mit gleicher Signatur und gleichen Wetterdaten vorliegt
+    cache = open_result_cache(result_cache) if result_cache else None
+    unit_profiles = {}
+    plants = []
+    for anlage in anlagen:
+        model = _build_model(anlage, cases[0], coords_tuple)
+        if model is None:
+            plants.append((anlage["name"], {case: np.zeros(len(index)) for case in cases}))
+            continue
 
-        # Verschiebe t1/p1 → t2/p2
-        t1 = t2
-        p1 = p2
+        signature = model.profile_signature()
+        instrumentation.count("unit_profiles.hits" if signature in unit_profiles else "unit_profiles.misses")
+        if signature not in unit_profiles and cache is not None:
+            unit_profiles[signature] = cached_profile(cache, model.unit_model(), signature, weather, weather_ref["out"],
+                                                      day_bounds, cases)
+        elif signature not in unit_profiles:
+            #Leistung wird über den gesamten Zeitraum vektorisiert und für alle Szenarien gemeinsam berechnet
+            powers = model.unit_model().simulate_series_cases(weather, cases)
+            unit_profiles[signature] = {case: np.asarray(powers[case], dtype=np.float64)[index] for case in cases}
+        scale = model.profile_scale()
+        plants.append((anlage["name"], {case: unit_profiles[signature][case] * scale for case in cases}))
 
-    # Letzten Originalpunkt noch ergänzen
-    time_series.append({"timestamp": t1, "power_mw": p1})
+    return period_ns, plants
 
-    return name, time_series
 
+#Einzelnes Szenario simulieren (kompatibel zum bisherigen Aufruf)
+def create_generators(config, season, case, year_input, result_cache=RESULT_CACHE_PATH):
+    return create_generators_multi(config, season, [case], year_input, result_cache=result_cache)[case]
 
-def create_generators(config, season, case, year_input):
-    generators = []
 
+#Simuliert alle Szenarien in einem Durchlauf: Standorte, Wetterdaten und Geometrie werden nur einmal geladen
+#Rückgabe: Dictionary case -> DataFrame mit allen Anlagen + power_sum (Standard: 5-Minuten-Werte, linear interpoliert)
+#result_cache: Pfad des Ergebnis-Caches (siehe simulation.result_cache), None rechnet alles neu
+def create_generators_multi(config, season, cases, year_input, resolution=RESOLUTION_MIN, resample_method="linear",
+                            result_cache=RESULT_CACHE_PATH):
     # Standard: ganzer Monat
     year, month = year_input, season
     start_date = datetime.date(year, month, 1)
@@ -104,72 +170,166 @@ def create_generators(config, season, case, year_input):
     # date_range = [datetime.date(2025, 5, 12)]
     # --------------------------------------
 
-    #Erstellt Standorte für alle Standorte der Anlagen die in Config gelistet sind
-    anlagen = config.get("anlagen", [])
-    standort_coords = resolve_locations(anlagen)
+    return simulate_period(config, date_range, cases, resolution=resolution, resample_method=resample_method,
+                           result_cache=result_cache)
 
-    #Taskliste die später mit Ausgaben gefüllt wird
-    tasks = []
 
+#Löst Standorte auf, lädt und parst die Wetterdaten und erstellt die Worker-Aufgaben für die angegebenen Tage
+#Rückgabe: (Anlagen mit zugeordneter Station, Liste der Aufgaben für simulate_station)
+def _prepare_tasks(config, date_range, cases, result_cache=None):
+    #Erstellt Standorte für alle Standorte der Anlagen die in Config gelistet sind
+    with instrumentation.stage("geocoding"):
+        anlagen = assign_stations(config.get("anlagen", []), date_range[0], date_range[-1])
+        #Kalibrierte Performance-Faktoren (python main.py --calibrate) auf die PV-Anlagen übertragen
+        if config.get("pv_calibration"):
+            anlagen = apply_calibration(anlagen, load_calibration(config["pv_calibration"]))
+        standort_coords = resolve_locations(anlagen, geocode_fallback=config.get("geocoding_fallback", False))
+
+    #Gruppiert Anlagen nach Standort und Typ (gleiche Wetterdaten) und den Zeitraum nach Monaten
+    groups = {}
     #Prüft ob alle Anlagen einen gültigen Standort zugeteilt bekommen haben --> ansonsten Warnung
     for anlage in anlagen:
         if not anlage.get("standort") or anlage["standort"] not in standort_coords:
             print(f"Anlage '{anlage['name']}' übersprungen (kein gültiger Standort).")
             continue
-        for ref_date in date_range:
-            #Erstellt die zu simulierenden Tage
-            tasks.append((ref_date, anlage, case, standort_coords))
+        if anlage.get("typ") not in PLANT_TYPES:
+            print(f"Anlage '{anlage['name']}' übersprungen (unbekannter Typ '{anlage.get('typ')}').")
+            continue
+        groups.setdefault((anlage["standort"], anlage["typ"]), []).append(anlage)
+
+    months = {}
+    for ref_date in date_range:
+        months.setdefault((ref_date.year, ref_date.month), []).append(ref_date)
+
+    #Alle benötigten DWD-Archive vorab parallel laden, damit Worker nur noch lokale Dateien lesen
+    valid_anlagen = [anlage for group in groups.values() for anlage in group]
+    with instrumentation.stage("dwd.prefetch"):
+        summary = prefetch_archives(valid_anlagen, date_range[0], date_range[-1], max_workers=config.get("download_workers", 8))
+    instrumentation.count("archive_cache.hits", summary["cached"])
+    instrumentation.count("archive_cache.revalidated_hits", summary["not_modified"])
+    instrumentation.count("archive_cache.stale_hits", summary["stale"])
+    instrumentation.count("archive_cache.misses", summary["downloaded"])
+    if summary["downloaded"]:
+        print(f" {summary['downloaded']} DWD-Archive heruntergeladen ({summary['cached']} bereits lokal vorhanden)")
 
-    print(f" Starte Multiprocessing mit {cpu_count()} Kernen für {len(tasks)} Aufgaben...")
-    #Pool ist Klasse aus Multiprocessing Modul , pool ist selbstgewählt Instanz der Klasse
-    with Pool(cpu_count()) as pool:
+    #Jedes Archiv wird einmal im Hauptprozess geparst, Worker erhalten nur Deskriptoren auf die Memory-Map-Speicher
+    with instrumentation.stage("weather.prepare"):
+        weather_refs = {(location, typ): prepare_weather(location, typ, date_range[0], date_range[-1])
+                        for location, typ in groups}
+
+    #Eine Aufgabe je (Standort, Typ, Monat) statt je (Anlage, Tag)
+    tasks = []
+    for (location, typ), group in groups.items():
+        for dates in months.values():
+            tasks.append((location, typ, dates, group, cases, standort_coords, weather_refs[(location, typ)], result_cache))
+    return anlagen, tasks
+
+
+#Simuliert beliebige Tage (Liste von datetime.date) für alle Szenarien
+#Ein bestehender Pool kann übergeben werden, damit lange Läufe ihn über alle Abschnitte wiederverwenden
+#resolution: Zielauflösung in Minuten, resample_method: "linear", "step" oder "mean" (siehe simulation.resampling)
+#result_cache: Pfad des persistenten Ergebnis-Caches, None rechnet alle Anlagen und Tage neu
+def simulate_period(config, date_range, cases, pool=None, processes=None, show_progress=True,
+                    resolution=RESOLUTION_MIN, resample_method="linear", result_cache=RESULT_CACHE_PATH):
+    cases = list(cases)
+    anlagen, tasks = _prepare_tasks(config, date_range, cases, result_cache)
+
+    own_pool = pool is None
+    processes = processes or cpu_count()
+    chunksize = max(1, len(tasks) // (processes * 4))
+    if own_pool:
+        print(f" Starte Multiprocessing mit {processes} Kernen für {len(tasks)} Aufgaben...")
+        #Pool ist Klasse aus Multiprocessing Modul , pool ist selbstgewählt Instanz der Klasse
+        pool = Pool(processes)
+    try:
         #Erstellt leere Ergbnisliste
         results = []
+        task_metrics = []
         #Ermöglicht Fortschrittsanzeige
-        pbar = tqdm(total=len(tasks), desc="🔄 Simuliere Tage", leave=False)
-        #Übergibt alle Tasks an simulate_day Methode --> zeitgleiche Ausführung zu Performance-Steigerung
-        for result in pool.imap_unordered(simulate_day, tasks):
-            results.append(result)
-            pbar.update()
+        pbar = tqdm(total=len(tasks), desc="🔄 Simuliere Standorte", leave=False, disable=not show_progress)
+        #Übergibt alle Tasks an simulate_station Methode --> zeitgleiche Ausführung zu Performance-Steigerung
+        #Die Messwerte der Worker werden mit den Ergebnissen zurückgegeben und hier zusammengeführt
+        with instrumentation.stage("simulation") as measured:
+            for period_ns, plants, metrics in pool.imap_unordered(simulate_station, tasks, chunksize=chunksize):
+                results.append((period_ns, plants))
+                task_metrics.append(metrics)
+                pbar.update()
+        instrumentation.record_pool(processes, measured["wall_s"], task_metrics)
         pbar.close()
+    finally:
+        if own_pool:
+            pool.close()
+            pool.join()
 
-    #Leere generator_map (Dictionary) wird erstellt
-    generator_map = {}
-
-    #Gruppiert alle Zeitreihen pro Anlage
-    for name, times in results:
-        if name not in generator_map:
-            generator_map[name] = []
-        generator_map[name].extend(times)
-
-    for name, times in generator_map.items():
-        typ = next((a["typ"] for a in anlagen if a["name"] == name), "unknown")
-        location = next((a["standort"] for a in anlagen if a["name"] == name), "unknown")
-        generators.append({
-            "name": name,
-            "typ": typ,
-            "location": location,
-            "time_series": times
-        })
-        
-    all_series = []
-
-    #Zeitreihen in DataFrames umwandeln (Tabelle aus timestamp und power)
-    for gen in generators:
-        name = gen["name"]  # z. B. "Windpark_Nord"
-        ts = pd.DataFrame(gen["time_series"])
-        ts['timestamp'] = pd.to_datetime(ts['timestamp'])
-        ts = ts.sort_values('timestamp')
-        ts = ts.set_index('timestamp')
-        ts = ts.rename(columns={"power_mw": name})  # Spalte eindeutig benennen
-        all_series.append(ts)
-
-    #Zeitreihen aller Anlagen zusammenführen
-    total_df = pd.concat(all_series, axis=1).fillna(0)
-    #Summierung der Leistung 
-    #Summierte Leistung als neue Spalte hinzufügen
-    total_df['power_sum'] = total_df.sum(axis=1)
- 
+    return _collect_results(results, anlagen, cases, resolution, resample_method, date_range)
+
+
+#Setzt die Worker-Ergebnisse (Liste von (Zeitachse, Anlagen)) je Szenario zu DataFrames zusammen
+#dates: simulierte Tage, Werte anderer Tage (LOOKAHEAD) werden nach der Umrechnung der Auflösung entfernt
+def _collect_results(results, anlagen, cases, resolution=RESOLUTION_MIN, resample_method="linear", dates=None):
+    #Leere generator_map (Dictionary je Szenario) wird erstellt
+    generator_map = {case: {} for case in cases}
+
+    #Gruppiert alle Zeitreihen pro Szenario und Anlage (je Monat ein Teilstück aus Zeitachse und Werten)
+    for period_ns, plants in results:
+        for name, case_series in plants:
+            for case, values in case_series.items():
+                generator_map[case].setdefault(name, []).append((period_ns, values))
 
-    #Rückgabe der typischen Tagesprofile als DataFrames
-    return total_df.reset_index()
\ No newline at end of file
+    names = [anlage["name"] for anlage in anlagen if any(anlage["name"] in generator_map[case] for case in cases)]
+    with instrumentation.stage("assemble") as measured:
+        frames = {case: _assemble_case(generator_map[case], names, resolution, resample_method) for case in cases}
+        if dates is not None:
+            frames = {case: _trim_to_days(df, dates) for case, df in frames.items()}
+        measured["rows"] = sum(len(df) for df in frames.values())
+    return frames
+
+
+#Behält nur Zeitschritte der angegebenen Tage
+def _trim_to_days(df, dates):
+    day_ns = pd.Timedelta(days=1).value
+    timestamps_ns = df["timestamp"].to_numpy().astype("datetime64[ns]").view(np.int64)
+    day_starts = np.array([pd.Timestamp(d).value for d in dates], dtype=np.int64)
+    keep = np.isin(timestamps_ns - timestamps_ns % day_ns, day_starts)
+    return df if keep.all() else df[keep].reset_index(drop=True)
+
+
+#Führt eine einzelne Worker-Aufgabe (erste Aufgabe bzw. erste zum Standort passende) im Hauptprozess unter einem Profiler aus
+#engine: "cprofile" oder "pyinstrument", output: Profildatei (.prof bzw. .html)
+def profile_task(config, date_range, cases, location=None, engine="cprofile", output=None, result_cache=None):
+    _, tasks = _prepare_tasks(config, date_range, list(cases), result_cache)
+    matching = [task for task in tasks if location is None or task[0] == location]
+    if not matching:
+        raise ValueError(f"Keine Aufgabe für Standort '{location}' gefunden")
+    task = matching[0]
+    print(f" Profiliere Aufgabe {task[0]} ({task[1]}, {task[2][0]} bis {task[2][-1]}, {len(task[3])} Anlagen) mit {engine}")
+    return instrumentation.profile_call(simulate_station, task, engine=engine, output=output)
+
+
+#Führt die Zeitreihen aller Anlagen eines Szenarios zu einem DataFrame zusammen
+#Die Teilstücke einer Anlage werden verbunden und in einem Schritt auf die Zielauflösung umgerechnet,
+#danach wird die Matrix Zeit x Anlage über Positionen auf der gemeinsamen Zeitachse befüllt
+#Fehlende Werte einer Anlage bleiben 0, Spaltenreihenfolge wie in der Konfiguration
+def _assemble_case(case_map, names, resolution=RESOLUTION_MIN, resample_method="linear"):
+    names = [name for name in names if name in case_map]
+    series = []
+    for name in names:
+        pieces = case_map[name]
+        timestamps_ns = np.concatenate([period_ns for period_ns, _ in pieces])
+        powers = np.concatenate([values for _, values in pieces])
+        order = np.argsort(timestamps_ns, kind="stable")
+        timestamps_ns, powers = timestamps_ns[order], powers[order]
+        #Der LOOKAHEAD-Wert eines Monats ist zugleich erster Wert des nächsten Monats --> doppelte Zeitstempel nur einmal
+        unique = np.r_[True, np.diff(timestamps_ns) > 0]
+        series.append(resample_ns(timestamps_ns[unique], powers[unique], resolution, resample_method))
+
+    time_axis = np.unique(np.concatenate([ts for ts, _ in series])) if series else np.empty(0, dtype=np.int64)
+    matrix = np.zeros((len(time_axis), len(names)))
+    for column, (ts, values) in enumerate(series):
+        matrix[np.searchsorted(time_axis, ts), column] = values
+
+    #Summierte Leistung als neue Spalte hinzufügen
+    total_df = pd.DataFrame(matrix, columns=names)
+    total_df.insert(0, "timestamp", pd.DatetimeIndex(time_axis.view("datetime64[ns]")))
+    total_df['power_sum'] = matrix.sum(axis=1)
+    return total_df
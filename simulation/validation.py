@@ -0,0 +1,264 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from utils import instrumentation
+
+#Validierung der PV-Simulation gegen Messreihen: alle Messdateien eines Ordners werden mit den Anlagendaten aus sites.yaml
+#simuliert (Worker-Aufgaben aller Anlagen in einem gemeinsamen Pool), die beste Zeitverschiebung je Anlage und Szenario
+#wird per FFT-Kreuzkorrelation auf einem 1-Minuten-Raster bestimmt und die Messwerte mit einem merge_asof zugeordnet
+#Kennzahlen je Anlage, Szenario und Tag: Korrelation, RMSE, MBE (Simulation - Messung) und Energieabweichung
+VALIDATION_DIR = "validation data pv"
+SITES_FILE = "sites.yaml"
+VALIDATION_OUTPUT_DIR = "validation"
+DEFAULT_TIMEZONE = "Europe/Berlin"
+#Zeitverschiebung der Simulation wird im Bereich [-MAX_LAG_MIN, MAX_LAG_MIN] Minuten gesucht, 0 schaltet die Suche ab
+MAX_LAG_MIN = 60
+#Auflösung der Simulation für die Zuordnung und maximale Zeitdifferenz eines Messwerts zum Simulationswert
+RESOLUTION_MIN = 1
+MATCH_TOLERANCE = pd.Timedelta(minutes=1)
+FILE_PATTERN = re.compile(r"^(?P<name>.+?)\s+(?P<mw>[0-9.]+)\s*MW\.csv$", re.IGNORECASE)
+
+
+#Anlagen eines Validierungsordners: Einträge aus sites.yaml, sonst Name und Leistung aus dem Dateinamen
+#Rückgabe: (Liste von Anlagen-Dictionaries mit 'file', Zeitzone der Messwerte)
+def load_sites(folder=VALIDATION_DIR):
+    from utils.data_loader_dwd import load_yaml_config
+
+    settings = {}
+    sites_path = os.path.join(folder, SITES_FILE)
+    if os.path.exists(sites_path):
+        settings = load_yaml_config(sites_path) or {}
+    configured = {site["file"]: site for site in settings.get("sites", [])}
+
+    sites = []
+    for file in sorted(os.listdir(folder)):
+        if not file.lower().endswith(".csv"):
+            continue
+        site = dict(configured.get(file, {}))
+        if not site:
+            match = FILE_PATTERN.match(file)
+            if match is None:
+                print(f"⚠️ Messdatei '{file}' übersprungen (kein Eintrag in {SITES_FILE} und Dateiname nicht '<Name> <MW> MW.csv').")
+                continue
+            site = {"name": match["name"], "leistung_mw": float(match["mw"]), "standort": match["name"]}
+        site.setdefault("name", os.path.splitext(file)[0])
+        site.update({"file": file, "typ": "pv"})
+        sites.append(site)
+    return sites, settings.get("timezone", DEFAULT_TIMEZONE)
+
+
+#Liest eine Messreihe (";"-getrennt, ohne Kopfzeile) und rechnet die Zeitstempel von Ortszeit in UTC um
+#Rückgabe: DataFrame mit timestamp (UTC, sortiert), day (Tag in Ortszeit) und value
+def read_measurements(path, timezone=DEFAULT_TIMEZONE):
+    df = pd.read_csv(path, sep=";", header=None, names=["timestamp", "value"], skipinitialspace=True)
+    local = pd.to_datetime(df["timestamp"].str.strip(), format="%Y/%m/%d %H:%M:%S")
+    utc = pd.DatetimeIndex(local).tz_localize(timezone, ambiguous="NaT", nonexistent="shift_forward").tz_convert(None)
+    result = pd.DataFrame({
+        "timestamp": utc.astype("datetime64[ns]"),
+        "day": local.dt.date,
+        "value": pd.to_numeric(df["value"], errors="coerce"),
+    })
+    result = result.dropna(subset=["timestamp", "value"])
+    return result.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+
+#Simuliert alle Anlagen für ihre Messtage, die Aufgaben aller Anlagen laufen gemeinsam in einem Pool
+#Rückgabe: Dictionary Anlagenname -> {case: DataFrame mit timestamp und power (MW)}
+def simulate_sites(sites, measurements, cases, processes=None, result_cache=None, geocoding_fallback=False):
+    from multiprocessing import Pool, cpu_count
+    from simulation.simulator import _prepare_tasks, _collect_results, simulate_station
+
+    prepared = []
+    tasks = []
+    for site in sites:
+        days = sorted(set(measurements[site["name"]]["timestamp"].dt.date))
+        config = {"anlagen": [{key: value for key, value in site.items() if key != "file"}],
+                  "geocoding_fallback": geocoding_fallback}
+        anlagen, site_tasks = _prepare_tasks(config, days, cases, result_cache)
+        prepared.append((site["name"], anlagen, len(tasks), len(tasks) + len(site_tasks)))
+        tasks.extend(site_tasks)
+
+    processes = min(processes or cpu_count(), max(1, len(tasks)))
+    print(f" Validierung: {len(sites)} Anlagen, {len(tasks)} Aufgaben auf {processes} Kernen")
+    with Pool(processes) as pool:
+        with instrumentation.stage("simulation") as measured:
+            outputs = pool.map(simulate_station, tasks)
+    instrumentation.record_pool(processes, measured["wall_s"], [metrics for _, _, metrics in outputs])
+
+    simulated = {}
+    for name, anlagen, lo, hi in prepared:
+        results = [(period_ns, plants) for period_ns, plants, _ in outputs[lo:hi]]
+        days = sorted(set(measurements[name]["timestamp"].dt.date))
+        frames = _collect_results(results, anlagen, cases, RESOLUTION_MIN, "linear", days)
+        simulated[name] = {case: pd.DataFrame({"timestamp": df["timestamp"], "power": df[name]})
+                           for case, df in frames.items() if name in df}
+    return simulated
+
+
+#Zirkuläre Kreuzkorrelation sum_t a[t] * b[t - lag] für alle Verschiebungen über FFT (size >= 2 * Länge, daher ohne Überlappung)
+def _cross(a_fft, b_fft, size):
+    return np.fft.irfft(a_fft * np.conj(b_fft), size)
+
+
+#Beste Zeitverschiebung der Simulation (positiv: Simulation später) nach Pearson-Korrelation mit den Messwerten
+#Simulation und Messwerte werden auf ein gemeinsames 1-Minuten-Raster gelegt, Messwerte auf die nächste Minute gerundet;
+#für alle Verschiebungen werden die benötigten Summen in drei FFT-Kreuzkorrelationen berechnet statt je Verschiebung
+#Rückgabe: (Verschiebung in Minuten, Korrelation)
+def best_lag(sim_ns, sim_values, meas_ns, meas_values, max_lag=MAX_LAG_MIN):
+    step = pd.Timedelta(minutes=1).value
+    sim_ns, meas_ns = np.asarray(sim_ns, dtype=np.int64), np.asarray(meas_ns, dtype=np.int64)
+    if len(sim_ns) == 0 or len(meas_ns) < 3:
+        return 0, np.nan
+
+    origin = sim_ns[0] // step * step
+    length = int((max(sim_ns[-1], meas_ns[-1]) - origin) // step) + max_lag + 2
+    sim = np.zeros(length)
+    sim[(sim_ns - origin) // step] = sim_values
+    positions = np.round((meas_ns - origin) / step).astype(np.int64)
+    valid = positions >= 0
+    mask = np.zeros(length)
+    meas = np.zeros(length)
+    mask[positions[valid]] = 1.0
+    meas[positions[valid]] = np.asarray(meas_values, dtype=np.float64)[valid]
+
+    size = 2 * length
+    sim_fft, sim2_fft = np.fft.rfft(sim, size), np.fft.rfft(sim ** 2, size)
+    mask_fft, meas_fft = np.fft.rfft(mask, size), np.fft.rfft(meas, size)
+    lags = np.arange(-max_lag, max_lag + 1)
+    s = _cross(mask_fft, sim_fft, size)[lags]
+    ss = _cross(mask_fft, sim2_fft, size)[lags]
+    ms = _cross(meas_fft, sim_fft, size)[lags]
+
+    n, m, mm = mask.sum(), meas.sum(), (meas ** 2).sum()
+    denominator = np.sqrt(np.clip(n * mm - m ** 2, 0, None) * np.clip(n * ss - s ** 2, 0, None))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = np.where(denominator > 0, (n * ms - m * s) / denominator, np.nan)
+    if np.all(np.isnan(corr)):
+        return 0, np.nan
+    #Bei Gleichstand gewinnt die betragsmäßig kleinste Verschiebung
+    order = np.argsort(np.abs(lags), kind="stable")
+    best = order[np.nanargmax(corr[order])]
+    return int(lags[best]), float(corr[best])
+
+
+#Kennzahlen je Gruppe aus den zugeordneten Paaren (sim, value), Energie per Trapezregel über die Messzeitpunkte
+def _metrics(pairs, keys):
+    pairs = pairs.sort_values(keys + ["timestamp"], kind="stable").reset_index(drop=True)
+    following = pairs.groupby(keys, sort=False)[["timestamp", "sim", "value"]].shift(-1)
+    hours = (following["timestamp"] - pairs["timestamp"]).dt.total_seconds() / 3600
+    pairs = pairs.assign(
+        error=pairs["sim"] - pairs["value"],
+        sim_energy=((pairs["sim"] + following["sim"]) / 2 * hours).fillna(0.0),
+        meas_energy=((pairs["value"] + following["value"]) / 2 * hours).fillna(0.0),
+    )
+    pairs["squared_error"] = pairs["error"] ** 2
+
+    grouped = pairs.groupby(keys, sort=True)
+    result = grouped.agg(
+        pairs=("value", "size"),
+        mbe_mw=("error", "mean"),
+        mse=("squared_error", "mean"),
+        energy_sim_mwh=("sim_energy", "sum"),
+        energy_meas_mwh=("meas_energy", "sum"),
+    )
+    result["corr"] = grouped[["sim", "value"]].corr().xs("sim", level=-1)["value"]
+    result["rmse_mw"] = np.sqrt(result.pop("mse"))
+    result["energy_error"] = np.where(result["energy_meas_mwh"] > 0,
+                                      result["energy_sim_mwh"] / result["energy_meas_mwh"] - 1, np.nan)
+    return result.reset_index()
+
+
+#Liest alle Messreihen eines Ordners und simuliert die zugehörigen Anlagen
+#Rückgabe: (Anlagen, Messreihen je Anlagenname, Simulation je Anlagenname und Szenario, siehe simulate_sites)
+#overrides=False: in sites.yaml gesetzte Performance-Faktoren (k_g, k_t) nicht verwenden (Kalibrierung gegen Tabellenwerte)
+def load_and_simulate(folder=VALIDATION_DIR, cases=("best", "worst", "normal"), processes=None, result_cache=None,
+                      overrides=True):
+    sites, timezone = load_sites(folder)
+    if not sites:
+        raise ValueError(f"Keine Messdateien in '{folder}' gefunden")
+    if not overrides:
+        sites = [{key: value for key, value in site.items() if key not in ("k_g", "k_t")} for site in sites]
+    with instrumentation.stage("validation.read", rows=0) as measured:
+        measurements = {site["name"]: read_measurements(os.path.join(folder, site["file"]), timezone) for site in sites}
+        measured["rows"] = sum(len(df) for df in measurements.values())
+    return sites, measurements, simulate_sites(sites, measurements, list(cases), processes, result_cache)
+
+
+#Beste Verschiebung je Anlage und Szenario, danach eine gemeinsame Zuordnung aller Messwerte per merge_asof
+#Rückgabe: (Paare mit site, case, timestamp, day, value, sim; Simulation mit Verschiebung; Verschiebungen je Anlage und Szenario)
+def align(measurements, simulated, max_lag=MAX_LAG_MIN):
+    lags = []
+    sim_parts = []
+    with instrumentation.stage("validation.lag_search"):
+        for name, frames in simulated.items():
+            meas = measurements[name]
+            meas_ns = meas["timestamp"].to_numpy().astype("datetime64[ns]").view(np.int64)
+            for case, sim in frames.items():
+                sim_ns = sim["timestamp"].to_numpy().astype("datetime64[ns]").view(np.int64)
+                lag, lag_corr = best_lag(sim_ns, sim["power"].to_numpy(), meas_ns, meas["value"].to_numpy(), max_lag)
+                lags.append({"site": name, "case": case, "lag_min": lag, "lag_corr": lag_corr})
+                sim_parts.append(pd.DataFrame({"site": name, "case": case,
+                                               "timestamp": sim["timestamp"] + pd.Timedelta(minutes=lag),
+                                               "sim": sim["power"].to_numpy()}))
+    if not sim_parts:
+        raise ValueError("Keine Simulationsergebnisse für die Messreihen")
+
+    with instrumentation.stage("validation.align") as measured:
+        cases = sorted({part["case"].iloc[0] for part in sim_parts})
+        left = pd.concat([df.assign(site=name) for name, df in measurements.items() if name in simulated], ignore_index=True)
+        left = left.merge(pd.DataFrame({"case": cases}), how="cross").sort_values("timestamp", kind="stable")
+        shifted = pd.concat(sim_parts, ignore_index=True).sort_values("timestamp", kind="stable")
+        pairs = pd.merge_asof(left, shifted, on="timestamp", by=["site", "case"], direction="nearest",
+                              tolerance=MATCH_TOLERANCE).dropna(subset=["sim"])
+        measured["rows"] = len(pairs)
+    return pairs, shifted, pd.DataFrame(lags)
+
+
+#Validiert alle Messreihen eines Ordners, Rückgabe (Kennzahlen je Anlage/Szenario/Tag, Zusammenfassung je Anlage/Szenario)
+def validate_folder(folder=VALIDATION_DIR, cases=("best", "worst", "normal"), max_lag=MAX_LAG_MIN, processes=None,
+                    result_cache=None, output_base_path=None, plots=True):
+    _, measurements, simulated = load_and_simulate(folder, cases, processes, result_cache)
+    pairs, shifted, lags = align(measurements, simulated, max_lag)
+
+    daily = _metrics(pairs, ["site", "case", "day"])
+    summary = _metrics(pairs, ["site", "case"]).merge(lags, on=["site", "case"], how="left")
+
+    if output_base_path:
+        from simulation.result_writer import write_frame
+
+        path = os.path.join(output_base_path, VALIDATION_OUTPUT_DIR)
+        write_frame(daily, os.path.join(path, "validation_daily"), "csv")
+        write_frame(summary, os.path.join(path, "validation_summary"), "csv")
+        if plots:
+            for name in simulated:
+                plot_site(measurements[name], shifted[shifted["site"] == name], lags[lags["site"] == name], name,
+                          os.path.join(path, "plots", f"{name}.png"))
+        print(f" Validierungsergebnisse gespeichert: {path}")
+    return daily, summary
+
+
+#Plot der Messreihe mit den (verschobenen) Simulationen aller Szenarien
+def plot_site(measurements, simulated, lags, name, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    start, end = measurements["timestamp"].min().normalize(), measurements["timestamp"].max().normalize() + pd.Timedelta(days=1)
+    plt.figure(figsize=(12, 5))
+    for case, sim in simulated.groupby("case"):
+        sim = sim[(sim["timestamp"] >= start) & (sim["timestamp"] < end)]
+        lag = int(lags.loc[lags["case"] == case, "lag_min"].iloc[0])
+        plt.plot(sim["timestamp"], sim["sim"], label=f"Simulation {case} ({lag:+d} min)")
+    plt.plot(measurements["timestamp"], measurements["value"], label="Messwert", color="black", linestyle="dashed", marker=".")
+
+    plt.xlabel("Zeit (UTC)")
+    plt.ylabel("Leistung (MW)")
+    plt.title(f"Simulation vs. Messwert {name}")
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    plt.savefig(path)
+    plt.close()
+    return path
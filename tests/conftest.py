@@ -0,0 +1,56 @@
+import os
+import sys
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import pytest
+
+#Projektverzeichnis für die Imports (models, simulation, utils), Tests laufen mit "python -m pytest" aus dem Projektverzeichnis
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+#Jeder Test arbeitet in einem eigenen Verzeichnis (cache/ und output/ sind relativ zum Arbeitsverzeichnis)
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    from utils import data_loader_dwd
+
+    monkeypatch.chdir(tmp_path)
+    data_loader_dwd._revalidated.clear()
+    data_loader_dwd.clear_parse_cache()
+    return tmp_path
+
+
+#Lokaler HTTP-Server mit der Verzeichnisstruktur des DWD-Servers (<typ>/historical/..., <typ>/recent/...)
+#DWD_BASE_URL zeigt während des Tests auf den Server, Rückgabe (URL, Wurzelverzeichnis)
+@pytest.fixture
+def dwd_server(tmp_path_factory, monkeypatch):
+    from utils import data_loader_dwd
+
+    root = tmp_path_factory.mktemp("dwd_server")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(data_loader_dwd, "DWD_BASE_URL", url)
+    yield url, root
+    server.shutdown()
+    server.server_close()
+
+
+#Legt synthetische Archive für [start, end) auf dem Testserver ab (Dateinamen wie archives_for_range sie erwartet)
+def publish(root, station_id, data_type, start, end, archive_start=None, archive_end=None):
+    from benchmarks.fixtures import write_dwd_zip
+    from utils.data_loader_dwd import archives_for_range
+
+    paths = []
+    for _, _, url, local_path in archives_for_range(station_id, data_type, start, end):
+        kind = "historical" if "/historical/" in url else "recent"
+        path = os.path.join(str(root), data_type, kind, os.path.basename(local_path))
+        paths.append(write_dwd_zip(path, station_id, data_type, archive_start or start, archive_end or end))
+    return paths
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from models.pv_model import K_G_TABLE
+from simulation.calibration import fit_monthly_k_g
+
+
+def _pairs(rng, site, months, k_g, per_month=48, noise=0.0):
+    rows = []
+    for month in months:
+        timestamps = pd.date_range(f"2025-{month:02d}-10 06:00", periods=per_month, freq="15min")
+        unit = np.clip(np.sin(np.arange(per_month) / per_month * np.pi), 0, None) * 3
+        sim = unit * K_G_TABLE["normal"][month - 1]
+        value = unit * k_g[month] + rng.normal(0, noise, per_month)
+        rows.append(pd.DataFrame({"site": site, "timestamp": timestamps, "value": value, "sim": sim}))
+    return rows
+
+
+def test_exact_fit_per_site_and_month():
+    rng = np.random.default_rng(1)
+    truth = {"A": {1: 0.6, 6: 0.9}, "B": {6: 0.75}}
+    pairs = pd.concat(_pairs(rng, "A", [1, 6], truth["A"]) + _pairs(rng, "B", [6], truth["B"]), ignore_index=True)
+    result = fit_monthly_k_g(pairs).set_index(["site", "month"])
+
+    assert list(result.index) == [("A", 1), ("A", 6), ("B", 6)]
+    for site, months in truth.items():
+        for month, k_g in months.items():
+            assert abs(result.loc[(site, month), "k_g_fit"] - k_g) < 1e-12
+            assert result.loc[(site, month), "rmse_after_mw"] < 1e-12
+    assert result.loc[("A", 1), "k_g_table"] == K_G_TABLE["normal"][0]
+
+
+def test_fit_matches_least_squares_and_limits():
+    rng = np.random.default_rng(2)
+    pairs = pd.concat(_pairs(rng, "A", [3], {3: 0.7}, noise=0.05), ignore_index=True)
+    fit = fit_monthly_k_g(pairs).iloc[0]
+    x = (pairs["sim"] / K_G_TABLE["normal"][2]).to_numpy()
+    expected = np.linalg.lstsq(x[:, None], pairs["value"].to_numpy(), rcond=None)[0][0]
+    assert abs(fit["k_g_fit"] - expected) < 1e-12
+    assert fit["rmse_after_mw"] <= fit["rmse_before_mw"]
+
+    #Zu wenige Paare mit Einstrahlung --> kein Wert, unplausibler Faktor --> auf die Grenzen begrenzt
+    few = pd.concat(_pairs(rng, "A", [3], {3: 0.7}, per_month=8), ignore_index=True)
+    assert np.isnan(fit_monthly_k_g(few).iloc[0]["k_g_fit"])
+    high = pd.concat(_pairs(rng, "A", [3], {3: 3.0}), ignore_index=True)
+    assert fit_monthly_k_g(high).iloc[0]["k_g_fit"] == 1.2
@@ -0,0 +1,51 @@
+import os
+import pytest
+from utils import data_loader_dwd
+from utils.data_loader_dwd import archives_for_range
+from utils.dwd_download import download_archive, prefetch_archives
+from conftest import publish
+
+PV_POTSDAM = [{"name": "PV", "typ": "pv", "leistung_mw": 5, "standort": "Potsdam"}]
+
+
+def test_download_then_not_modified(dwd_server):
+    url, root = dwd_server
+    publish(root, "03987", "solar", "2025-03-01", "2025-03-04")
+    (_, _, archive_url, local_path), = archives_for_range("03987", "solar", "2025-03-01", "2025-03-04")
+
+    assert download_archive(archive_url, local_path, retries=0) == "downloaded"
+    assert os.path.exists(local_path) and os.path.exists(local_path + ".meta.json")
+    assert download_archive(archive_url, local_path, retries=0) == "not_modified"
+
+
+def test_prefetch_revalidates_recent_archive_once(dwd_server):
+    url, root = dwd_server
+    publish(root, "03987", "solar", "2025-03-01", "2025-03-04")
+
+    summary = prefetch_archives(PV_POTSDAM, "2025-03-01", "2025-03-03", retries=0)
+    assert (summary["downloaded"], summary["not_modified"], summary["cached"]) == (1, 0, 0)
+
+    #Im selben Prozess bereits abgeglichen --> keine weitere Anfrage
+    summary = prefetch_archives(PV_POTSDAM, "2025-03-01", "2025-03-03", retries=0)
+    assert (summary["downloaded"], summary["not_modified"], summary["cached"]) == (0, 0, 1)
+
+    data_loader_dwd._revalidated.clear()
+    summary = prefetch_archives(PV_POTSDAM, "2025-03-01", "2025-03-03", retries=0)
+    assert summary["not_modified"] == 1
+
+
+def test_prefetch_offline_uses_local_archive(dwd_server, monkeypatch, capsys):
+    url, root = dwd_server
+    publish(root, "03987", "solar", "2025-03-01", "2025-03-04")
+    prefetch_archives(PV_POTSDAM, "2025-03-01", "2025-03-03", retries=0)
+
+    data_loader_dwd._revalidated.clear()
+    monkeypatch.setattr(data_loader_dwd, "DWD_BASE_URL", "http://127.0.0.1:9")
+    summary = prefetch_archives(PV_POTSDAM, "2025-03-01", "2025-03-03", retries=0)
+    assert summary["stale"] == 1 and not summary["failed"]
+    assert "verwende lokale Datei" in capsys.readouterr().out
+
+
+def test_prefetch_missing_archive_raises(dwd_server):
+    with pytest.raises(RuntimeError):
+        prefetch_archives(PV_POTSDAM, "2025-03-01", "2025-03-03", retries=0)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from simulation.ensemble import _inverse_cdf, sample_parameters
+
+
+def test_fixed_and_uniform():
+    u = np.array([[0.0], [0.25], [1.0]])
+    np.testing.assert_allclose(_inverse_cdf({"dist": "fixed", "value": 0.9}, u)[:, 0], [0.9, 0.9, 0.9])
+    np.testing.assert_allclose(_inverse_cdf({"dist": "uniform", "low": 1.0, "high": 3.0}, u)[:, 0], [1.0, 1.5, 3.0])
+
+
+def test_triangular_bounds_mode_and_mean():
+    spec = {"dist": "triangular", "low": 0.0, "mode": 1.0, "high": 4.0}
+    edges = _inverse_cdf(spec, np.array([[0.0], [0.25], [1.0]]))[:, 0]
+    #F(mode) = (mode - low) / (high - low) = 0.25
+    np.testing.assert_allclose(edges, [0.0, 1.0, 4.0])
+    values = _inverse_cdf(spec, np.random.default_rng(0).random((200_000, 1)))
+    assert abs(values.mean() - 5.0 / 3.0) < 0.01
+
+
+def test_triangular_per_month_arrays_and_degenerate():
+    spec = {"dist": "triangular", "low": np.array([0.5, 1.0]), "mode": np.array([0.6, 1.0]), "high": np.array([0.7, 1.0])}
+    values = _inverse_cdf(spec, np.array([[0.0], [1.0]]))
+    np.testing.assert_allclose(values, [[0.5, 1.0], [0.7, 1.0]])
+
+
+def test_normal_is_clipped():
+    spec = {"dist": "normal", "mean": 0.17, "std": 0.02, "low": 0.1, "high": 0.2}
+    values = _inverse_cdf(spec, np.array([[1e-9], [0.5], [1 - 1e-9]]))[:, 0]
+    np.testing.assert_allclose(values, [0.1, 0.17, 0.2])
+
+
+def test_invalid_distributions():
+    with pytest.raises(ValueError):
+        _inverse_cdf({"dist": "triangular", "low": 1.0, "mode": 0.0, "high": 2.0}, np.array([[0.5]]))
+    with pytest.raises(ValueError):
+        _inverse_cdf({"dist": "lognormal"}, np.array([[0.5]]))
+
+
+def test_sample_parameters_shapes_and_seed():
+    samples = sample_parameters(50, seed=3)
+    assert samples["pv_k_g"].shape == (50, 12)
+    assert samples["pv_eta_sys"].shape == (50,)
+    np.testing.assert_array_equal(sample_parameters(50, seed=3)["wind_alpha"], samples["wind_alpha"])
+
+    fixed = sample_parameters(5, seed=1, overrides={"pv_k_g": {"dist": "fixed", "value": 0.8}})
+    np.testing.assert_allclose(fixed["pv_k_g"], np.full((5, 12), 0.8))
+    with pytest.raises(ValueError):
+        sample_parameters(5, overrides={"pv_unknown": {"dist": "fixed", "value": 1}})
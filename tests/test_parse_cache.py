@@ -0,0 +1,32 @@
+import os
+from benchmarks.fixtures import write_dwd_zip
+from utils.data_loader_dwd import _parse_cache, parse_cache_stats, clear_parse_cache
+
+
+def test_hit_disk_hit_and_miss_counters():
+    path = write_dwd_zip(os.path.join("cache", "dwd", "solar", "archiv.zip"), "03987", "solar", "2025-01-01", "2025-01-03")
+
+    first = _parse_cache.get("03987", "solar", path, ["GS_10"])
+    assert parse_cache_stats() == {"hits": 0, "disk_hits": 0, "misses": 1}
+    assert _parse_cache.get("03987", "solar", path, ["GS_10"]) is first
+    assert parse_cache_stats() == {"hits": 1, "disk_hits": 0, "misses": 1}
+
+    #Neuer Prozess (leerer LRU): Speicher auf der Festplatte wird ohne Parsen wiederverwendet
+    clear_parse_cache()
+    store = _parse_cache.get("03987", "solar", path, ["GS_10"])
+    assert parse_cache_stats() == {"hits": 0, "disk_hits": 1, "misses": 0}
+    assert len(store.time) == 288
+
+
+def test_changed_archive_is_parsed_again():
+    path = write_dwd_zip(os.path.join("cache", "dwd", "solar", "archiv.zip"), "03987", "solar", "2025-01-01", "2025-01-03")
+    _parse_cache.get("03987", "solar", path, ["GS_10"])
+
+    #Fortgeschriebenes Archiv (andere Größe und mtime) --> Schlüssel passt nicht mehr
+    write_dwd_zip(path, "03987", "solar", "2025-01-01", "2025-01-04")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    clear_parse_cache()
+    store = _parse_cache.get("03987", "solar", path, ["GS_10"])
+    assert parse_cache_stats()["misses"] == 1
+    assert len(store.time) == 432
@@ -0,0 +1,57 @@
+import os
+import zipfile
+import numpy as np
+import pytest
+from utils import data_loader_dwd
+from utils.data_loader_dwd import _parse_zip_content, _parse_cache
+
+HEADER = "STATIONS_ID;MESS_DATUM;  QN;DS_10;GS_10;SD_10;LS_10;eor"
+
+
+def _write_zip(path, rows):
+    lines = [HEADER] + [f"{station:11d};{stamp};    3;{ds:6.1f};{gs:7.1f};   0.1;-999;eor" for station, stamp, ds, gs in rows]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("produkt_zehn_min_sd_20250101_20250101_03987.txt", "\n".join(lines) + "\n")
+    return path
+
+
+ROWS = [
+    (3987, "202501010000", 1.0, 10.0),
+    (3987, "202501010010", 2.0, -999),
+    (1234, "202501010020", 9.0, 99.0),
+    (3987, "202501010020", 3.0, 30.5),
+    (3987, "202501312350", 4.0, 40.0),
+]
+
+
+def test_typed_chunked_parse_of_requested_columns(monkeypatch):
+    path = _write_zip("produkt.zip", ROWS)
+    #Kleine Blöcke, damit das blockweise Lesen und Zusammenfügen geprüft wird
+    monkeypatch.setattr(data_loader_dwd, "PARSE_CHUNK_ROWS", 2)
+    times, columns = _parse_zip_content(path, "03987", ["GS_10"])
+
+    assert times.dtype == np.int64 and list(columns) == ["GS_10"] and columns["GS_10"].dtype == np.float32
+    expected = np.array(["2025-01-01T00:00", "2025-01-01T00:10", "2025-01-01T00:20", "2025-01-31T23:50"],
+                        dtype="datetime64[ns]").view(np.int64)
+    np.testing.assert_array_equal(times, expected)
+    #Fremde Station entfernt, -999 als fehlender Wert
+    np.testing.assert_array_equal(columns["GS_10"], np.array([10.0, np.nan, 30.5, 40.0], dtype=np.float32))
+
+
+def test_parse_without_variables_reads_all_known_columns():
+    times, columns = _parse_zip_content(_write_zip("produkt.zip", ROWS), "03987")
+    assert sorted(columns) == ["DS_10", "GS_10", "LS_10", "SD_10"]
+    assert np.isnan(columns["LS_10"]).all()
+
+
+def test_parse_cache_stores_only_requested_variables():
+    path = _write_zip("produkt.zip", ROWS)
+    store = _parse_cache.get("03987", "solar", path, ["GS_10"])
+    assert store.columns == ["GS_10"] and store.meta["source"]["variables"] == ["GS_10"]
+
+    both = _parse_cache.get("03987", "solar", path, ["GS_10", "DS_10"])
+    assert both.path != store.path and sorted(both.columns) == ["DS_10", "GS_10"]
+    assert _parse_cache.get("03987", "solar", path, ["DS_10", "GS_10"]) is both
+    with pytest.raises(KeyError):
+        store.column("DS_10")
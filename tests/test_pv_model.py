@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+from benchmarks.fixtures import synthetic_values
+from models.pv_model import PVModel
+
+
+def _weather():
+    #Je ein Tag im Winter, Frühjahr und Sommer mit synthetischer Globalstrahlung
+    timestamps = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(day, periods=144, freq="10min") for day in ("2025-01-15", "2025-04-15", "2025-07-15")
+    ]))
+    return pd.DataFrame({"datetime": timestamps, "pv": synthetic_values("solar", timestamps, 3987)["GS_10"]})
+
+
+def test_simulate_series_matches_simulate_power():
+    weather = _weather()
+    for case, tilt, azimuth in (("normal", 30, 180), ("worst", 45, 120), ("best", 10, 250)):
+        model = PVModel("PV", 10.0, (52.38, 13.06), case, tilt=tilt, azimuth=azimuth)
+        series = model.simulate_series(weather)
+        scalar = np.array([model.simulate_power(row) for row in weather.to_dict("records")])
+        #Zugesicherte Toleranz laut Kommentar an simulate_series: relative Abweichung < 1e-6
+        np.testing.assert_allclose(series, scalar, rtol=1e-6, atol=1e-9)
+        assert scalar.max() > 0
@@ -0,0 +1,40 @@
+import datetime
+import numpy as np
+import pandas as pd
+from simulation.reference_days import daily_statistics, select_reference_days, reference_days
+
+
+def _frame():
+    #Drei Tage mit Stundenwerten: Tag 1 konstant 1, Tag 2 Spitze 10, Tag 3 überwiegend 0 (lange Schwachlastphase)
+    timestamps = pd.date_range("2025-06-01", periods=72, freq="h")
+    power = np.ones(72)
+    power[24 + 12] = 10.0
+    power[48:48 + 20] = 0.0
+    return pd.DataFrame({"timestamp": timestamps, "power_sum": power})
+
+
+def test_daily_statistics_per_day():
+    df = _frame()
+    stats = daily_statistics(df["timestamp"], df["power_sum"].to_numpy(), low_threshold=0.5)
+    assert list(stats.index) == [datetime.date(2025, 6, d) for d in (1, 2, 3)]
+    np.testing.assert_allclose(stats["max"], [1.0, 10.0, 1.0])
+    np.testing.assert_allclose(stats["energy"], [24.0, 33.0, 4.0])
+    np.testing.assert_allclose(stats["max_step"], [0.0, 9.0, 1.0])
+    np.testing.assert_allclose(stats["low_streak"], [0.0, 0.0, 20.0])
+    assert list(stats["lo"]) == [0, 24, 48] and list(stats["hi"]) == [24, 48, 72]
+
+
+def test_reference_day_selection():
+    selected = reference_days(_frame(), low_threshold=0.5)
+    assert selected["max_day"][0][0] == datetime.date(2025, 6, 2)
+    assert selected["min_energy_day"][0][0] == datetime.date(2025, 6, 3)
+    assert selected["low_output_streak_day"][0][0] == datetime.date(2025, 6, 3)
+    day, lo, hi, value = selected["sharp_change_day"][0]
+    assert (day, lo, hi, value) == (datetime.date(2025, 6, 2), 24, 48, 9.0)
+
+
+def test_top_n_and_ties_prefer_earlier_day():
+    stats = daily_statistics(*(_frame()[col] for col in ("timestamp", "power_sum")))
+    selected = select_reference_days(stats, top_n=3, criteria=["min_day"])
+    #Tag 1 und Tag 2 haben dasselbe Minimum (1), Tag 3 das kleinste (0)
+    assert [entry[0].day for entry in selected["min_day"]] == [3, 1, 2]
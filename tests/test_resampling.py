@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from simulation.resampling import resample, resample_ns
+
+MINUTE_NS = pd.Timedelta(minutes=1).value
+
+
+def _series(minutes, values):
+    return np.asarray(minutes, dtype=np.int64) * MINUTE_NS, np.asarray(values, dtype=float)
+
+
+def test_linear_interpolates_midpoints():
+    ts, values = _series([0, 10, 20], [0.0, 2.0, 6.0])
+    target, result = resample_ns(ts, values, 5, "linear")
+    assert list(target // MINUTE_NS) == [0, 5, 10, 15, 20]
+    np.testing.assert_allclose(result, [0.0, 1.0, 2.0, 4.0, 6.0])
+
+
+def test_step_holds_last_value():
+    ts, values = _series([0, 10, 20], [1.0, 2.0, 3.0])
+    _, result = resample_ns(ts, values, 5, "step")
+    np.testing.assert_allclose(result, [1.0, 1.0, 2.0, 2.0, 3.0])
+
+
+def test_mean_aggregates_to_hours():
+    ts, values = _series(np.arange(0, 120, 10), np.arange(12, dtype=float))
+    target, result = resample_ns(ts, values, 60, "mean")
+    assert list(target // MINUTE_NS) == [0, 60]
+    np.testing.assert_allclose(result, [2.5, 8.5])
+
+
+def test_gaps_longer_than_max_gap_are_not_bridged():
+    ts, values = _series([0, 10, 130, 140], [1.0, 1.0, 5.0, 5.0])
+    target, _ = resample_ns(ts, values, 5, "linear")
+    minutes = target // MINUTE_NS
+    assert not np.any((minutes > 10) & (minutes < 130))
+    assert 135 in minutes
+
+
+def test_two_dimensional_values_per_plant():
+    ts, _ = _series([0, 10], [0, 0])
+    values = np.array([[0.0, 10.0], [2.0, 20.0]])
+    _, result = resample_ns(ts, values, 5, "linear")
+    np.testing.assert_allclose(result, [[0.0, 10.0], [1.0, 15.0], [2.0, 20.0]])
+
+
+def test_grid_aligned_to_step_multiples():
+    timestamps = pd.date_range("2025-01-01 00:10", periods=4, freq="10min")
+    target, _ = resample(timestamps, np.ones(4), 15, "linear")
+    assert list(target.strftime("%H:%M")) == ["00:15", "00:30"]
+
+
+def test_invalid_input_raises():
+    ts, values = _series([0, 10], [1.0, 2.0])
+    with pytest.raises(ValueError):
+        resample_ns(ts, values, 5, "cubic")
+    with pytest.raises(ValueError):
+        resample_ns(ts[::-1], values, 5, "linear")
+    with pytest.raises(ValueError):
+        resample_ns(ts, values[:1], 5, "linear")
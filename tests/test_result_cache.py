@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from simulation import result_cache
+from simulation.result_cache import ResultCache, cached_profile
+
+
+class CountingUnit:
+    def __init__(self):
+        self.rows = 0
+
+    def simulate_series_cases(self, weather, cases):
+        self.rows += len(weather)
+        return {case: weather["pv"].to_numpy() * (2.0 if case == "best" else 1.0) for case in cases}
+
+
+def _weather(days=3):
+    timestamps = pd.date_range("2025-05-01", periods=days * 144, freq="10min")
+    return pd.DataFrame({"datetime": timestamps, "pv": np.arange(days * 144, dtype=float)})
+
+
+def _days(days=3):
+    return [(f"2025-05-0{d + 1}", d * 144, (d + 1) * 144) for d in range(days)]
+
+
+def test_only_missing_days_are_simulated():
+    cache = ResultCache("results.sqlite")
+    unit, weather = CountingUnit(), _weather()
+    first = cached_profile(cache, unit, ("pv", 1), weather, "pv", _days(), ["normal", "best"])
+    assert unit.rows == 432
+    np.testing.assert_array_equal(first["best"], 2 * weather["pv"].to_numpy())
+
+    again = cached_profile(cache, unit, ("pv", 1), weather, "pv", _days(), ["normal", "best"])
+    assert unit.rows == 432
+    np.testing.assert_array_equal(again["normal"], first["normal"])
+
+    #Neuer Szenario-Eintrag, neuer Tag und andere Signatur werden nachgerechnet
+    cached_profile(cache, unit, ("pv", 1), weather, "pv", _days(), ["worst"])
+    assert unit.rows == 864
+    cached_profile(cache, unit, ("pv", 2), weather, "pv", _days()[:1], ["normal"])
+    assert unit.rows == 1008
+
+
+def test_changed_weather_invalidates_only_that_day():
+    cache = ResultCache("results.sqlite")
+    unit, weather = CountingUnit(), _weather()
+    cached_profile(cache, unit, ("pv", 1), weather, "pv", _days(), ["normal"])
+
+    weather.loc[200, "pv"] = -1.0
+    result = cached_profile(cache, unit, ("pv", 1), weather, "pv", _days(), ["normal"])
+    assert unit.rows == 432 + 144
+    assert result["normal"][200] == -1.0
+
+
+def test_model_version_change_invalidates_and_prune_removes(monkeypatch):
+    cache = ResultCache("results.sqlite")
+    unit, weather = CountingUnit(), _weather()
+    cached_profile(cache, unit, ("pv", 1), weather, "pv", _days(), ["normal"])
+
+    monkeypatch.setattr(result_cache, "model_version", lambda: "geaendert")
+    cached_profile(cache, unit, ("pv", 1), weather, "pv", _days(), ["normal"])
+    assert unit.rows == 864
+    assert cache.prune() == 3
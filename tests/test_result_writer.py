@@ -0,0 +1,50 @@
+import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from simulation.result_writer import write_case_results, partition_path
+
+
+def _month(year, month, days):
+    dates = [datetime.date(year, month, d) for d in range(1, days + 1)]
+    timestamps = pd.date_range(dates[0], periods=days * 24, freq="h")
+    power = np.tile(np.clip(np.sin((np.arange(24) - 6) / 12 * np.pi), 0, None), days) * np.repeat(np.arange(1, days + 1), 24)
+    return pd.DataFrame({"timestamp": timestamps, "PV": power, "power_sum": power}), dates
+
+
+def test_parquet_partitions_and_reference_metadata():
+    written = []
+    for year, month in ((2025, 1), (2025, 2)):
+        df, dates = _month(year, month, 3)
+        written += write_case_results(df, "normal", dates, "output", plots=False)
+
+    assert written == [os.path.join("output", "results", "case=normal", "month=2025-01", "part-2025-01-01.parquet"),
+                       os.path.join("output", "results", "case=normal", "month=2025-02", "part-2025-02-01.parquet")]
+    assert written[0] == partition_path("output", "normal", [datetime.date(2025, 1, 1)])
+
+    table = pq.read_table(written[1])
+    assert table.schema.field("timestamp").type == "timestamp[ns]"
+    assert str(table.schema.field("power_sum").type) == "float"
+    assert table.num_rows == 72
+    reference = json.loads(table.schema.metadata[b"reference_days"])
+    #Leistung steigt von Tag zu Tag: Maximum am dritten, Minimum der Energie am ersten Tag
+    assert reference["max_day"] == ["2025-02-03"] and reference["min_energy_day"] == ["2025-02-01"]
+
+    #Gesamter Ordner als partitionierter Datensatz lesbar
+    results = pd.read_parquet(os.path.join("output", "results"))
+    assert len(results) == 144 and set(results["month"].astype(str)) == {"2025-01", "2025-02"}
+
+    with open(os.path.join("output", "reference_days.json")) as f:
+        index = json.load(f)
+    assert sorted(index["normal"]) == ["2025-01-01_2025-01-03", "2025-02-01_2025-02-03"]
+    assert index["normal"]["2025-02-01_2025-02-03"] == reference
+
+
+def test_csv_format_keeps_reference_day_files():
+    df, dates = _month(2025, 3, 2)
+    written = write_case_results(df, "best", dates, "output", fmt="csv", plots=False, top_n=1)
+    folder = os.path.join("output", "03_2025")
+    assert os.path.join(folder, "time_series_best_03_2025.csv") in written
+    assert len(pd.read_csv(os.path.join(folder, "time_series_best_03_2025_max_day.csv"))) == 24
@@ -0,0 +1,58 @@
+import datetime
+import pytest
+from simulation.runner import month_chunks, load_run_state, save_run_state
+
+
+def test_month_chunks_split_at_month_boundaries():
+    chunks = month_chunks(datetime.date(2024, 1, 30), datetime.date(2024, 3, 2))
+    assert [(c[0], c[-1]) for c in chunks] == [
+        (datetime.date(2024, 1, 30), datetime.date(2024, 1, 31)),
+        (datetime.date(2024, 2, 1), datetime.date(2024, 2, 29)),
+        (datetime.date(2024, 3, 1), datetime.date(2024, 3, 2)),
+    ]
+    assert sum(len(c) for c in chunks) == 33
+
+
+def test_month_chunks_single_day_and_year_change():
+    assert month_chunks(datetime.date(2025, 5, 12), datetime.date(2025, 5, 12)) == [[datetime.date(2025, 5, 12)]]
+    chunks = month_chunks(datetime.date(2024, 12, 31), datetime.date(2025, 1, 1))
+    assert chunks == [[datetime.date(2024, 12, 31)], [datetime.date(2025, 1, 1)]]
+
+
+def test_month_chunks_rejects_reversed_range():
+    with pytest.raises(ValueError):
+        month_chunks(datetime.date(2025, 2, 1), datetime.date(2025, 1, 31))
+
+
+def _config(power):
+    return {"anlagen": [{"name": "PV", "typ": "pv", "leistung_mw": power, "standort": "Potsdam"}]}
+
+
+def test_run_state_resumes_matching_run(workdir):
+    state = load_run_state("output", _config(5), ["normal"])
+    state["completed"]["2025-01-01_2025-01-31"] = ["a.parquet"]
+    save_run_state("output", state)
+    assert load_run_state("output", _config(5), ["normal"])["completed"] == state["completed"]
+
+
+def test_run_state_changed_config_starts_fresh_with_warning(workdir, capsys):
+    state = load_run_state("output", _config(5), ["normal"])
+    state["completed"]["2025-01-01_2025-01-31"] = ["a.parquet"]
+    save_run_state("output", state)
+
+    fresh = load_run_state("output", _config(6), ["normal"])
+    assert fresh["completed"] == {}
+    assert "Warnung" in capsys.readouterr().out
+
+
+def test_run_state_explicit_resume_rejects_changed_config(workdir):
+    save_run_state("output", load_run_state("output", _config(5), ["normal"]))
+    with pytest.raises(ValueError):
+        load_run_state("output", _config(6), ["normal"], resume=True)
+
+
+def test_run_state_no_resume_discards_matching_run(workdir):
+    state = load_run_state("output", _config(5), ["normal"])
+    state["completed"]["2025-01-01_2025-01-31"] = ["a.parquet"]
+    save_run_state("output", state)
+    assert load_run_state("output", _config(5), ["normal"], resume=False)["completed"] == {}
@@ -0,0 +1,42 @@
+import datetime
+import numpy as np
+import pandas as pd
+from simulation.simulator import simulate_period
+from conftest import publish
+
+CONFIG = {
+    "anlagen": [
+        {"name": "PV_Potsdam", "typ": "pv", "leistung_mw": 20, "standort": "Potsdam"},
+        {"name": "Wind_Nuernberg", "typ": "wind", "leistung_mw": 15, "standort": "Nuernberg"},
+    ]
+}
+
+
+def test_period_across_month_boundary(dwd_server):
+    url, root = dwd_server
+    publish(root, "03987", "solar", "2025-01-01", "2025-03-01")
+    publish(root, "03668", "wind", "2025-01-01", "2025-03-01")
+
+    dates = [datetime.date(2025, 1, 30) + datetime.timedelta(days=i) for i in range(4)]
+    frames = simulate_period(CONFIG, dates, ["normal"], processes=1, show_progress=False, result_cache=None)
+    df = frames["normal"]
+
+    assert list(df.columns) == ["timestamp", "PV_Potsdam", "Wind_Nuernberg", "power_sum"]
+    #Je Tag 288 Werte im 5-Minuten-Raster, auch am Monatsende bis 23:55
+    assert len(df) == 4 * 288 and df["timestamp"].is_unique
+    assert df["timestamp"].iloc[0] == pd.Timestamp("2025-01-30 00:00")
+    assert df["timestamp"].iloc[-1] == pd.Timestamp("2025-02-02 23:55")
+    month_end = df[df["timestamp"].between("2025-01-31 23:45", "2025-02-01 00:05")]
+    assert len(month_end) == 5
+    assert np.isfinite(df["Wind_Nuernberg"].to_numpy()).all()
+
+
+def test_unsupported_plant_type_is_skipped(dwd_server, capsys):
+    url, root = dwd_server
+    publish(root, "03987", "solar", "2025-03-01", "2025-03-03")
+    config = {"anlagen": [{"name": "PV", "typ": "pv", "leistung_mw": 5, "standort": "Potsdam"},
+                          {"name": "Bio", "typ": "biogas", "leistung_mw": 3, "standort": "Potsdam"}]}
+    df = simulate_period(config, [datetime.date(2025, 3, 1)], ["normal"], processes=1, show_progress=False,
+                         result_cache=None)["normal"]
+    assert "Anlage 'Bio' übersprungen (unbekannter Typ 'biogas')" in capsys.readouterr().out
+    assert list(df.columns) == ["timestamp", "PV", "power_sum"] and len(df) == 288
@@ -0,0 +1,36 @@
+from models import pv_model
+from simulation import simulator
+from utils.data_loader_dwd import DATE_MAP
+from utils.stations import load_station_table, nearest_station, _station_index
+
+
+def test_nearest_station_without_period():
+    assert nearest_station(52.56, 13.31)[0] == "Berlin-Tegel"
+
+
+def test_nearest_station_skips_discontinued_station():
+    #Berlin-Tegel liefert nur bis Mai 2021 Daten
+    name, distance_km = nearest_station(52.56, 13.31, "2025-01-01", "2025-01-31")
+    assert name != "Berlin-Tegel" and distance_km > 0
+    assert nearest_station(52.56, 13.31, "2020-06-01", "2020-06-30")[0] == "Berlin-Tegel"
+
+
+def test_all_table_stations_are_indexed():
+    table = load_station_table()
+    assert table["lat"].notna().all() and table["lon"].notna().all()
+    #Stationen mit Daten in DATE_MAP sind alle im Index der Umkreissuche
+    assert set(table["station_id"][table["station_id"].isin(DATE_MAP)]) == set(_station_index()[1]["station_id"])
+    assert nearest_station(50.22, 8.45, "2024-06-01", "2024-06-30")[0] == "Kleiner Feldberg/Taunus"
+
+
+def test_table_stations_resolve_without_geocoder(monkeypatch):
+    def offline(*args, **kwargs):
+        raise AssertionError("Geocoder darf nicht aufgerufen werden")
+
+    monkeypatch.setattr(simulator, "geocode", offline)
+    monkeypatch.setattr(pv_model, "geocode", offline)
+    anlagen = [{"name": "PV", "typ": "pv", "standort": "Weihenstephan-Duernast"},
+               {"name": "Unbekannt", "typ": "pv", "standort": "Nirgendwo"}]
+    coords = simulator.resolve_locations(anlagen)
+    assert list(coords) == ["Weihenstephan-Duernast"]
+    assert pv_model.PVModel.get_lat_lon("Nuerburg-Barweiler") == (50.36, 6.8696)
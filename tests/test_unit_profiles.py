@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from benchmarks.fixtures import synthetic_values
+from models.pv_model import PVModel
+from models.wind_model import WindModel
+
+TIMESTAMPS = pd.date_range("2025-03-01", periods=288, freq="10min")
+
+
+def test_wind_profile_scales_with_turbine_count():
+    weather = pd.DataFrame({"datetime": TIMESTAMPS, "wind": synthetic_values("wind", TIMESTAMPS, 3668)["FF_10"]})
+    for rated_power, turbine_rated_power, count in ((15, 3.2, 5), (1, 3.2, 1), (20, 4.0, 5), (17, 3.2, 5)):
+        model = WindModel("Wind", "normal", rated_power, (49.5, 11.05), turbine_rated_power=turbine_rated_power)
+        assert model.turbine_count == count and model.profile_scale() == count
+        unit = model.unit_model()
+        assert unit.turbine_count == 1 and unit.profile_signature() == model.profile_signature()
+        np.testing.assert_allclose(unit.simulate_series(weather) * model.profile_scale(), model.simulate_series(weather),
+                                   rtol=1e-12)
+
+
+def test_pv_profile_scales_with_rated_power():
+    weather = pd.DataFrame({"datetime": TIMESTAMPS, "pv": synthetic_values("solar", TIMESTAMPS, 3987)["GS_10"]})
+    model = PVModel("PV", 7.5, (52.38, 13.06), "normal", tilt=20)
+    np.testing.assert_allclose(model.unit_model().simulate_series(weather) * model.profile_scale(),
+                               model.simulate_series(weather), rtol=1e-12)
+
+
+def test_signature_ignores_only_the_size():
+    small = WindModel("A", "normal", 10, (49.5, 11.05))
+    large = WindModel("B", "worst", 30, (49.5, 11.05))
+    assert small.profile_signature() == large.profile_signature()
+    assert WindModel("C", "normal", 10, (49.5, 11.05), hub_height=120).profile_signature() != small.profile_signature()
+    assert (PVModel("A", 1, (52.0, 13.0), "normal").profile_signature()
+            != PVModel("B", 1, (52.0, 13.0), "normal", k_t=1.0).profile_signature())
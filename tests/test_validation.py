@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from simulation.validation import best_lag
+
+MINUTE = pd.Timedelta(minutes=1).value
+
+
+#Referenz: Pearson-Korrelation je Verschiebung direkt auf dem 1-Minuten-Raster (Simulation außerhalb des Bereichs = 0)
+def brute_force(sim_ns, sim_values, meas_ns, meas_values, max_lag):
+    origin = sim_ns[0] // MINUTE * MINUTE
+    sim = dict(zip((sim_ns - origin) // MINUTE, sim_values))
+    positions = np.round((meas_ns - origin) / MINUTE).astype(np.int64)
+    corr = {}
+    for lag in range(-max_lag, max_lag + 1):
+        shifted = np.array([sim.get(p - lag, 0.0) for p in positions])
+        corr[lag] = np.corrcoef(meas_values, shifted)[0, 1] if shifted.std() > 0 else np.nan
+    return corr
+
+
+def _signal(rng, minutes):
+    t = np.arange(minutes)
+    return np.clip(np.sin((t - 300) / 700 * np.pi), 0, None) * 5 + rng.normal(0, 0.3, minutes).cumsum() * 0.05
+
+
+def test_best_lag_matches_brute_force():
+    rng = np.random.default_rng(7)
+    start = pd.Timestamp("2025-06-01").value
+    sim_values = _signal(rng, 1440)
+    sim_ns = start + np.arange(1440) * MINUTE
+
+    for shift in (-23, 0, 11):
+        #Messwerte alle 5 Minuten mit Sekundenversatz, Simulation um shift Minuten verschoben plus Rauschen
+        meas_minutes = np.arange(40, 1400, 5)
+        meas_ns = start + meas_minutes * MINUTE + rng.integers(-20, 20, len(meas_minutes)) * 1_000_000_000
+        meas_values = sim_values[meas_minutes - shift] + rng.normal(0, 0.05, len(meas_minutes))
+
+        lag, corr = best_lag(sim_ns, sim_values, meas_ns, meas_values, max_lag=30)
+        reference = brute_force(sim_ns, sim_values, meas_ns, meas_values, 30)
+        expected = max(reference, key=lambda k: (reference[k], -abs(k)))
+        assert lag == expected == shift
+        assert abs(corr - reference[lag]) < 1e-9
+        np.testing.assert_allclose(
+            [best_lag(sim_ns, sim_values, meas_ns, meas_values, max_lag=m)[0] for m in (abs(shift), abs(shift) + 1)],
+            [shift, shift])
+
+
+def test_best_lag_without_data():
+    assert best_lag([], [], [0, 1, 2], [1, 2, 3])[0] == 0
+    lag, corr = best_lag(np.arange(10) * MINUTE, np.ones(10), np.arange(5) * MINUTE, np.ones(5))
+    assert lag == 0 and np.isnan(corr)
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+from benchmarks.fixtures import write_dwd_zip
+from utils import data_loader_dwd
+from utils.data_loader_dwd import archive_sources, archives_for_range, load_weather_range
+from conftest import publish
+
+
+def test_stale_recent_archive_is_refreshed(dwd_server):
+    url, root = dwd_server
+    #Lokales _akt-Archiv endet am 2. März, der Server hat bereits eine fortgeschriebene Fassung
+    (_, _, _, local_path), = archives_for_range("03987", "solar", "2025-03-01", "2025-03-04")
+    write_dwd_zip(local_path, "03987", "solar", "2025-03-01", "2025-03-02")
+    publish(root, "03987", "solar", "2025-03-01", "2025-03-04")
+
+    df = load_weather_range("03987", "2025-03-01", "2025-03-03", ["GS_10"])
+    assert len(df) == 288
+    assert df["datetime"].iloc[-1] == pd.Timestamp("2025-03-02 23:50")
+
+
+def test_complete_recent_archive_is_not_revalidated(dwd_server, monkeypatch):
+    url, root = dwd_server
+    (_, _, _, local_path), = archives_for_range("03987", "solar", "2025-03-01", "2025-03-04")
+    write_dwd_zip(local_path, "03987", "solar", "2025-03-01", "2025-03-04")
+    monkeypatch.setattr(data_loader_dwd, "DWD_BASE_URL", "http://127.0.0.1:9")
+
+    df = load_weather_range("03987", "2025-03-01", "2025-03-03", ["GS_10"])
+    assert len(df) == 288
+    assert not data_loader_dwd.is_revalidated(local_path)
+
+
+def test_discontinued_station_has_no_recent_archive():
+    #Berlin-Tegel (00430) liefert nur bis Mai 2021 Daten
+    sources = archives_for_range("00430", "wind", "2021-05-01", "2021-07-01")
+    assert len(sources) == 1 and sources[0][2].endswith("_hist.zip")
+    assert archives_for_range("00430", "wind", "2025-01-01", "2025-02-01") == []
+    assert archives_for_range("03987", "wind", "2024-12-01", "2025-02-01")[-1][2].endswith("_akt.zip")
+
+
+def test_discontinued_station_beyond_its_end_raises():
+    assert len(archive_sources("Berlin-Tegel", "wind", "2021-05-01", "2021-05-05")) == 1
+    with pytest.raises(ValueError, match="eingestellt"):
+        archive_sources("Berlin-Tegel", "wind", "2021-05-01", "2021-06-30")
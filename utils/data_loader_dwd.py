@@ -1,14 +1,17 @@
-import requests
 import zipfile
-import io
 import pandas as pd
 from datetime import datetime, timedelta
 import yaml
 import os 
-from joblib import Memory
+import json
+import numpy as np
+from collections import OrderedDict
+from functools import lru_cache
+from utils.weather_store import STORE_DIR, open_store, write_store
+from utils import instrumentation
 
-# Cache-Verzeichnis fuer joblib
-memory = Memory("cache/joblib", verbose=0)
+#Basis-URL der 10-Minuten-Daten des DWD Open-Data-Servers
+DWD_BASE_URL = "https://opendata.dwd.de/climate_environment/CDC/observations_germany/climate/10_minutes"
 
 def load_yaml_config(path):
     with open(path, "r") as file:
@@ -235,48 +238,197 @@ DATE_MAP = {
     "15000": ("20200101", "20241231"),
 }
 
-#Cache-System speichert geladen .zip Datein zwsichen
-@memory.cache
-def _parse_zip_content(content, station_id):
-    with zipfile.ZipFile(io.BytesIO(content)) as z:
+#Ende der historischen Archive (Stand von DATE_MAP), Stationen mit früherem Ende sind eingestellt und haben kein aktuelles Archiv
+HIST_RELEASE_END = max(end for _, end in DATE_MAP.values())
+
+
+#Prüft, ob die Daten einer Station den Zeitraum (Start- und Enddatum inklusive) abdecken
+def station_covers(station_id, start_date, end_date):
+    hist_start, hist_end = DATE_MAP.get(station_id, (None, None))
+    if not hist_start or pd.Timestamp(start_date) < pd.Timestamp(hist_start):
+        return False
+    return hist_end >= HIST_RELEASE_END or pd.Timestamp(end_date) <= pd.Timestamp(hist_end)
+
+#DWD-Produkte (Verzeichnis -> Dateikennung) und Zuordnung der Messgrößen zu Produkten
+PRODUCT_CODES = {"solar": "SOLAR", "wind": "wind"}
+VARIABLE_PRODUCTS = {
+    "GS_10": "solar", "DS_10": "solar", "SD_10": "solar", "LS_10": "solar",
+    "FF_10": "wind", "DD_10": "wind",
+}
+
+PARSE_CHUNK_ROWS = 500_000
+
+#Wandelt MESS_DATUM im festen Format YYYYMMDDhhmm (int64) vektorisiert in int64-Nanosekunden (UTC) um
+def _mess_datum_to_ns(values):
+    values = np.asarray(values, dtype=np.int64)
+    year, rest = np.divmod(values, 100_000_000)
+    month, rest = np.divmod(rest, 1_000_000)
+    day, rest = np.divmod(rest, 10_000)
+    hour, minute = np.divmod(rest, 100)
+    months = (year - 1970) * 12 + (month - 1)
+    days = months.astype("datetime64[M]").astype("datetime64[D]") + (day - 1)
+    minutes = days.astype("datetime64[m]") + (hour * 60 + minute)
+    return minutes.astype("datetime64[ns]").view(np.int64)
+
+#Parst eine DWD-.zip von der Festplatte (Aufruf nur bei Cache-Miss, siehe ParseCache)
+#Liest nur Stations-ID, Zeitstempel und die benötigten Messgrößen mit festen numerischen Typen blockweise direkt aus der .zip
+#variables=None liest alle Messgrößen der Datei (nur für Benchmarks, der Parse-Cache übergibt immer die angefragten)
+#Rückgabe: (int64-Zeitstempel in ns, {Messgröße: float32-Array})
+def _parse_zip_content(local_zip_path, station_id, variables=None):
+    with zipfile.ZipFile(local_zip_path) as z:
         txt = next(n for n in z.namelist() if n.endswith(".txt"))
-        df = pd.read_csv(z.open(txt), sep=';', encoding='latin1', na_values='-999', dtype=str)
+        with z.open(txt) as f:
+            header = f.readline().decode("latin1").rstrip("\r\n").split(";")
+        raw_names = {name.strip(): name for name in header}
+        if variables is None:
+            variables = [name for name in raw_names if name in VARIABLE_PRODUCTS]
+        variables = [name for name in variables if name in raw_names]
 
-    df['STATIONS_ID'] = df['STATIONS_ID'].str.strip().str.zfill(5)
-    df['MESS_DATUM'] = pd.to_datetime(df['MESS_DATUM'], format='%Y%m%d%H%M')
-    df = df[df['STATIONS_ID'] == station_id]
+        usecols = [raw_names["STATIONS_ID"], raw_names["MESS_DATUM"]] + [raw_names[name] for name in variables]
+        dtype = {raw_names["STATIONS_ID"]: np.int32, raw_names["MESS_DATUM"]: np.int64}
+        dtype.update({raw_names[name]: np.float32 for name in variables})
 
-    return df
+        times, columns = [], {name: [] for name in variables}
+        with z.open(txt) as f:
+            reader = pd.read_csv(f, sep=';', encoding='latin1', usecols=usecols, dtype=dtype,
+                                 na_values=['-999'], chunksize=PARSE_CHUNK_ROWS)
+            for chunk in reader:
+                chunk = chunk[chunk[raw_names["STATIONS_ID"]].to_numpy() == int(station_id)]
+                times.append(_mess_datum_to_ns(chunk[raw_names["MESS_DATUM"]].to_numpy()))
+                for name in variables:
+                    values = chunk[raw_names[name]].to_numpy(dtype=np.float32, copy=True)
+                    #DWD-Fehlkennung -999 als fehlender Wert
+                    values[values == -999] = np.nan
+                    columns[name].append(values)
 
-#Ließt entweder .zip ein oder lädt sie zuerst herunter
-def _load_monthly_weather_df(station_id, url, local_zip_path):
+    timestamps_ns = np.concatenate(times) if times else np.zeros(0, dtype=np.int64)
+    return timestamps_ns, {name: np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+                           for name, parts in columns.items()}
+
+#Aktuelle Archive (_akt) werden vom DWD laufend fortgeschrieben, historische Archive ändern sich nicht
+def is_recent_archive(path):
+    return path.endswith("_akt.zip")
+
+#Lädt die .zip herunter, falls sie noch nicht lokal vorhanden ist (normalerweise bereits durch prefetch_archives erledigt)
+def _ensure_local_zip(url, local_zip_path):
+    if not os.path.exists(local_zip_path):
+        from utils.dwd_download import download_archive
 
-    # Pruefe ob ZIP-Datei lokal vorhanden ist (Dateicache)
-    if os.path.exists(local_zip_path):
-        with open(local_zip_path, "rb") as f:
-            content = f.read()
-    else:
         print(f"Lade ZIP von URL: {url}")
-        resp = requests.get(url)
-        resp.raise_for_status()
-        content = resp.content
-        os.makedirs(os.path.dirname(local_zip_path), exist_ok=True)
-        with open(local_zip_path, "wb") as f:
-            f.write(content)
+        with instrumentation.stage("dwd.download"):
+            download_archive(url, local_zip_path)
+        mark_revalidated(local_zip_path)
 
-    # Hier: Parsen cache'n – somit wird die ZIP nur einmal entpackt und geparst
-    df = _parse_zip_content(content, station_id)
+#Zweistufiger Parse-Cache: begrenzter LRU im Prozess vor dem spaltenorientierten Speicher auf der Festplatte
+#Schlüssel ist (Station, Datentyp, Pfad, Größe, mtime) der Quelldatei und die gelesenen Messgrößen --> kein Hashen des Dateiinhalts
+#Je Kombination von Messgrößen entsteht ein eigener Speicher, es werden nur die angefragten Spalten geparst
+class ParseCache:
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
 
-    return df
+    @staticmethod
+    def source_key(station_id, data_type, local_zip_path, variables):
+        stat = os.stat(local_zip_path)
+        return (station_id, data_type, os.path.abspath(local_zip_path), stat.st_size, stat.st_mtime_ns,
+                tuple(sorted(variables)))
 
-#Hauptfunktion Wetterdaten
-def load_weather_data(location, date, typ):
-    target_date = pd.to_datetime(date).date()
-    year, month = target_date.year, target_date.month
+    def get(self, station_id, data_type, local_zip_path, variables):
+        key = self.source_key(station_id, data_type, local_zip_path, variables)
+        store = self._entries.get(key)
+        if store is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            instrumentation.count("parse_cache.hits")
+            return store
+
+        station_id, data_type, path, size, mtime_ns, variables = key
+        source = {"station_id": station_id, "data_type": data_type, "size": size, "mtime_ns": mtime_ns,
+                  "variables": list(variables)}
+        store_name = "_".join([os.path.splitext(os.path.basename(path))[0], *variables])
+        store_path = os.path.join(STORE_DIR, store_name)
+        store = open_store(store_path)
+        if store is not None and store.meta.get("source") == source:
+            self.stats["disk_hits"] += 1
+            instrumentation.count("parse_cache.disk_hits")
+        else:
+            #Speicher fehlt oder stammt aus einer älteren .zip --> einmal parsen und überführen
+            self.stats["misses"] += 1
+            instrumentation.count("parse_cache.misses")
+            with instrumentation.stage("dwd.parse_zip") as measured:
+                timestamps_ns, columns = _parse_zip_content(local_zip_path, station_id, list(variables))
+                measured["rows"] = len(timestamps_ns)
+            with instrumentation.stage("dwd.write_store"):
+                store = write_store(store_path, timestamps_ns, columns, meta={"source": source})
+
+        self._entries[key] = store
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return store
+
+    def clear(self):
+        self._entries.clear()
+        for name in self.stats:
+            self.stats[name] = 0
+
+_parse_cache = ParseCache()
+
+#Hit/Miss-Zähler des Parse-Caches im aktuellen Prozess
+def parse_cache_stats():
+    return dict(_parse_cache.stats)
+
+def clear_parse_cache():
+    _parse_cache.clear()
+
+#Aktuelle Archive, die in diesem Prozess bereits mit dem Server abgeglichen wurden (prefetch_archives oder _load_store)
+_revalidated = set()
+
+def mark_revalidated(local_zip_path):
+    _revalidated.add(os.path.abspath(local_zip_path))
+
+def is_revalidated(local_zip_path):
+    return os.path.abspath(local_zip_path) in _revalidated
+
+#Liefert den spaltenorientierten Speicher mit den Messgrößen variables zu einer .zip (Download falls nötig)
+#Endet ein lokales aktuelles Archiv vor dem angefragten Zeitraumende (end exklusiv), wird einmal pro Prozess
+#per bedingter Anfrage eine neuere Fassung geladen, statt stillschweigend Tage auszulassen
+def _load_store(station_id, data_type, url, local_zip_path, variables, end=None):
+    _ensure_local_zip(url, local_zip_path)
+    store = _parse_cache.get(station_id, data_type, local_zip_path, variables)
+    if end is None or not is_recent_archive(local_zip_path) or is_revalidated(local_zip_path):
+        return store
+    last_needed = (pd.Timestamp(end) - pd.Timedelta(minutes=10)).value
+    if len(store.time) and store.time[-1] >= last_needed:
+        return store
+
+    from utils.dwd_download import download_archive
+
+    mark_revalidated(local_zip_path)
+    try:
+        with instrumentation.stage("dwd.download"):
+            status = download_archive(url, local_zip_path)
+    except Exception as e:
+        print(f"Warnung: {url} konnte nicht aktualisiert werden ({e}), verwende lokale Datei")
+        return store
+    instrumentation.count("archive_cache.misses" if status == "downloaded" else "archive_cache.revalidated_hits")
+    if status == "downloaded":
+        store = _parse_cache.get(station_id, data_type, local_zip_path, variables)
+    return store
 
-    station_id = LOCATION_MAP.get(location)
-    if not station_id:
-        raise ValueError(f"Kein Mapping fuer Standort '{location}' gefunden.")
+#Station als Name aus LOCATION_MAP oder direkt als DWD-Stations-ID
+def _station_id(station):
+    station_id = LOCATION_MAP.get(station)
+    if station_id:
+        return station_id
+    station_id = str(station).strip().zfill(5)
+    if station_id in DATE_MAP:
+        return station_id
+    raise ValueError(f"Kein Mapping fuer Standort '{station}' gefunden.")
+
+#Ermittelt Station und DWD-Produkt zu Standort und Anlagentyp
+def _resolve_source(location, typ):
+    station_id = _station_id(location)
 
     start_str, end_str = DATE_MAP.get(station_id, (None, None))
     if not start_str:
@@ -284,34 +436,174 @@ def load_weather_data(location, date, typ):
 
     if typ == "pv":
         data_type = "solar"
-        code = "SOLAR"
         key = "GS_10"
         out = "pv"
     elif typ == "wind":
         data_type = "wind"
-        code = "wind"
         key = "FF_10"
         out = "wind"
     else:
         raise ValueError(f"Unbekannter Typ '{typ}'")
+    return station_id, data_type, key, out
+
+#Archive, die den Zeitraum start <= t < end abdecken: historisches Archiv (Zeitraum laut DATE_MAP) und/oder aktuelles Archiv
+#Rückgabe in Prioritätsreihenfolge (historische, qualitätsgeprüfte Daten zuerst) als (station_id, data_type, url, lokaler Pfad)
+#Eingestellte Stationen (historische Daten enden vor HIST_RELEASE_END) haben kein aktuelles Archiv
+#base_url=None: DWD_BASE_URL zum Zeitpunkt des Aufrufs (lässt sich z.B. auf einen lokalen Testserver umstellen)
+def archives_for_range(station_id, data_type, start, end, base_url=None):
+    base_url = base_url or DWD_BASE_URL
+    code = PRODUCT_CODES[data_type]
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    hist_start, hist_end = DATE_MAP.get(station_id, (None, None))
+    hist_stop = pd.Timestamp(hist_end) + pd.Timedelta(days=1) if hist_end else None
+
+    sources = []
+    if hist_start and start < hist_stop and end > pd.Timestamp(hist_start):
+        name = f"10minutenwerte_{code}_{station_id}_{hist_start}_{hist_end}_hist.zip"
+        sources.append((station_id, data_type, f"{base_url}/{data_type}/historical/{name}",
+                        os.path.join("cache", "dwd", data_type, name)))
+    if hist_stop is None or (end > hist_stop and hist_end >= HIST_RELEASE_END):
+        name = f"10minutenwerte_{code}_{station_id}_akt.zip"
+        sources.append((station_id, data_type, f"{base_url}/{data_type}/recent/{name}",
+                        os.path.join("cache", "dwd", data_type, name)))
+    return sources
+
+#Alle Archive, die für Standort, Typ und Zeitraum (Start- und Enddatum inklusive) benötigt werden
+#Reicht der Zeitraum über das Ende einer eingestellten Station hinaus --> ValueError statt fehlender Tage
+def archive_sources(location, typ, start_date, end_date, base_url=None):
+    station_id, data_type, key, out = _resolve_source(location, typ)
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    hist_end = DATE_MAP[station_id][1]
+    if hist_end < HIST_RELEASE_END and end > pd.Timestamp(hist_end) + pd.Timedelta(days=1):
+        raise ValueError(f"Station '{location}' ({station_id}) wurde eingestellt, Daten nur bis {pd.Timestamp(hist_end).date()} "
+                         f"(angefragt bis {pd.Timestamp(end_date).date()}). Bitte eine andere Station oder lat/lon angeben.")
+    return archives_for_range(station_id, data_type, start, end, base_url)
+
+#Zeitstempel und Werte aus mehreren Archiven zusammenführen, doppelte Zeitstempel nur einmal (erstes Archiv hat Vorrang)
+def _merged_slice(stores, start, end, names):
+    times, values = [], {name: [] for name in names}
+    for store in stores:
+        lo, hi = store.range_index(start, end)
+        part_times, part_values = store.slice(lo, hi, names)
+        times.append(part_times)
+        for name in names:
+            values[name].append(part_values[name])
+
+    times = np.concatenate(times) if times else np.zeros(0, dtype=np.int64)
+    times, first = np.unique(times, return_index=True)
+    return times, {name: np.concatenate(values[name])[first] if values[name] else np.zeros(0, dtype=np.float32)
+                   for name in names}
 
-    # URL & ZIP-Pfad muus ggf. angepasst werden 
-    url = f"https://opendata.dwd.de/climate_environment/CDC/observations_germany/climate/10_minutes/{data_type}/recent/10minutenwerte_{code}_{station_id}_akt.zip"
-    local_zip_path = os.path.join("cache", f"{station_id}_{data_type}_{year}_{month:02d}.zip")
+#Liefert den Zeitraum start <= t < end blockweise (standardmäßig je Monat) als DataFrames mit 'datetime' und den Messgrößen
+#Historische und aktuelle Archive werden dabei automatisch ausgewählt, einmal geladen und überlappungsfrei zusammengeführt
+def iter_weather_range(station, start, end, variables, chunk_freq="MS"):
+    station_id = _station_id(station)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
 
-    # Hole Monats-DataFrame aus persistentem Cache
-    df = _load_monthly_weather_df(station_id, url, local_zip_path)
+    by_product = {}
+    for name in variables:
+        if name not in VARIABLE_PRODUCTS:
+            raise ValueError(f"Unbekannte Messgroesse '{name}'")
+        by_product.setdefault(VARIABLE_PRODUCTS[name], []).append(name)
+
+    stores = {
+        data_type: [_load_store(*source, names, end=end) for source in archives_for_range(station_id, data_type, start, end)]
+        for data_type, names in by_product.items()
+    }
+
+    bounds = [start] + [b for b in pd.date_range(start, end, freq=chunk_freq) if start < b < end] + [end]
+    for chunk_start, chunk_end in zip(bounds[:-1], bounds[1:]):
+        frame = None
+        for data_type, names in by_product.items():
+            times, values = _merged_slice(stores[data_type], chunk_start, chunk_end, names)
+            part = pd.DataFrame({"datetime": pd.to_datetime(times), **{n: v.astype(float) for n, v in values.items()}})
+            frame = part if frame is None else frame.merge(part, on="datetime", how="outer")
+        if len(frame):
+            yield frame.sort_values("datetime").reset_index(drop=True)
+
+#Wetterdaten einer Station für einen beliebigen Zeitraum start <= t < end (auch über mehrere Jahre)
+def load_weather_range(station, start, end, variables):
+    frames = list(iter_weather_range(station, start, end, variables))
+    if not frames:
+        return pd.DataFrame({"datetime": pd.to_datetime([]), **{name: [] for name in variables}})
+    return pd.concat(frames, ignore_index=True)
+
+#Hauptfunktion Wetterdaten
+def load_weather_data(location, date, typ):
+    target_date = pd.to_datetime(date).date()
 
-    # Filtere nur den angeforderten Tag
-    df = df[df['MESS_DATUM'].dt.date == target_date]
+    station_id, data_type, key, out = _resolve_source(location, typ)
+    day_start = pd.Timestamp(target_date)
+    df = load_weather_range(station_id, day_start, day_start + pd.Timedelta(days=1), [key])
 
     if df.empty:
         raise ValueError(f"Keine Daten fuer '{location}' am {target_date} ({key}).")
 
     # Erzeuge Ergebnis
     result = [
-        {"datetime": row["MESS_DATUM"].to_pydatetime(), out: float(row[key]) if pd.notna(row[key]) else None}
-        for _, row in df.iterrows()
+        {"datetime": ts.to_pydatetime(), out: float(value) if not np.isnan(value) else None}
+        for ts, value in zip(df["datetime"], df[key])
     ]
 
     return result
+
+#Lädt Wetterdaten für einen ganzen Zeitraum (Start- und Enddatum inklusive) als sortierten DataFrame mit 'datetime' und 'pv'/'wind'
+def load_weather_period(location, start_date, end_date, typ):
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+
+    station_id, data_type, key, out = _resolve_source(location, typ)
+    df = load_weather_range(station_id, start, end, [key])
+
+    if df.empty:
+        raise ValueError(f"Keine Daten fuer '{location}' von {start.date()} bis {(end - pd.Timedelta(days=1)).date()} ({key}).")
+
+    return df.rename(columns={key: out})
+
+#Bereitet im Hauptprozess die Wetterdaten eines Standorts und Typs für einen Zeitraum (Start- und Enddatum inklusive) vor:
+#Jedes benötigte Archiv wird genau einmal geparst und als Memory-Map-Speicher abgelegt
+#Rückgabe: kleiner Deskriptor (Pfade und Quellkennung der Speicher), den Worker statt der Daten erhalten
+def prepare_weather(location, typ, start_date, end_date):
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+
+    station_id, data_type, key, out = _resolve_source(location, typ)
+    stores = [_load_store(*source, [key], end=end) for source in archives_for_range(station_id, data_type, start, end)]
+    return {
+        "location": location,
+        "typ": typ,
+        "key": key,
+        "out": out,
+        "stores": [(store.path, store.meta.get("source")) for store in stores],
+    }
+
+#Öffnet einen vorbereiteten Speicher einmal pro Prozess, die Arrays sind schreibgeschützte Views auf die gemeinsame Datei
+@lru_cache(maxsize=64)
+def _attach_store(path, source_key):
+    store = open_store(path)
+    if store is None:
+        raise ValueError(f"Wetterspeicher {path} nicht gefunden, prepare_weather im Hauptprozess aufrufen")
+    return store
+
+#Wetterdaten eines Zeitraums (Start- und Enddatum inklusive) über einen Deskriptor aus prepare_weather, ohne erneutes Parsen
+#Rückgabe wie load_weather_period: sortierter DataFrame mit 'datetime' und 'pv'/'wind'
+#lookahead: zusätzlicher Zeitraum nach dem Enddatum (z.B. erster Wert des Folgetags für die Umrechnung der Auflösung)
+def load_weather_prepared(descriptor, start_date, end_date, lookahead=None):
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+    stop = end + pd.Timedelta(lookahead or 0)
+
+    with instrumentation.stage("weather.load") as measured:
+        attached = _attach_store.cache_info().misses
+        stores = [_attach_store(path, json.dumps(source, sort_keys=True)) for path, source in descriptor["stores"]]
+        attached = _attach_store.cache_info().misses - attached
+        instrumentation.count("weather_store.hits", len(stores) - attached)
+        instrumentation.count("weather_store.misses", attached)
+        times, values = _merged_slice(stores, start, stop, [descriptor["key"]])
+        measured["rows"] = len(times)
+    if len(times) == 0:
+        raise ValueError(f"Keine Daten fuer '{descriptor['location']}' von {start.date()} bis "
+                         f"{(end - pd.Timedelta(days=1)).date()} ({descriptor['key']}).")
+
+    return pd.DataFrame({"datetime": pd.to_datetime(times), descriptor["out"]: values[descriptor["key"]].astype(float)})
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.data_loader_dwd import archive_sources, is_recent_archive, is_revalidated, mark_revalidated
+
+#Paralleler Vorab-Download aller DWD-Archive einer Simulation, bevor der Prozess-Pool startet
+#Verbindungen werden über eine gemeinsame requests.Session (Connection-Pool) wiederverwendet
+RETRY_STATUS = {429, 500, 502, 503, 504}
+_session_lock = threading.Lock()
+_session = None
+
+
+#Gemeinsame Session mit Connection-Pool passend zur Anzahl paralleler Downloads
+def get_session(pool_size=8):
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+#Metadaten (ETag, Last-Modified) eines heruntergeladenen Archivs für bedingte Anfragen
+def _meta_path(local_path):
+    return f"{local_path}.meta.json"
+
+
+def _read_meta(local_path):
+    try:
+        with open(_meta_path(local_path), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+#Lädt ein Archiv mit Wiederholungen (exponentielles Backoff) und schreibt es atomar (temporäre Datei + Umbenennen)
+#Ist die Datei bereits vorhanden, wird mit If-None-Match/If-Modified-Since nur bei Änderungen neu geladen
+#Rückgabe: "downloaded" oder "not_modified"
+def download_archive(url, local_path, session=None, retries=3, backoff=1.0, timeout=60):
+    session = session or get_session()
+    headers = {}
+    if os.path.exists(local_path):
+        meta = _read_meta(local_path)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    import requests
+
+    for attempt in range(retries + 1):
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+                if resp.status_code == 304:
+                    return "not_modified"
+                if resp.status_code in RETRY_STATUS and attempt < retries:
+                    raise requests.HTTPError(f"HTTP {resp.status_code}", response=resp)
+                resp.raise_for_status()
+
+                os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+                tmp_path = f"{local_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                try:
+                    with open(tmp_path, "wb") as f:
+                        for chunk in resp.iter_content(chunk_size=1 << 20):
+                            f.write(chunk)
+                    os.replace(tmp_path, local_path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+
+                meta = {"url": url, "etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+                with open(_meta_path(local_path), "w") as f:
+                    json.dump(meta, f)
+                return "downloaded"
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            response = getattr(e, "response", None)
+            retryable = response is None or response.status_code in RETRY_STATUS
+            if not retryable or attempt >= retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+#Ermittelt alle benötigten Archive für die Anlagen im Zeitraum, ohne Duplikate
+def list_archives(anlagen, start_date, end_date, base_url=None):
+    archives = {}
+    for anlage in anlagen:
+        if not anlage.get("standort") or anlage.get("typ") not in ("pv", "wind"):
+            continue
+        for station_id, data_type, url, local_path in archive_sources(anlage["standort"], anlage["typ"], start_date, end_date, base_url):
+            archives.setdefault(local_path, (station_id, data_type, url, local_path))
+    return list(archives.values())
+
+
+#Lädt alle fehlenden Archive parallel (begrenzte Anzahl Threads), vorhandene Dateien werden per bedingter Anfrage geprüft:
+#revalidate="recent" (Standard) nur aktuelle Archive (_akt) und nur einmal pro Prozess, True alle, False keine
+#Schlägt die Prüfung einer vorhandenen Datei fehl (z.B. offline), wird mit Warnung die lokale Datei verwendet
+#Gleiche URLs werden nur einmal geladen und für weitere lokale Pfade kopiert
+def prefetch_archives(anlagen, start_date, end_date, max_workers=8, retries=3, backoff=1.0,
+                      revalidate="recent", base_url=None):
+    archives = list_archives(anlagen, start_date, end_date, base_url)
+    by_url = {}
+    for station_id, data_type, url, local_path in archives:
+        by_url.setdefault(url, []).append(local_path)
+
+    pending = {}
+    for url, paths in by_url.items():
+        check = revalidate is True or (revalidate == "recent" and is_recent_archive(url)
+                                       and not all(is_revalidated(p) for p in paths))
+        if check or not all(os.path.exists(p) for p in paths):
+            existing = next((p for p in paths if os.path.exists(p)), paths[0])
+            pending[url] = existing
+
+    summary = {"archives": len(archives), "downloaded": 0, "not_modified": 0, "cached": len(by_url) - len(pending),
+               "stale": 0, "failed": {}}
+    status = {}
+    if pending:
+        session = get_session(max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(download_archive, url, path, session, retries, backoff): url
+                       for url, path in pending.items()}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    status[url] = future.result()
+                    summary[status[url]] += 1
+                    if is_recent_archive(url):
+                        for path in by_url[url]:
+                            mark_revalidated(path)
+                except Exception as e:
+                    if os.path.exists(pending[url]):
+                        print(f"Warnung: {url} konnte nicht geprüft werden ({e}), verwende lokale Datei")
+                        summary["stale"] += 1
+                        for path in by_url[url]:
+                            mark_revalidated(path)
+                    else:
+                        summary["failed"][url] = str(e)
+
+    #Weitere lokale Pfade derselben URL aus der geladenen Datei erzeugen
+    for url, paths in by_url.items():
+        source = pending.get(url)
+        if url in summary["failed"] or source is None:
+            continue
+        for path in paths:
+            if path != source and (not os.path.exists(path) or status.get(url) == "downloaded"):
+                _copy_atomic(source, path)
+
+    if summary["failed"]:
+        failed = "\n".join(f"  {url}: {err}" for url, err in summary["failed"].items())
+        raise RuntimeError(f"Download von {len(summary['failed'])} DWD-Archiven fehlgeschlagen:\n{failed}")
+    return summary
+
+
+def _copy_atomic(source, target):
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+    if os.path.exists(_meta_path(source)):
+        shutil.copyfile(_meta_path(source), _meta_path(target))
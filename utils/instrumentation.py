@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import platform
+import datetime
+from contextlib import contextmanager
+
+#Laufzeitmessung je Verarbeitungsschritt (Wand- und CPU-Zeit, Aufrufe, verarbeitete Zeilen), Zähler (z.B. Cache-Treffer)
+#und Auslastung der Worker-Prozesse. Jeder Prozess sammelt in ein eigenes Metrics-Objekt, Worker geben die Messwerte
+#einer Aufgabe zusammen mit dem Ergebnis zurück und der Hauptprozess führt sie zusammen (record_pool)
+#Die Messung ist immer aktiv (zwei Zeitabfragen je Schritt), der Bericht wird nur auf Anforderung geschrieben
+PROFILE_ENGINES = ("cprofile", "pyinstrument")
+
+
+class Metrics:
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.workers = {}
+        self.pool = {"runs": 0, "tasks": 0, "wall_s": 0.0, "capacity_s": 0.0}
+
+    def add_stage(self, name, wall_s, cpu_s, rows=0, calls=1):
+        entry = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0})
+        entry["calls"] += calls
+        entry["wall_s"] += wall_s
+        entry["cpu_s"] += cpu_s
+        entry["rows"] += rows
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    #Kopie als einfache Dictionaries (picklebar, JSON-fähig)
+    def snapshot(self):
+        return {
+            "stages": {name: dict(entry) for name, entry in self.stages.items()},
+            "counters": dict(self.counters),
+            "workers": {pid: dict(entry) for pid, entry in self.workers.items()},
+            "pool": dict(self.pool),
+        }
+
+    #Addiert die Messwerte eines anderen Prozesses bzw. einer Aufgabe
+    def merge(self, snapshot):
+        for name, entry in snapshot.get("stages", {}).items():
+            self.add_stage(name, entry["wall_s"], entry["cpu_s"], entry["rows"], entry["calls"])
+        for name, n in snapshot.get("counters", {}).items():
+            self.count(name, n)
+        for pid, entry in snapshot.get("workers", {}).items():
+            worker = self.workers.setdefault(pid, {"tasks": 0, "busy_s": 0.0, "cpu_s": 0.0})
+            for key in worker:
+                worker[key] += entry[key]
+        for key, value in snapshot.get("pool", {}).items():
+            self.pool[key] += value
+
+
+_current = Metrics()
+
+
+def current():
+    return _current
+
+
+def reset():
+    global _current
+    _current = Metrics()
+
+
+#Misst einen Verarbeitungsschritt, die Zeilenzahl kann im Block gesetzt werden: with stage("x") as s: s["rows"] = n
+#Nach dem Block enthält das Dictionary zusätzlich die gemessenen Zeiten (wall_s, cpu_s)
+@contextmanager
+def stage(name, rows=0):
+    info = {"rows": rows}
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield info
+    finally:
+        info["wall_s"] = time.perf_counter() - wall_start
+        info["cpu_s"] = time.process_time() - cpu_start
+        _current.add_stage(name, info["wall_s"], info["cpu_s"], info["rows"])
+
+
+def count(name, n=1):
+    _current.count(name, n)
+
+
+#Eigener Messbereich für eine Worker-Aufgabe: die Messwerte landen in einem neuen Metrics-Objekt,
+#die Werte des umgebenden Prozesses bleiben unverändert (auch wenn die Aufgabe im Hauptprozess läuft)
+@contextmanager
+def task_scope():
+    global _current
+    outer, task = _current, Metrics()
+    _current = task
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield task
+    finally:
+        task.workers[str(os.getpid())] = {"tasks": 1, "busy_s": time.perf_counter() - wall_start,
+                                          "cpu_s": time.process_time() - cpu_start}
+        _current = outer
+
+
+#Übernimmt die Messwerte aller Aufgaben eines Pool-Durchlaufs, wall_s ist die Dauer des Durchlaufs im Hauptprozess
+#Auslastung = Summe der Aufgabendauern / (Prozesse * Dauer)
+def record_pool(processes, wall_s, task_snapshots):
+    for snapshot in task_snapshots:
+        _current.merge(snapshot)
+    _current.pool["runs"] += 1
+    _current.pool["tasks"] += len(task_snapshots)
+    _current.pool["wall_s"] += wall_s
+    _current.pool["capacity_s"] += processes * wall_s
+
+
+#Bericht als Dictionary: Schritte mit Zeilen je Sekunde, Zähler, Cache-Trefferquoten und Worker-Auslastung
+def build_report(metrics=None, meta=None):
+    metrics = metrics or _current
+    stages = {}
+    for name, entry in sorted(metrics.stages.items(), key=lambda item: item[1]["wall_s"], reverse=True):
+        stages[name] = {**entry, "rows_per_s": entry["rows"] / entry["wall_s"] if entry["rows"] and entry["wall_s"] else None}
+
+    #Trefferquote je Cache aus den Zählern <cache>.hits / <cache>.misses (weitere Treffer-Arten z.B. disk_hits)
+    caches = {}
+    for name, n in metrics.counters.items():
+        cache, _, kind = name.rpartition(".")
+        if cache:
+            caches.setdefault(cache, {})[kind] = n
+    for entry in caches.values():
+        hits = sum(n for kind, n in entry.items() if kind.endswith("hits"))
+        total = hits + entry.get("misses", 0)
+        entry["hit_rate"] = hits / total if total else None
+
+    busy_s = sum(worker["busy_s"] for worker in metrics.workers.values())
+    capacity_s = metrics.pool["capacity_s"]
+    return {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            **(meta or {}),
+        },
+        "stages": stages,
+        "counters": dict(sorted(metrics.counters.items())),
+        "caches": caches,
+        "workers": {
+            "pool_runs": metrics.pool["runs"],
+            "tasks": metrics.pool["tasks"],
+            "pool_wall_s": metrics.pool["wall_s"],
+            "busy_s": busy_s,
+            "utilization": busy_s / capacity_s if capacity_s else None,
+            "per_process": metrics.workers,
+        },
+    }
+
+
+def write_report(path, metrics=None, meta=None):
+    report = build_report(metrics, meta)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f" Laufbericht gespeichert: {path}")
+    return report
+
+
+#Führt func(*args) unter cProfile bzw. pyinstrument aus, speichert das Profil (optional) und gibt die teuersten Aufrufe aus
+#cprofile: .prof-Datei (z.B. für snakeviz), pyinstrument: HTML-Datei, pyinstrument muss dafür installiert sein
+def profile_call(func, *args, engine="cprofile", output=None, top=25):
+    if engine not in PROFILE_ENGINES:
+        raise ValueError(f"Unbekannter Profiler '{engine}', erlaubt: {', '.join(PROFILE_ENGINES)}")
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    if engine == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ValueError("pyinstrument ist nicht installiert (pip install pyinstrument) – alternativ cprofile verwenden")
+        profiler = Profiler()
+        profiler.start()
+        try:
+            result = func(*args)
+        finally:
+            profiler.stop()
+        print(profiler.output_text(unicode=True))
+        if output:
+            with open(output, "w") as f:
+                f.write(profiler.output_html())
+        return result
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args)
+    if output:
+        profiler.dump_stats(output)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+    return result
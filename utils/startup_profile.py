@@ -0,0 +1,47 @@
+import os
+import sys
+import subprocess
+
+#Module, die beim Start des Hauptprozesses bzw. eines Multiprocessing-Workers importiert werden
+STARTUP_MODULES = ["main", "simulation.simulator", "models.pv_model", "models.wind_model", "utils.data_loader_dwd"]
+
+
+#Führt "python -X importtime -c 'import <modul>'" in einem frischen Interpreter aus und liest die Zeiten ein
+#Rückgabe: Liste von (Modul, eigene Zeit in us, kumulierte Zeit in us)
+def measure_imports(module, cwd=None):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=cwd,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import von '{module}' fehlgeschlagen:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+#Gibt je Startmodul die Gesamtimportzeit und die teuersten Einzelimporte aus (optional zusätzlich in Datei)
+def profile_startup(modules=None, top=15, output=None):
+    modules = modules or STARTUP_MODULES
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    lines = []
+    for module in modules:
+        entries = measure_imports(module, cwd=cwd)
+        total = next((cum for name, _, cum in entries if name == module), 0)
+        lines.append(f"=== import {module}: {total / 1000:.1f} ms ===")
+        for name, self_us, cum_us in sorted(entries, key=lambda e: e[2], reverse=True)[:top]:
+            lines.append(f"{cum_us / 1000:9.1f} ms kumuliert {self_us / 1000:8.1f} ms eigen  {name}")
+        lines.append("")
+
+    report = "\n".join(lines)
+    print(report)
+    if output:
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as f:
+            f.write(report)
+    return report
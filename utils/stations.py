@@ -0,0 +1,67 @@
+import os
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from utils.data_loader_dwd import DATE_MAP, station_covers
+
+#Offline-Stationstabelle (Koordinaten aus config/wetterstationen_interaktiv.html), ersetzt den Nominatim-Geocoder
+STATION_TABLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "stations.csv")
+EARTH_RADIUS_KM = 6371.0
+
+
+#Lädt die Stationstabelle einmal pro Prozess
+@lru_cache(maxsize=1)
+def load_station_table():
+    return pd.read_csv(STATION_TABLE_PATH, dtype={"station_id": str, "name": str})
+
+
+#Räumlicher Index (BallTree mit Haversine-Metrik) über alle Stationen mit Koordinaten und Datenabdeckung
+@lru_cache(maxsize=1)
+def _station_index():
+    from sklearn.neighbors import BallTree
+
+    table = load_station_table()
+    covered = table[table["lat"].notna() & table["lon"].notna() & table["station_id"].isin(DATE_MAP)]
+    covered = covered.reset_index(drop=True)
+    tree = BallTree(np.radians(covered[["lat", "lon"]].to_numpy()), metric="haversine")
+    return tree, covered
+
+
+#Koordinaten (lat, lon) eines Stationsnamens oder None
+def get_station_coords(name):
+    table = load_station_table()
+    row = table[table["name"] == name]
+    if row.empty or row["lat"].isna().iloc[0]:
+        return None
+    return float(row["lat"].iloc[0]), float(row["lon"].iloc[0])
+
+
+#Nächstgelegene Station(en) mit Datenabdeckung zu beliebigen Koordinaten, Rückgabe Liste von (Name, Entfernung in km)
+def nearest_stations(latitude, longitude, k=1):
+    tree, covered = _station_index()
+    dist, idx = tree.query(np.radians([[latitude, longitude]]), k=min(k, len(covered)))
+    return [(covered["name"].iloc[i], float(d * EARTH_RADIUS_KM)) for d, i in zip(dist[0], idx[0])]
+
+
+#Nächstgelegene Station, deren Daten den Zeitraum (Start- und Enddatum inklusive) abdecken (z.B. keine eingestellten Stationen)
+#Ohne Zeitraum oder ohne passende Station wird die nächstgelegene Station mit Daten verwendet
+def nearest_station(latitude, longitude, start_date=None, end_date=None):
+    candidates = nearest_stations(latitude, longitude, k=len(_station_index()[1]))
+    if start_date is None or end_date is None:
+        return candidates[0]
+    station_ids = load_station_table().set_index("name")["station_id"]
+    for name, distance_km in candidates:
+        if station_covers(station_ids[name], start_date, end_date):
+            return name, distance_km
+    print(f"⚠️ Keine Station deckt den Zeitraum {start_date} bis {end_date} ab, verwende '{candidates[0][0]}'")
+    return candidates[0]
+
+
+#Optionaler Rückgriff auf den Nominatim-Geocoder (nur auf ausdrücklichen Wunsch, benötigt Netzwerk)
+def geocode(place_name, user_agent="volture_ee", timeout=5):
+    from geopy.geocoders import Nominatim
+
+    location = Nominatim(user_agent=user_agent, timeout=timeout).geocode(place_name)
+    if location:
+        return (float(location.latitude), float(location.longitude))
+    return None
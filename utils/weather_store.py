@@ -0,0 +1,82 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+#Spaltenorientierter Wetterdatenspeicher: je DWD-Archiv ein Verzeichnis mit sortierten int64-Zeitstempeln (ns, UTC)
+#und float32-Messwerten als .npy-Dateien, die per Memory-Mapping geöffnet werden
+STORE_DIR = os.path.join("cache", "store")
+TIME_FILE = "time.npy"
+META_FILE = "meta.json"
+
+
+#Geöffneter Speicher, alle Arrays sind schreibgeschützte Memory-Maps und werden erst beim Zugriff gelesen
+class WeatherStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r") as f:
+            self.meta = json.load(f)
+        self.time = np.load(os.path.join(path, TIME_FILE), mmap_mode="r")
+        self._columns = {}
+
+    @property
+    def columns(self):
+        return list(self.meta["columns"])
+
+    def column(self, name):
+        if name not in self.meta["columns"]:
+            raise KeyError(f"Spalte '{name}' nicht im Wetterspeicher {self.path} vorhanden")
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._columns[name]
+
+    #Indexbereich [lo, hi) für Zeitstempel start <= t < end per Binärsuche auf der sortierten Zeitachse
+    def range_index(self, start, end):
+        bounds = np.array([pd.Timestamp(start).value, pd.Timestamp(end).value], dtype=np.int64)
+        lo, hi = np.searchsorted(self.time, bounds, side="left")
+        return int(lo), int(hi)
+
+    def day_index(self, date):
+        start = pd.Timestamp(date).normalize()
+        return self.range_index(start, start + pd.Timedelta(days=1))
+
+    #Zeitstempel und Werte eines Indexbereichs (Views auf die Memory-Maps, keine Kopie)
+    def slice(self, lo, hi, names):
+        return self.time[lo:hi], {name: self.column(name)[lo:hi] for name in names}
+
+
+#Schreibt einen Speicher atomar: erst temporäres Verzeichnis, dann Umbenennen
+def write_store(path, timestamps_ns, columns, meta=None):
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    order = np.argsort(timestamps_ns, kind="stable")
+    timestamps_ns = timestamps_ns[order]
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, TIME_FILE), timestamps_ns)
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(values, dtype=np.float32)[order])
+
+    meta = dict(meta or {})
+    meta["columns"] = list(columns)
+    meta["rows"] = int(len(timestamps_ns))
+    with open(os.path.join(tmp_path, META_FILE), "w") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        #Ein anderer Prozess hat den Speicher zeitgleich angelegt
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return WeatherStore(path)
+
+
+#Öffnet einen vorhandenen Speicher oder liefert None
+def open_store(path):
+    if not os.path.exists(os.path.join(path, META_FILE)):
+        return None
+    return WeatherStore(path)
+